@@ -0,0 +1,94 @@
+"""
+Full-text search over books already in the local catalog.
+
+Book.search_vector is a generated tsvector column (title and authors
+weighted highest, then publisher/categories, then description) with a GIN
+index, so matching and ranking happen in Postgres without a Google call.
+Results carry live availability from BookStats: how many members own a
+copy and how many of those copies are out on loan.
+"""
+
+import logging
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+from .models import Book
+
+logger = logging.getLogger(__name__)
+
+CATALOG_SEARCH_DEFAULTS = {
+    "MIN_RESULTS": 4,  # Fewer local matches than this also queries Google
+    "MAX_RESULTS": 12,  # Local matches shown above the Google results
+}
+
+
+def get_config():
+    return {**CATALOG_SEARCH_DEFAULTS, **getattr(settings, "CATALOG_SEARCH", {})}
+
+
+def owned_books():
+    """Books at least one member owns, annotated with owners_count and available_copies.
+
+    Both come from the maintained BookStats row, so a listing is one join
+    rather than counts over the ownership and loan history tables.
+    """
+    return (
+        Book.objects.filter(stats__owners__gt=0)
+        .annotate(owners_count=F("stats__owners"), available_copies=F("stats__available_copies"))
+        .defer("description", "search_vector")  # Large, and not shown in listings
+    )
+
+
+def catalog_queryset(query, limit=None, available_only=False):
+    """Books matching a free-text query, best match first.
+
+    Accepts web-search syntax ("quoted phrases", -exclusions, or) and never
+    raises on malformed input. Each book is annotated with rank,
+    owners_count, on_loan_count and available_copies; among equally good
+    matches, books that can be borrowed now come first. available_only
+    drops books with no copy free to lend.
+    """
+    if limit is None:
+        limit = get_config()["MAX_RESULTS"]
+    search_query = SearchQuery(query, search_type="websearch", config="english")
+    books = Book.objects.filter(search_vector=search_query)
+    if available_only:
+        books = books.filter(stats__available_copies__gt=0)
+    return (
+        books.annotate(
+            rank=SearchRank(F("search_vector"), search_query),
+            # Books nobody has owned, wished for or lent have no stats row
+            owners_count=Coalesce(F("stats__owners"), 0),
+            on_loan_count=Coalesce(F("stats__active_loans"), 0),
+            available_copies=Coalesce(F("stats__available_copies"), 0),
+        )
+        .order_by("-rank", "-available_copies", "title")[:limit]
+    )
+
+
+def search_catalog(query, limit=None, available_only=False):
+    """Evaluate catalog_queryset and return a list"""
+    books = list(catalog_queryset(query, limit, available_only))
+    logger.debug("Catalog search for %r matched %s books", query, len(books))
+    return books
+
+
+async def asearch_catalog(query, limit=None, available_only=False):
+    return [book async for book in catalog_queryset(query, limit, available_only)]
+
+
+def always_needs_google(page, source):
+    """Whether a search goes to Google Books whatever the catalog holds.
+
+    Only the first page is answered locally; later pages and explicit
+    "search Google" requests always go upstream.
+    """
+    return source == "google" or page > 1
+
+
+def needs_google(local_books, page, source):
+    """Whether a search should also go to Google Books"""
+    return always_needs_google(page, source) or len(local_books) < get_config()["MIN_RESULTS"]
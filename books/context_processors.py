@@ -3,20 +3,26 @@ Context processors for the books app
 These functions add variables to the template context for all templates
 """
 
-from .models import RequestBook
+from django.utils.functional import SimpleLazyObject
+
+from .models import UserStats
+
+
+def _received_open(user_pk):
+    # Live requests where user is the owner, maintained on write in UserStats
+    count = UserStats.objects.filter(pk=user_pk).values_list('requests_received_open', flat=True).first()
+    return count or 0
 
 
 def pending_requests_count(request):
     """
     Add the count of pending book requests to the template context
     This allows us to show a notification badge in the header
+
+    The count is only looked up the first time a template uses it, so pages
+    that never show the badge don't query for it
     """
     if request.user.is_authenticated:
-        # Count requests where user is the owner and decision hasn't been made yet
-        count = RequestBook.objects.filter(
-            owner=request.user,
-            decision_datetime__isnull=True,
-            cancelled_datetime__isnull=True
-        ).count()
-        return {'pending_requests_count': count}
+        user_pk = request.user.pk
+        return {'pending_requests_count': SimpleLazyObject(lambda: _received_open(user_pk))}
     return {'pending_requests_count': 0}
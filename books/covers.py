@@ -0,0 +1,208 @@
+"""
+Local copies of Google Books cover images.
+
+A background worker (manage.py fetch_covers) downloads each Book.thumbnail
+once, and stores it under MEDIA_ROOT keyed by the SHA-256 of the original
+image. It is resized to a few fixed widths, each saved as WebP with a JPEG
+fallback. Because the path changes whenever the content does, the files are
+served with immutable far-future cache headers (views.cover_image).
+Downloads are only made over https from Google's image hosts, since the
+thumbnail URL is stored data rather than something we chose.
+Templates use the {% book_cover %} tag, which falls back to the remote URL
+until Book.cover_key is set.
+"""
+
+import hashlib
+import io
+import logging
+import re
+from datetime import timedelta
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+from requests.exceptions import RequestException
+
+from . import google_books
+from .models import Book
+
+logger = logging.getLogger(__name__)
+
+COVERS_DEFAULTS = {
+    "DIR": "covers",  # Under MEDIA_ROOT
+    "WIDTHS": (80, 160, 320),  # Fixed output widths; never upscaled past the source
+    "JPEG_QUALITY": 82,
+    "WEBP_QUALITY": 80,
+    "MAX_BYTES": 5 * 1024 * 1024,  # Larger downloads are rejected
+    "RETRY_AFTER": 24 * 60 * 60,  # Seconds before a failed cover is tried again
+    "HOSTS": ("books.google.com", "books.googleusercontent.com"),  # The only hosts covers are fetched from
+    "MAX_REDIRECTS": 3,  # Each hop must stay on HOSTS
+}
+
+FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+COVER_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+COVER_NAME_RE = re.compile(r"^(?P<width>\d+)\.(?P<ext>webp|jpg)$")
+
+
+class CoverError(Exception):
+    """The cover couldn't be downloaded or isn't a usable image"""
+
+
+def get_config():
+    return {**COVERS_DEFAULTS, **getattr(settings, "BOOK_COVERS", {})}
+
+
+def cover_path(key, name):
+    """Storage path of one rendition, e.g. covers/ab/ab12.../160.webp"""
+    return f"{get_config()['DIR']}/{key[:2]}/{key}/{name}"
+
+
+def cover_url(key, width, ext):
+    return reverse("cover_image", kwargs={"key": key, "name": f"{width}.{ext}"})
+
+
+def source_url(thumbnail):
+    # Google serves the same image over https, and http URLs are blocked on https pages
+    if thumbnail.startswith("http://"):
+        return "https://" + thumbnail[len("http://"):]
+    return thumbnail
+
+
+def is_allowed_url(url):
+    """Whether `url` is an https URL on one of the configured cover hosts"""
+    parts = urlsplit(url)
+    return (
+        parts.scheme == "https"
+        and parts.hostname in get_config()["HOSTS"]
+        and parts.port in (None, 443)
+        and not parts.username
+    )
+
+
+# Covers come from a different host to the API, so they get their own keep-alive session
+_session = requests.Session()
+
+
+def download(url):
+    """Fetch the original image bytes, using the API client's timeouts.
+
+    Redirects are followed by hand so every hop can be checked against HOSTS.
+    """
+    config = get_config()
+    url = source_url(url)
+    for _ in range(config["MAX_REDIRECTS"] + 1):
+        if not is_allowed_url(url):
+            raise CoverError(f"Not a Google Books image URL: {url[:100]}")
+        try:
+            with _session.get(
+                url, timeout=google_books.get_client().timeout, stream=True, allow_redirects=False
+            ) as response:
+                if response.is_redirect:
+                    url = urljoin(url, response.headers["Location"])
+                    continue
+                response.raise_for_status()
+                data = response.raw.read(config["MAX_BYTES"] + 1, decode_content=True)
+        except RequestException as e:
+            raise CoverError(f"Download failed: {e}") from e
+        if len(data) > config["MAX_BYTES"]:
+            raise CoverError(f"Cover is larger than {config['MAX_BYTES']} bytes")
+        return data
+    raise CoverError(f"More than {config['MAX_REDIRECTS']} redirects")
+
+
+def render(image, width, image_format, quality):
+    resized = image
+    if image.width > width:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+    buffer = io.BytesIO()
+    resized.save(buffer, image_format, quality=quality)
+    return buffer.getvalue()
+
+
+def store(data):
+    """Resize the original into every width and format. Returns the cover key.
+
+    Identical images share one set of files, and existing files are left alone.
+    """
+    key = hashlib.sha256(data).hexdigest()
+    config = get_config()
+    try:
+        with Image.open(io.BytesIO(data)) as original:
+            image = original.convert("RGB")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise CoverError(f"Not a usable image: {e}") from e
+
+    qualities = {"webp": config["WEBP_QUALITY"], "jpg": config["JPEG_QUALITY"]}
+    for width in config["WIDTHS"]:
+        for ext, image_format in FORMATS.items():
+            path = cover_path(key, f"{width}.{ext}")
+            if not default_storage.exists(path):
+                default_storage.save(path, ContentFile(render(image, width, image_format, qualities[ext])))
+    return key
+
+
+def pending_books():
+    """Books with a remote thumbnail and no local cover, never-tried first, skipping recent failures"""
+    retry_before = timezone.now() - timedelta(seconds=get_config()["RETRY_AFTER"])
+    return (
+        Book.objects.filter(cover_key="")
+        .exclude(thumbnail__isnull=True)
+        .exclude(thumbnail="")
+        .filter(Q(cover_checked_at__isnull=True) | Q(cover_checked_at__lt=retry_before))
+        .order_by(F("cover_checked_at").asc(nulls_first=True), "pk")
+    )
+
+
+def fetch_cover(book):
+    """Download and store one book's cover. Returns (cover key, "") or ("", why it failed).
+
+    Never raises, so one bad image can't stop a batch. Touches only storage
+    and the network, so it is safe to run on worker threads.
+    """
+    try:
+        cover_key = store(download(book.thumbnail))
+    except CoverError as e:
+        logger.info("Cover for %s not cached: %s", book.pk, e)
+        return "", str(e)
+    except Exception as e:
+        logger.exception("Unexpected error caching the cover for %s", book.pk)
+        return "", f"{type(e).__name__}: {e}"
+    logger.debug("Stored cover %s for %s", cover_key, book.pk)
+    return cover_key, ""
+
+
+def record_cover(book, cover_key, error=""):
+    """Save the outcome of fetch_cover on the book"""
+    error = error[: Book._meta.get_field("cover_error").max_length]
+    # update() rather than save() so a concurrent edit to the book isn't overwritten
+    Book.objects.filter(pk=book.pk).update(cover_key=cover_key, cover_error=error, cover_checked_at=timezone.now())
+    book.cover_key, book.cover_error = cover_key, error
+
+
+def cache_cover(book):
+    """Fetch and record one book's cover. Returns True once it is served locally"""
+    record_cover(book, *fetch_cover(book))
+    return bool(book.cover_key)
+
+
+def cover_sources(book, width):
+    """srcset strings for a cover displayed at `width` CSS pixels, or None if not cached.
+
+    Includes the next width up so high-density screens get a sharp image.
+    """
+    if not book.cover_key:
+        return None
+    widths = sorted(get_config()["WIDTHS"])
+    chosen = [w for w in widths if w >= width][:2] or widths[-1:]
+    return {
+        "src": cover_url(book.cover_key, chosen[0], "jpg"),
+        "jpg": ", ".join(f"{cover_url(book.cover_key, w, 'jpg')} {w}w" for w in chosen),
+        "webp": ", ".join(f"{cover_url(book.cover_key, w, 'webp')} {w}w" for w in chosen),
+    }
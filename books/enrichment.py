@@ -0,0 +1,220 @@
+"""
+Background enrichment of Book rows from Google Books.
+
+UserBook.assign_book_to_user can create skeleton rows with only an id, and
+ratings, links and covers drift over time. enrich_books picks up skeletons
+first, then books whose metadata hasn't been refreshed for STALE_AFTER_DAYS.
+It fetches their volumes on a thread pool under a shared rate limit and
+writes each batch back with one bulk_update. Fetches run at background
+priority, so enrichment stops before it eats into the quota kept for searches.
+Books Google couldn't provide are skipped for a backoff that doubles with
+each failure, so dead ids don't cost quota on every run.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from requests.exceptions import JSONDecodeError, RequestException
+
+from . import google_books
+from .models import Book
+from .quota import QuotaExceededError, background_priority
+from .volumes import book_defaults, process_book_item
+
+logger = logging.getLogger(__name__)
+
+ENRICHMENT_DEFAULTS = {
+    "STALE_AFTER_DAYS": 30,  # Refresh ratings/links of complete books this often
+    "BATCH_SIZE": 40,  # Volumes fetched per bulk_update
+    "WORKERS": 4,  # Concurrent Google requests
+    "RATE_LIMIT": 5.0,  # Google requests per second across all workers
+    "RETRY_AFTER": 60 * 60,  # Seconds before a failed book is tried again, doubled per failure
+    "RETRY_MAX": 30 * 24 * 60 * 60,  # Longest wait between attempts
+}
+
+# Values process_book_item uses for "Google didn't say"; never written over real data
+MISSING = (None, "", "N/A")
+
+
+def get_config():
+    return {**ENRICHMENT_DEFAULTS, **getattr(settings, "BOOK_ENRICHMENT", {})}
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+PHASES = ("skeleton", "stale")
+
+
+def needs_enrichment(phase, stale_after_days=None):
+    """Books to enrich in a phase: skeletons (no title), or complete books not refreshed recently.
+
+    Books still backing off from a failed fetch are left out of both.
+    """
+    now = timezone.now()
+    books = Book.objects.filter(Q(metadata_retry_at__isnull=True) | Q(metadata_retry_at__lte=now))
+    if phase == "skeleton":
+        return books.filter(title="")
+    if stale_after_days is None:
+        stale_after_days = get_config()["STALE_AFTER_DAYS"]
+    stale_before = now - timedelta(days=stale_after_days)
+    return books.exclude(title="").filter(
+        Q(metadata_refreshed_at__isnull=True) | Q(metadata_refreshed_at__lt=stale_before)
+    )
+
+
+def retry_delay(failures):
+    """Backoff after the given number of consecutive failed fetches"""
+    config = get_config()
+    return timedelta(seconds=min(config["RETRY_AFTER"] * 2 ** (failures - 1), config["RETRY_MAX"]))
+
+
+@contextmanager
+def worker_pool(workers):
+    """Thread pool for enrich_batch that closes its threads' database connections on exit.
+
+    Workers pay for each fetch from the quota table, so every thread opens a
+    connection of its own, and nothing else would close them.
+    """
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="enrich-books") as pool:
+        try:
+            yield pool
+        finally:
+            # One task per thread: the barrier keeps each busy until all have been handed one
+            barrier = threading.Barrier(workers)
+
+            def close(_):
+                barrier.wait()
+                connections.close_all()
+
+            list(pool.map(close, range(workers)))
+
+
+def fetch_volume(volume_id, limiter):
+    """Normalized volume dict for one id, or None if Google couldn't provide it"""
+    limiter.wait()
+    try:
+        with background_priority():
+            return process_book_item(google_books.get_client().get_volume(volume_id))
+    except (google_books.CircuitOpenError, QuotaExceededError):
+        raise  # Stop the run rather than burn through the batch
+    except (RequestException, JSONDecodeError) as e:
+        logger.info("Could not fetch volume %s: %s", volume_id, e)
+        return None
+
+
+def _truncate(field_name, value):
+    max_length = Book._meta.get_field(field_name).max_length
+    if max_length and isinstance(value, str):
+        return value[:max_length]
+    return value
+
+
+def apply_volume(book, volume, taken_identifiers):
+    """Copy fetched values onto the book in memory. Returns the names of changed fields.
+
+    Known values are never replaced by missing ones, and an ISBN already
+    used by another book is left off rather than failing the whole batch.
+    """
+    changed = set()
+    for field_name, value in book_defaults(volume).items():
+        if value in MISSING:
+            continue
+        value = _truncate(field_name, value)
+        if getattr(book, field_name) == value:
+            continue
+        if field_name.startswith("ID_"):
+            if (field_name, value) in taken_identifiers:
+                logger.info("%s %s of %s already belongs to another book", field_name, value, book.pk)
+                continue
+            taken_identifiers.add((field_name, value))  # Claimed for the rest of the batch
+        setattr(book, field_name, value)
+        changed.add(field_name)
+
+    if "thumbnail" in changed:
+        # Let the cover worker download the new image
+        book.cover_key, book.cover_checked_at = "", None
+        changed.update(("cover_key", "cover_checked_at"))
+    return changed
+
+
+def _taken_identifiers(volumes):
+    """(field, value) pairs from the fetched volumes that some book already holds"""
+    wanted = Q()
+    for volume in volumes:
+        for field_name in ("ID_ISBN_13", "ID_ISBN_10", "ID_OTHER"):
+            if volume[field_name] not in MISSING:
+                wanted |= Q(**{field_name: volume[field_name]})
+    if not wanted:
+        return set()
+    taken = set()
+    for row in Book.objects.filter(wanted).values("ID_ISBN_13", "ID_ISBN_10", "ID_OTHER"):
+        taken.update((field_name, value) for field_name, value in row.items() if value)
+    return taken
+
+
+def enrich_batch(books, pool, limiter):
+    """Fetch and save one batch. Returns (updated, failed) counts"""
+    volumes = list(pool.map(lambda book: fetch_volume(book.pk, limiter), books))
+    fetched = [(book, volume) for book, volume in zip(books, volumes) if volume is not None]
+    taken = _taken_identifiers([volume for _, volume in fetched])
+
+    now = timezone.now()
+    fields = {"metadata_refreshed_at", "metadata_failures", "metadata_retry_at"}
+    for book, volume in fetched:
+        fields |= apply_volume(book, volume, taken)
+        book.metadata_refreshed_at = now
+        book.metadata_failures, book.metadata_retry_at = 0, None
+
+    failed = [book for book, volume in zip(books, volumes) if volume is None]
+    for book in failed:
+        book.metadata_failures += 1
+        book.metadata_retry_at = now + retry_delay(book.metadata_failures)
+
+    if fetched:
+        Book.objects.bulk_update([book for book, _ in fetched], sorted(fields))
+    if failed:
+        Book.objects.bulk_update(failed, ["metadata_failures", "metadata_retry_at"])
+    return len(fetched), len(failed)
+
+
+def iter_batches(checkpoint=None, stale_after_days=None, batch_size=None):
+    """Yield (checkpoint, batch) pairs: skeletons first, then stale books.
+
+    A checkpoint is {"phase": ..., "after": last google_book_id}; pass the last
+    one yielded to resume. Keyset pagination on the primary key means rows
+    updated by earlier batches don't shift later pages.
+    """
+    batch_size = batch_size or get_config()["BATCH_SIZE"]
+    checkpoint = checkpoint or {"phase": PHASES[0], "after": ""}
+    for phase in PHASES[PHASES.index(checkpoint["phase"]):]:
+        after = checkpoint["after"] if phase == checkpoint["phase"] else ""
+        queryset = needs_enrichment(phase, stale_after_days).order_by("pk")
+        while True:
+            batch = list(queryset.filter(pk__gt=after)[:batch_size])
+            if not batch:
+                break
+            after = batch[-1].pk
+            yield {"phase": phase, "after": after}, batch
@@ -0,0 +1,341 @@
+"""
+Google Books API client.
+
+All calls to Google go through one pooled, keep-alive requests.Session per
+process (or an httpx.AsyncClient for async views) with connect/read
+timeouts, bounded retries with jittered backoff for 429/5xx responses, and
+a circuit breaker so a failing upstream is skipped quickly instead of tying
+up workers. Each request is first paid for from the shared quota in
+books/quota.py.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, HTTPError, JSONDecodeError, RequestException, Timeout
+
+from django.conf import settings
+
+from .quota import current_priority, google_books_quota
+from .search_cache import make_key, search_cache
+from .singleflight import search_flight
+
+logger = logging.getLogger(__name__)
+
+CLIENT_DEFAULTS = {
+    "BASE_URL": "https://www.googleapis.com/books/v1",
+    "CONNECT_TIMEOUT": 3.05,
+    "READ_TIMEOUT": 10,
+    "MAX_RETRIES": 2,  # Retries after the first attempt
+    "BACKOFF_BASE": 0.25,  # Seconds, doubled per retry before jitter
+    "BACKOFF_MAX": 4,
+    "POOL_MAXSIZE": 10,  # Keep-alive connections kept per process
+    "BREAKER_FAILURE_THRESHOLD": 5,  # Consecutive failed calls before opening
+    "BREAKER_RESET_TIMEOUT": 30,  # Seconds to stay open before a trial call
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RequestException):
+    """Raised instead of calling Google while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Thread-safe consecutive-failure circuit breaker.
+
+    closed -> open after `failure_threshold` failed calls in a row.
+    open -> half-open once `reset_timeout` has passed, letting one trial call through.
+    half-open -> closed on success, or straight back to open on failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def allow_request(self):
+        """Return True if a call may go upstream now"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.OPEN:
+                return False
+            if state == self.HALF_OPEN:
+                # Only one trial call at a time; others fail fast until it resolves
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state != self.CLOSED or self._failures >= self.failure_threshold:
+                if self._state == self.CLOSED:
+                    logger.warning("Google Books circuit breaker opened after %s failures", self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class BaseGoogleBooksClient:
+    """Configuration, breaker and retry policy shared by the sync and async clients"""
+
+    def __init__(self, api_key=None, config=None, breaker=None, quota=None):
+        self.api_key = api_key if api_key is not None else settings.GOOGLE_BOOKS_API_KEY
+        self.config = {**CLIENT_DEFAULTS, **getattr(settings, "GOOGLE_BOOKS_CLIENT", {}), **(config or {})}
+        self.timeout = (self.config["CONNECT_TIMEOUT"], self.config["READ_TIMEOUT"])
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=self.config["BREAKER_FAILURE_THRESHOLD"],
+            reset_timeout=self.config["BREAKER_RESET_TIMEOUT"],
+        )
+        # Every attempt, retries included, is paid for from the shared quota
+        self.quota = quota or google_books_quota
+
+    def _prepare(self, path, params):
+        """Check the breaker and return the (url, params) for a call"""
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("Book search is temporarily unavailable, please try again shortly")
+        if self.api_key:
+            params = {**params, "key": self.api_key}
+        return self.config["BASE_URL"] + path, params
+
+    @property
+    def attempts(self):
+        return self.config["MAX_RETRIES"] + 1
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring a numeric Retry-After"""
+        if retry_after and retry_after.isdigit():
+            return min(self.config["BACKOFF_MAX"], int(retry_after))
+        delay = min(self.config["BACKOFF_MAX"], self.config["BACKOFF_BASE"] * (2 ** attempt))
+        return random.uniform(0, delay)
+
+    @staticmethod
+    def _volumes_params(query, start_index, max_results):
+        return {"q": query, "startIndex": start_index, "maxResults": max_results}
+
+
+class GoogleBooksClient(BaseGoogleBooksClient):
+    """Pooled HTTP client for the Google Books volumes API"""
+
+    def __init__(self, api_key=None, config=None, breaker=None, quota=None):
+        super().__init__(api_key=api_key, config=config, breaker=breaker, quota=quota)
+
+        # Retries are handled in _get so they share the breaker and backoff policy
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.config["POOL_MAXSIZE"], max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def search_volumes(self, query, start_index=0, max_results=12):
+        """Return the raw JSON of a volumes search"""
+        return self._get("/volumes", self._volumes_params(query, start_index, max_results))
+
+    def get_volume(self, volume_id):
+        """Return the raw JSON of a single volume"""
+        return self._get(f"/volumes/{volume_id}", {})
+
+    def _get(self, path, params):
+        url, params = self._prepare(path, params)
+
+        for attempt in range(self.attempts):
+            response = None
+            self.quota.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    data = response.json()
+                    self.breaker.record_success()
+                    return data
+                error = HTTPError(f"{response.status_code} error from Google Books", response=response)
+            except (ConnectionError, Timeout) as e:
+                error = e
+            except HTTPError:
+                # Other 4xx errors are our fault, not the upstream's: don't trip the breaker
+                self.breaker.record_success()
+                raise
+
+            if attempt + 1 < self.attempts:
+                delay = self._backoff(attempt, response.headers.get("Retry-After") if response is not None else None)
+                logger.info("Google Books request failed (%s), retry %s in %.2fs", error, attempt + 1, delay)
+                time.sleep(delay)
+
+        self.breaker.record_failure()
+        raise error
+
+
+class AsyncGoogleBooksClient(BaseGoogleBooksClient):
+    """Non-blocking client for async views, with the same retry and breaker policy.
+
+    httpx errors are re-raised as their requests equivalents so callers handle
+    both clients with the same `except RequestException`.
+    """
+
+    def __init__(self, api_key=None, config=None, breaker=None, quota=None):
+        super().__init__(api_key=api_key, config=config, breaker=breaker, quota=quota)
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.config["READ_TIMEOUT"], connect=self.config["CONNECT_TIMEOUT"]),
+            limits=httpx.Limits(max_keepalive_connections=self.config["POOL_MAXSIZE"]),
+        )
+
+    async def search_volumes(self, query, start_index=0, max_results=12):
+        """Return the raw JSON of a volumes search"""
+        return await self._get("/volumes", self._volumes_params(query, start_index, max_results))
+
+    async def get_volume(self, volume_id):
+        """Return the raw JSON of a single volume"""
+        return await self._get(f"/volumes/{volume_id}", {})
+
+    async def _get(self, path, params):
+        url, params = self._prepare(path, params)
+
+        for attempt in range(self.attempts):
+            response = None
+            await sync_to_async(self.quota.acquire)()
+            try:
+                response = await self.http.get(url, params=params)
+                if response.status_code not in RETRY_STATUSES:
+                    if response.is_error:
+                        # Other 4xx errors are our fault, not the upstream's: don't trip the breaker
+                        self.breaker.record_success()
+                        raise HTTPError(f"{response.status_code} error from Google Books", response=response)
+                    try:
+                        data = response.json()
+                    except ValueError as e:
+                        raise JSONDecodeError(str(e), response.text, 0) from e
+                    self.breaker.record_success()
+                    return data
+                error = HTTPError(f"{response.status_code} error from Google Books", response=response)
+            except httpx.TimeoutException as e:
+                error = Timeout(str(e))
+            except httpx.TransportError as e:
+                error = ConnectionError(str(e))
+
+            if attempt + 1 < self.attempts:
+                delay = self._backoff(attempt, response.headers.get("Retry-After") if response is not None else None)
+                logger.info("Google Books request failed (%s), retry %s in %.2fs", error, attempt + 1, delay)
+                await asyncio.sleep(delay)
+
+        self.breaker.record_failure()
+        raise error
+
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    """Return this process's shared client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GoogleBooksClient()
+    return _client
+
+
+def get_async_client():
+    """Return the async client for the running event loop.
+
+    httpx connection pools can't be shared between event loops, so one client
+    is kept per loop. Under an ASGI server that is one per process; under WSGI,
+    async_to_sync runs each async view on a fresh loop. Either way the client
+    is closed when its loop shuts down. The circuit breaker is shared with the
+    sync client.
+    """
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        client = AsyncGoogleBooksClient(breaker=get_client().breaker)
+        closer = _close_at_shutdown(client)
+        # Start it on this loop so the loop tracks it; the entry keeps it alive
+        asyncio.ensure_future(anext(closer))
+        entry = _async_clients[loop] = (client, closer)
+    return entry[0]
+
+
+async def _close_at_shutdown(client):
+    """Wait until the loop finalizes its async generators, then close `client`.
+
+    asyncio.run() and async_to_sync both call loop.shutdown_asyncgens() before
+    closing the loop, which is the only shutdown hook a loop offers.
+    """
+    try:
+        yield
+    finally:
+        await client.http.aclose()
+
+
+def search_volumes(query, start_index=0, max_results=12):
+    """Search Google Books, serving repeat searches from the search cache.
+
+    Concurrent identical searches that miss the cache share one upstream call.
+    """
+    data = search_cache.get(query, start_index, max_results)
+    if data is None:
+        data = fetch_search(query, start_index, max_results)
+    return data
+
+
+def _flight_key(query, start_index, max_results):
+    # Calls only coalesce at the same priority: otherwise an interactive search
+    # could wait on a background prefetch and share its refusal at the reserve
+    return f"{make_key(query, start_index, max_results)}:{current_priority()}"
+
+
+def fetch_search(query, start_index=0, max_results=12):
+    """Call Google (coalesced with identical in-flight searches) and cache the response"""
+    def fetch():
+        result = get_client().search_volumes(query, start_index, max_results)
+        search_cache.set(query, start_index, max_results, result)
+        return result
+
+    return search_flight.do(
+        _flight_key(query, start_index, max_results),
+        fetch,
+        recheck=lambda: search_cache.peek(query, start_index, max_results),
+    )
+
+
+async def asearch_volumes(query, start_index=0, max_results=12):
+    """Async search_volumes: only the cache lookups run in a worker thread"""
+    data = await sync_to_async(search_cache.get)(query, start_index, max_results)
+    if data is None:
+        async def fetch():
+            result = await get_async_client().search_volumes(query, start_index, max_results)
+            await sync_to_async(search_cache.set)(query, start_index, max_results, result)
+            return result
+
+        data = await search_flight.ado(_flight_key(query, start_index, max_results), fetch)
+    return data
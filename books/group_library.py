@@ -0,0 +1,157 @@
+"""
+A group's library: every book owned by any of its members.
+
+One aggregate query over UserBook restricted to the group's members gives
+each book once, with how many members own it and how many of those copies
+are free to borrow. Pages are keyset-paginated on (title, google_book_id)
+and cached in a Django cache shared by all workers.
+
+Cache entries are namespaced by a per-group version. Joining or leaving
+the group, and any member adding, removing or lending a book, moves the
+group to a new version once the write commits, so stale pages are never
+read again and simply expire.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Book, GroupMember, Transaction, UserBook
+from .pagination import keyset_page
+
+logger = logging.getLogger(__name__)
+
+GROUP_LIBRARY_DEFAULTS = {
+    "ALIAS": "shared",  # Django cache shared by every worker
+    "TTL": 10 * 60,  # Also bounds staleness from edits to the books themselves
+    "PER_PAGE": 24,
+}
+
+ORDERING = ("title", "google_book_id")
+
+
+def library_queryset(group):
+    """Books owned by members of `group`, annotated with copies, on_loan and available"""
+    members = GroupMember.objects.filter(group=group).values("user")
+    active_loans = (
+        Transaction.objects.filter(book=OuterRef("pk"), returned_datetime__isnull=True, owner__in=members)
+        .order_by()
+        .values("book")
+        .annotate(n=Count("pk"))
+        .values("n")
+    )
+    return (
+        # The filter and Count share the UserBook join, so copies only counts members' copies
+        Book.objects.filter(book_owners__user__in=Subquery(members))
+        .annotate(
+            copies=Count("book_owners"),
+            on_loan=Coalesce(Subquery(active_loans, output_field=IntegerField()), Value(0)),
+        )
+        .annotate(available=F("copies") - F("on_loan"))
+        .defer("description", "search_vector")
+    )
+
+
+def _version_key(group_id):
+    return f"books:group_library:{group_id}:version"
+
+
+class GroupLibraryCache:
+    """Versioned cache of group library pages"""
+
+    def __init__(self, config=None):
+        self._config = config
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @property
+    def config(self):
+        # Read lazily so override_settings in tests is honoured
+        if self._config is not None:
+            return self._config
+        return {**GROUP_LIBRARY_DEFAULTS, **getattr(settings, "GROUP_LIBRARY", {})}
+
+    @property
+    def backend(self):
+        return caches[self.config["ALIAS"]]
+
+    def _version(self, group_id):
+        key = _version_key(group_id)
+        version = self.backend.get(key)
+        if version is None:
+            # add() so concurrent first readers agree on one version
+            self.backend.add(key, time.time_ns(), timeout=None)
+            version = self.backend.get(key)
+        return version
+
+    def page(self, group, after=None, before=None):
+        """One KeysetPage of the group's library, from the cache when possible"""
+        raw = f"{group.pk}|{self._version(group.pk)}|{after or ''}|{before or ''}"
+        key = "books:group_library:" + hashlib.sha256(raw.encode()).hexdigest()
+        page = self.backend.get(key)
+        if page is not None:
+            self._count("hits")
+            return page
+
+        self._count("misses")
+        page = keyset_page(library_queryset(group), ORDERING, self.config["PER_PAGE"], after=after, before=before)
+        self.backend.set(key, page, timeout=self.config["TTL"])
+        return page
+
+    def invalidate(self, group_ids):
+        """Move the groups to fresh versions. Versions are timestamps, so they are never reused"""
+        group_ids = set(group_ids)
+        if not group_ids:
+            return
+        version = time.time_ns()
+        self.backend.set_many({_version_key(group_id): version for group_id in group_ids}, timeout=None)
+        self._count("invalidations", len(group_ids))
+
+    def invalidate_on_commit(self, group_ids):
+        # Until the write commits, a reader could cache the old rows under the new version
+        group_ids = list(group_ids)
+        transaction.on_commit(lambda: self.invalidate(group_ids))
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def stats(self):
+        """Hit/miss counters for this process"""
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# One instance per process; the entries themselves live in the shared cache
+group_library = GroupLibraryCache()
+
+
+def _groups_of(user_id):
+    return GroupMember.objects.filter(user_id=user_id).values_list("group_id", flat=True)
+
+
+@receiver([post_save, post_delete], sender=GroupMember)
+def invalidate_on_membership_change(sender, instance, **kwargs):
+    group_library.invalidate_on_commit([instance.group_id])
+
+
+@receiver([post_save, post_delete], sender=UserBook)
+def invalidate_on_ownership_change(sender, instance, **kwargs):
+    group_library.invalidate_on_commit(_groups_of(instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+def invalidate_on_loan_change(sender, instance, **kwargs):
+    group_library.invalidate_on_commit(_groups_of(instance.owner_id))
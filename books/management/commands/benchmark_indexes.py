@@ -0,0 +1,167 @@
+"""
+Show what the hot-path indexes do for the queries they were added for.
+
+Seeds a large synthetic data set, then runs each query under EXPLAIN
+ANALYZE twice: with the indexes, and again after dropping them. Everything
+happens in one transaction that is rolled back at the end, so the seeded
+rows disappear and the indexes come back.
+
+The dropped indexes stay locked (blocking other users of those tables) until
+the rollback, so point it at a development copy of the database:
+
+    python manage.py benchmark_indexes --users 2000 --books 20000 --repeat 5
+"""
+
+import random
+import statistics
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from books.models import Book, CustomUser, RequestBook, Transaction, UserBook, Wishlist
+
+# The indexes under test; Command.queries() has the filters they serve
+BENCHMARKED_INDEXES = (
+    "wishlist_active_user_idx",
+    "wishlist_active_book_idx",
+    "transaction_active_book_idx",
+    "requestbook_open_owner_idx",
+    "requestbook_open_requester_idx",
+    "book_title_id_idx",
+)
+
+
+class Rollback(Exception):
+    """Raised to undo the seeded rows and dropped indexes"""
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN ANALYZE the hot filter queries with and without their indexes on a seeded data set"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=2000, help="Members to seed")
+        parser.add_argument("--books", type=int, default=20000, help="Books to seed")
+        parser.add_argument("--per-user", type=int, default=40, help="Books, wishes and requests seeded per member")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query; the median is reported")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed, for repeatable data sets")
+        parser.add_argument("--plans", action="store_true", help="Print the full plans as well as the summary")
+        parser.add_argument("--force", action="store_true", help="Run even though DEBUG is off")
+
+    def handle(self, *args, **options):
+        if not (settings.DEBUG or options["force"]):
+            raise CommandError("This locks the benchmarked tables while it runs; use a development database (or --force)")
+
+        try:
+            with transaction.atomic():
+                member, book = self.seed(options)
+                queries = self.queries(member, book)
+                after = {label: self.measure(queryset, options) for label, queryset in queries}
+                with connection.cursor() as cursor:
+                    for index in BENCHMARKED_INDEXES:
+                        cursor.execute(f"DROP INDEX IF EXISTS {connection.ops.quote_name(index)}")
+                before = {label: self.measure(queryset, options) for label, queryset in queries}
+                raise Rollback
+        except Rollback:
+            pass
+
+        for label, _ in queries:
+            self.report(label, before[label], after[label], options)
+
+    def seed(self, options):
+        rng = random.Random(options["seed"])
+        now = timezone.now()
+        self.stdout.write(f"Seeding {options['users']} members, {options['books']} books...")
+
+        books = Book.objects.bulk_create(
+            (Book(google_book_id=f"bench_{i:07d}", title=f"Benchmark {rng.random():.12f}") for i in range(options["books"])),
+            batch_size=5000,
+        )
+        users = CustomUser.objects.bulk_create(
+            (CustomUser(username=f"bench_user_{i}", password="!") for i in range(options["users"])),
+            batch_size=5000,
+        )
+
+        owned, wishes, loans, requests = [], [], [], []
+        for user in users:
+            picks = rng.sample(books, min(2 * options["per_user"], len(books)))
+            shelf, wished = picks[: options["per_user"]], picks[options["per_user"]:]
+            owned += (UserBook(user=user, book=book) for book in shelf)
+            # Like a real history, most wishes were later removed, loans returned and requests decided
+            wishes += (
+                Wishlist(user=user, book=book, removed_datetime=now if rng.random() < 0.9 else None) for book in wished
+            )
+            for n, book in enumerate(shelf[: options["per_user"] // 2]):
+                borrower = rng.choice(users)
+                if borrower == user:
+                    continue
+                loans.append(
+                    Transaction(owner=user, borrower=borrower, book=book, returned_datetime=now if rng.random() < 0.9 else None)
+                )
+                decided = rng.random() < 0.95
+                requests.append(
+                    RequestBook(
+                        owner=user,
+                        requester=borrower,
+                        book=book,
+                        request_datetime=now - timedelta(minutes=n),
+                        decision=rng.random() < 0.5 if decided else None,
+                        decision_datetime=now if decided else None,
+                    )
+                )
+
+        for model, rows in ((UserBook, owned), (Wishlist, wishes), (Transaction, loans), (RequestBook, requests)):
+            model.objects.bulk_create(rows, batch_size=5000)
+            self.stdout.write(f"  {len(rows)} {model._meta.verbose_name_plural}")
+
+        with connection.cursor() as cursor:
+            for model in (Book, UserBook, Wishlist, Transaction, RequestBook):
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+        return rng.choice(users), rng.choice(books)
+
+    @staticmethod
+    def queries(member, book):
+        """The filters the indexes were added for, written as the app writes them"""
+        return [
+            ("open wishes of a member", Wishlist.objects.filter(user=member, removed_datetime__isnull=True)),
+            ("open wishes for a book", Wishlist.objects.filter(book=book, removed_datetime__isnull=True)),
+            ("active loans of a book", Transaction.objects.filter(book=book, returned_datetime__isnull=True)),
+            ("open requests to an owner", RequestBook.objects.filter(owner=member, state=RequestBook.State.OPEN)),
+            ("open requests by a member", RequestBook.objects.filter(requester=member, state=RequestBook.State.OPEN)),
+            ("first catalog page by title", Book.objects.order_by("title", "google_book_id")[:24]),
+        ]
+
+    @staticmethod
+    def measure(queryset, options):
+        sql, params = queryset.query.sql_with_params()
+        timings = []
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)  # Warm the cache, so whichever variant runs first isn't penalised
+            for _ in range(options["repeat"]):
+                cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                plan = plan[0] if isinstance(plan, list) else plan
+                timings.append(plan["Execution Time"])
+            cursor.execute(f"EXPLAIN {sql}", params)
+            text = "\n".join(row[0] for row in cursor.fetchall())
+        return {"ms": statistics.median(timings), "scan": _scan(plan["Plan"]), "plan": text}
+
+    def report(self, label, before, after, options):
+        speedup = before["ms"] / after["ms"] if after["ms"] else float("inf")
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        self.stdout.write(f"  before  {before['ms']:9.3f}ms  {before['scan']}")
+        self.stdout.write(f"  after   {after['ms']:9.3f}ms  {after['scan']}  ({speedup:.1f}x)")
+        if options["plans"]:
+            for name, result in (("before", before), ("after", after)):
+                self.stdout.write(f"  -- {name}\n" + "\n".join(f"     {line}" for line in result["plan"].splitlines()))
+
+
+def _scan(plan):
+    """How a JSON plan reads its rows, e.g. "Index Only Scan using wishlist_active_user_idx" """
+    if plan.get("Index Name"):
+        return f"{plan['Node Type']} using {plan['Index Name']}"
+    children = plan.get("Plans", [])
+    # Descend through Limit, Sort, Bitmap Heap Scan etc. to the node that picks the rows
+    return _scan(children[0]) if children else plan["Node Type"]
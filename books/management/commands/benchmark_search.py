@@ -0,0 +1,140 @@
+"""
+Compare concurrent-search throughput of book_search and book_search_async.
+
+Both views run in-process against a local fake Google Books server that
+answers every search after a fixed delay, so the numbers show how each path
+behaves while waiting on the upstream rather than measuring Google itself.
+The sync view gets a fixed pool of worker threads (like a WSGI server); the
+async view runs every in-flight request on one event loop (like ASGI).
+
+    python manage.py benchmark_search --requests 200 --concurrency 50 --latency 0.2
+"""
+
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+
+class FakeGoogleBooksHandler(BaseHTTPRequestHandler):
+    """Answers any GET with a page of 12 volumes after `server.latency` seconds"""
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        body = json.dumps({
+            "totalItems": 120,
+            "items": [
+                {"id": f"bench_{i}", "volumeInfo": {"title": f"Benchmark Book {i}", "authors": ["Author"]}}
+                for i in range(12)
+            ],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output readable
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent book_search throughput for the sync and async views against a fake upstream"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Searches per run")
+        parser.add_argument("--concurrency", type=int, default=50, help="Simultaneous in-flight searches")
+        parser.add_argument("--sync-threads", type=int, default=4, help="Worker threads available to the sync view")
+        parser.add_argument("--latency", type=float, default=0.2, help="Fake upstream response time in seconds")
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGoogleBooksHandler)
+        server.latency = options["latency"]
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        locmem = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        overrides = override_settings(
+            GOOGLE_BOOKS_CLIENT={
+                **getattr(settings, "GOOGLE_BOOKS_CLIENT", {}),
+                "BASE_URL": f"http://127.0.0.1:{server.server_port}/books/v1",
+                "POOL_MAXSIZE": options["concurrency"],
+                "MAX_RETRIES": 0,
+            },
+            # Don't spend (or be limited by) the real Google Books quota on fake requests
+            GOOGLE_BOOKS_QUOTA={**getattr(settings, "GOOGLE_BOOKS_QUOTA", {}), "ENABLED": False},
+            # Unique queries miss the cache anyway; keep its writes out of the database
+            CACHES={"default": locmem, "google_books": locmem, "shared": locmem},
+            MIDDLEWARE=[m for m in settings.MIDDLEWARE if not m.startswith("debug_toolbar")],
+            ALLOWED_HOSTS=["testserver"],
+        )
+
+        try:
+            with overrides:
+                sync_result = self.run_sync(options)
+                async_result = self.run_async(options)
+        finally:
+            server.shutdown()
+
+        self.report("sync  (book_search)", sync_result, options)
+        self.report("async (book_search_async)", async_result, options)
+        speedup = async_result["throughput"] / sync_result["throughput"]
+        self.stdout.write(self.style.SUCCESS(f"Async throughput is {speedup:.1f}x sync"))
+
+    def run_sync(self, options):
+        url = reverse("book_search")
+
+        def search(i):
+            start = time.perf_counter()
+            response = Client().get(url, {"query": f"sync benchmark {i}"})
+            assert response.status_code == 200, response.status_code
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["sync_threads"]) as pool:
+            latencies = list(pool.map(search, range(options["requests"])))
+        return self.summarise(latencies, time.perf_counter() - start)
+
+    def run_async(self, options):
+        url = reverse("book_search_async")
+
+        async def main():
+            client = AsyncClient()
+            limit = asyncio.Semaphore(options["concurrency"])
+
+            async def search(i):
+                async with limit:
+                    start = time.perf_counter()
+                    response = await client.get(url, {"query": f"async benchmark {i}"})
+                    assert response.status_code == 200, response.status_code
+                    return time.perf_counter() - start
+
+            return await asyncio.gather(*(search(i) for i in range(options["requests"])))
+
+        start = time.perf_counter()
+        latencies = asyncio.run(main())
+        return self.summarise(latencies, time.perf_counter() - start)
+
+    @staticmethod
+    def summarise(latencies, elapsed):
+        latencies = sorted(latencies)
+        return {
+            "elapsed": elapsed,
+            "throughput": len(latencies) / elapsed,
+            "p50": statistics.median(latencies),
+            "p95": latencies[int(len(latencies) * 0.95) - 1],
+        }
+
+    def report(self, label, result, options):
+        self.stdout.write(
+            f"{label:<28} {options['requests']} searches in {result['elapsed']:.2f}s  "
+            f"{result['throughput']:.1f} req/s  p50 {result['p50'] * 1000:.0f}ms  p95 {result['p95'] * 1000:.0f}ms"
+        )
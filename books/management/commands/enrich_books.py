@@ -0,0 +1,78 @@
+"""
+Fill in skeleton books and refresh stale metadata from Google Books.
+
+Progress is written to a checkpoint file after every batch, so an
+interrupted run (Ctrl-C, deploy, open circuit breaker) picks up where it
+stopped. Running out of background quota stops a run the same way. The file
+is removed once a run completes.
+
+    python manage.py enrich_books --workers 4 --rate 5
+    python manage.py enrich_books --restart
+"""
+
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from books import google_books
+from books.enrichment import RateLimiter, enrich_batch, get_config, iter_batches, worker_pool
+from books.quota import QuotaExceededError
+
+DEFAULT_CHECKPOINT = os.path.join(settings.BASE_DIR, ".enrich_books.checkpoint.json")
+
+
+class Command(BaseCommand):
+    help = "Fetch metadata for skeleton and stale Book rows from Google Books in rate-limited batches"
+
+    def add_arguments(self, parser):
+        config = get_config()
+        parser.add_argument("--batch-size", type=int, default=config["BATCH_SIZE"], help="Books per bulk_update")
+        parser.add_argument("--workers", type=int, default=config["WORKERS"], help="Concurrent Google requests")
+        parser.add_argument("--rate", type=float, default=config["RATE_LIMIT"], help="Google requests per second")
+        parser.add_argument(
+            "--stale-days", type=int, default=config["STALE_AFTER_DAYS"],
+            help="Refresh complete books not updated for this many days",
+        )
+        parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Checkpoint file path")
+        parser.add_argument("--restart", action="store_true", help="Ignore any saved checkpoint")
+
+    def handle(self, *args, **options):
+        path = options["checkpoint"]
+        checkpoint = None if options["restart"] else self.load_checkpoint(path)
+        if checkpoint:
+            self.stdout.write(f"Resuming {checkpoint['phase']} books after {checkpoint['after']}")
+
+        limiter = RateLimiter(options["rate"])
+        updated = failed = 0
+        batches = iter_batches(checkpoint, options["stale_days"], options["batch_size"])
+        with worker_pool(options["workers"]) as pool:
+            for checkpoint, books in batches:
+                try:
+                    batch_updated, batch_failed = enrich_batch(books, pool, limiter)
+                except (google_books.CircuitOpenError, QuotaExceededError) as e:
+                    # The checkpoint still points before this batch, so it is retried on resume
+                    raise CommandError(f"{e}. Progress saved to {path}; run again to resume.")
+                updated += batch_updated
+                failed += batch_failed
+                self.save_checkpoint(path, checkpoint)
+                self.stdout.write(f"{checkpoint['phase']}: {updated} updated, {failed} failed (up to {checkpoint['after']})")
+
+        if os.path.exists(path):
+            os.remove(path)
+        self.stdout.write(self.style.SUCCESS(f"Enrichment complete: {updated} updated, {failed} failed"))
+
+    def load_checkpoint(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save_checkpoint(self, path, checkpoint):
+        # Write then rename, so a crash mid-write can't leave a corrupt checkpoint
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, path)
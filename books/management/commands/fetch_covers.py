@@ -0,0 +1,43 @@
+"""
+Background worker that downloads and resizes book covers into MEDIA_ROOT.
+
+Run once to catch up, or with --loop under a process manager so covers for
+newly added books appear within a poll interval:
+
+    python manage.py fetch_covers --loop --workers 4
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from books.covers import fetch_cover, pending_books, record_cover
+
+
+class Command(BaseCommand):
+    help = "Cache Google Books cover images locally as resized WebP and JPEG files"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Books claimed per pass")
+        parser.add_argument("--workers", type=int, default=4, help="Concurrent downloads")
+        parser.add_argument("--loop", action="store_true", help="Keep polling for new books instead of exiting")
+        parser.add_argument("--interval", type=float, default=30, help="Seconds to sleep when --loop finds nothing")
+
+    def handle(self, *args, **options):
+        with ThreadPoolExecutor(max_workers=options["workers"], thread_name_prefix="fetch-covers") as pool:
+            while True:
+                books = list(pending_books()[: options["batch_size"]])
+                if books:
+                    # Downloads run on the pool; results are saved from this thread's connection
+                    stored = 0
+                    for book, (cover_key, error) in zip(books, pool.map(fetch_cover, books)):
+                        record_cover(book, cover_key, error)
+                        stored += bool(cover_key)
+                    self.stdout.write(f"Cached {stored} of {len(books)} covers")
+                    continue
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS("No covers left to fetch"))
@@ -0,0 +1,28 @@
+"""
+Show what is left of the shared Google Books quota.
+
+    python manage.py google_books_quota
+    python manage.py google_books_quota --json
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from books.quota import google_books_quota
+
+
+class Command(BaseCommand):
+    help = "Print the remaining Google Books quota and how much of it background jobs may use"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--json", action="store_true", help="Print the stats as JSON")
+
+    def handle(self, *args, **options):
+        stats = google_books_quota.stats()
+        if options["json"]:
+            self.stdout.write(json.dumps(stats))
+            return
+        self.stdout.write(f"Remaining: {stats['remaining']} of {stats['capacity']} tokens")
+        self.stdout.write(f"Available to background jobs: {stats['background_available']}")
+        self.stdout.write(f"Refill rate: {stats['refill_per_hour']} tokens/hour")
@@ -0,0 +1,35 @@
+"""
+Recount every BookStats row from the Wishlist, UserBook and Transaction tables.
+
+The counters are maintained by signals, so this is only needed after writes
+that bypass them (raw SQL, queryset.update()) or to check for drift:
+
+    python manage.py rebuild_book_stats --batch-size 1000
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from books.models import Book, BookStats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-book wisher, owner and loan counters from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Books recounted per transaction")
+
+    def handle(self, *args, **options):
+        book_ids = Book.objects.order_by("pk").values_list("pk", flat=True)
+        after, rebuilt = "", 0
+        while True:
+            batch = list(book_ids.filter(pk__gt=after)[: options["batch_size"]])
+            if not batch:
+                break
+            with transaction.atomic():
+                BookStats.rebuild(batch)
+            after = batch[-1]
+            rebuilt += len(batch)
+            self.stdout.write(f"Rebuilt stats for {rebuilt} books")
+
+        self.stdout.write(self.style.SUCCESS(f"Book stats rebuilt for {rebuilt} books"))
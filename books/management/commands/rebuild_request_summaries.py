@@ -0,0 +1,36 @@
+"""
+Recount every RequestSummary row from the RequestBook table.
+
+The summaries are maintained by signals and by RequestBook's bulk updates, so
+this is only needed after writes that bypass both (raw SQL, an ad hoc
+queryset.update()):
+
+    python manage.py rebuild_request_summaries --batch-size 1000
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from books.models import CustomUser, RequestSummary
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-book request summaries behind the requests page from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Members recounted per transaction")
+
+    def handle(self, *args, **options):
+        user_ids = CustomUser.objects.order_by("pk").values_list("pk", flat=True)
+        after, rebuilt = 0, 0
+        while True:
+            batch = list(user_ids.filter(pk__gt=after)[: options["batch_size"]])
+            if not batch:
+                break
+            with transaction.atomic():
+                RequestSummary.rebuild(batch)
+            after = batch[-1]
+            rebuilt += len(batch)
+            self.stdout.write(f"Rebuilt request summaries for {rebuilt} members")
+
+        self.stdout.write(self.style.SUCCESS(f"Request summaries rebuilt for {rebuilt} members"))
@@ -0,0 +1,46 @@
+"""
+Compare every Group.member_count with a fresh count of its memberships and
+repair the ones that have drifted.
+
+The counts are maintained by signals, so drift only comes from writes that
+bypass them (raw SQL, queryset.update()). Check without writing anything:
+
+    python manage.py reconcile_group_members --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from books.models import Group
+
+
+class Command(BaseCommand):
+    help = "Detect and repair drift in the per-group member counts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Groups checked per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Report drift without repairing it")
+
+    def handle(self, *args, **options):
+        group_ids = Group.objects.order_by("pk").values_list("pk", flat=True)
+        after, checked, drifted = 0, 0, 0
+        while True:
+            batch = list(group_ids.filter(pk__gt=after)[: options["batch_size"]])
+            if not batch:
+                break
+            with transaction.atomic():
+                # Lock the rows so a concurrent join or leave can't land between the count and the repair
+                stored = dict(Group.objects.select_for_update().filter(pk__in=batch).values_list("pk", "member_count"))
+                stale = []
+                for group_id, n in Group.recount_members(batch).items():
+                    if stored[group_id] != n:
+                        stale.append(Group(pk=group_id, member_count=n))
+                        self.stdout.write(f"Group {group_id}: member_count {stored[group_id]} -> {n}")
+                if stale and not options["dry_run"]:
+                    Group.objects.bulk_update(stale, ["member_count"])
+            after = batch[-1]
+            checked += len(batch)
+            drifted += len(stale)
+
+        verb = "found" if options["dry_run"] else "repaired"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} groups, {verb} drift in {drifted}"))
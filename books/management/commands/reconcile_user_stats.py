@@ -0,0 +1,52 @@
+"""
+Compare every UserStats row with a fresh count from the source tables and
+repair the ones that have drifted.
+
+The counters are maintained by signals, so drift only comes from writes that
+bypass them (raw SQL, queryset.update()). Check without writing anything:
+
+    python manage.py reconcile_user_stats --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from books.models import CustomUser, UserStats
+
+
+class Command(BaseCommand):
+    help = "Detect and repair drift in the per-member book, wish, group and request counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Members checked per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Report drift without repairing it")
+
+    def handle(self, *args, **options):
+        user_ids = CustomUser.objects.order_by("pk").values_list("pk", flat=True)
+        after, checked, drifted = 0, 0, 0
+        while True:
+            batch = list(user_ids.filter(pk__gt=after)[: options["batch_size"]])
+            if not batch:
+                break
+            with transaction.atomic():
+                # Lock the rows so a concurrent signal update can't land between the count and the repair
+                stored = {
+                    row["user_id"]: row
+                    for row in UserStats.objects.select_for_update().filter(user_id__in=batch).values("user_id", *UserStats.COUNTERS)
+                }
+                counts = UserStats.recount(batch)
+                stale = []
+                for user_id, expected in counts.items():
+                    actual = stored.get(user_id, dict.fromkeys(UserStats.COUNTERS, 0))
+                    differences = [f"{field} {actual[field]} -> {n}" for field, n in expected.items() if actual[field] != n]
+                    if differences:
+                        stale.append(user_id)
+                        self.stdout.write(f"User {user_id}: " + ", ".join(differences))
+                if stale and not options["dry_run"]:
+                    UserStats.rebuild(stale)
+            after = batch[-1]
+            checked += len(batch)
+            drifted += len(stale)
+
+        verb = "found" if options["dry_run"] else "repaired"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} members, {verb} drift in {drifted}"))
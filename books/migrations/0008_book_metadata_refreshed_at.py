@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_book_cover'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='metadata_refreshed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
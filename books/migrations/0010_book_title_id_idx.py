@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:39
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY builds without blocking writes, but can't run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('books', '0009_apiquota'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='book',
+            index=models.Index(fields=['title', 'google_book_id'], name='book_title_id_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_book_stats(apps, schema_editor):
+    # Same counts as BookStats.rebuild, against the historical models
+    BookStats = apps.get_model("books", "BookStats")
+    sources = (
+        ("active_wishers", apps.get_model("books", "Wishlist").objects.filter(removed_datetime__isnull=True)),
+        ("owners", apps.get_model("books", "UserBook").objects.all()),
+        ("active_loans", apps.get_model("books", "Transaction").objects.filter(returned_datetime__isnull=True)),
+    )
+    counts = {}
+    for field, queryset in sources:
+        for row in queryset.values("book_id").annotate(n=Count("pk")).order_by():
+            counts.setdefault(row["book_id"], {})[field] = row["n"]
+    BookStats.objects.bulk_create(
+        [BookStats(book_id=book_id, **values) for book_id, values in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0010_book_title_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookStats',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='books.book')),
+                ('active_wishers', models.PositiveIntegerField(default=0)),
+                ('owners', models.PositiveIntegerField(default=0)),
+                ('active_loans', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('active_wishers__gt', 0)), fields=['-active_wishers', 'book'], name='bookstats_wanted_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_book_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:44
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0011_bookstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookstats',
+            name='available_copies',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Greatest(django.db.models.expressions.CombinedExpression(models.F('owners'), '-', models.F('active_loans')), models.Value(0)), output_field=models.PositiveIntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='bookstats',
+            index=models.Index(condition=models.Q(('available_copies__gt', 0)), fields=['-available_copies', 'book'], name='bookstats_available_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_user_stats(apps, schema_editor):
+    # Same counts as UserStats.recount, against the historical models
+    UserStats = apps.get_model("books", "UserStats")
+    RequestBook = apps.get_model("books", "RequestBook")
+    live_requests = RequestBook.objects.filter(decision_datetime__isnull=True, cancelled_datetime__isnull=True)
+    sources = (
+        ("books", "user_id", apps.get_model("books", "UserBook").objects.all()),
+        ("wishes", "user_id", apps.get_model("books", "Wishlist").objects.filter(removed_datetime__isnull=True)),
+        ("groups", "user_id", apps.get_model("books", "GroupMember").objects.all()),
+        ("requests_open", "requester_id", live_requests),
+        ("requests_received_open", "owner_id", live_requests),
+    )
+    counts = {}
+    for field, user_field, queryset in sources:
+        for row in queryset.values(user_field).annotate(n=Count("pk")).order_by():
+            counts.setdefault(row[user_field], {})[field] = row["n"]
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id, **values) for user_id, values in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0013_group_member_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('books', models.PositiveIntegerField(default=0)),
+                ('wishes', models.PositiveIntegerField(default=0)),
+                ('groups', models.PositiveIntegerField(default=0)),
+                ('requests_open', models.PositiveIntegerField(default=0)),
+                ('requests_received_open', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0014_userstats'),
+    ]
+
+    operations = [
+        # A stored generated column: ADD COLUMN computes it for every existing row,
+        # so this doubles as the backfill. Its partial indexes are built concurrently in 0016,
+        # rather than under the lock this rewrite takes
+        migrations.AddField(
+            model_name='requestbook',
+            name='state',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(decision=True, decision_datetime__isnull=False, then=models.Value('accepted')), models.When(decision_datetime__isnull=False, then=models.Value('rejected')), models.When(cancelled_datetime__isnull=False, then=models.Value('cancelled')), default=models.Value('open')), output_field=models.CharField(choices=[('open', 'Open'), ('accepted', 'Accepted'), ('rejected', 'Rejected'), ('cancelled', 'Cancelled')], max_length=9)),
+        ),
+    ]
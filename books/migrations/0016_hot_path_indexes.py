@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:08
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY builds without blocking writes, but can't run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('books', '0015_requestbook_state'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='requestbook',
+            index=models.Index(condition=models.Q(('state', 'open')), fields=['owner', 'book'], name='requestbook_open_owner_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='requestbook',
+            index=models.Index(condition=models.Q(('state', 'open')), fields=['requester', 'book'], name='requestbook_open_requester_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('returned_datetime__isnull', True)), fields=['book', 'owner'], name='transaction_active_book_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='wishlist',
+            index=models.Index(condition=models.Q(('removed_datetime__isnull', True)), fields=['user', 'book'], name='wishlist_active_user_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='wishlist',
+            index=models.Index(condition=models.Q(('removed_datetime__isnull', True)), fields=['book', 'user'], name='wishlist_active_book_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Q
+from django.db.models.functions import Coalesce, Greatest
+
+
+def backfill_request_summaries(apps, schema_editor):
+    # Same aggregates as RequestSummary.counts, against the historical models
+    RequestSummary = apps.get_model("books", "RequestSummary")
+    RequestBook = apps.get_model("books", "RequestBook")
+    for role in ("owner", "requester"):
+        rows = (
+            RequestBook.objects.values(user_key=F(f"{role}_id"), book_key=F("book_id"))
+            .annotate(
+                open_count=Count("pk", filter=Q(state="open")),
+                accepted_count=Count("pk", filter=Q(state="accepted")),
+                rejected_count=Count("pk", filter=Q(state="rejected")),
+                last_action=Max(Greatest("request_datetime", Coalesce("decision_datetime", "request_datetime"))),
+            )
+            .order_by()
+        )
+        RequestSummary.objects.bulk_create(
+            [
+                RequestSummary(
+                    user_id=row["user_key"],
+                    role=role,
+                    book_id=row["book_key"],
+                    open_count=row["open_count"],
+                    accepted_count=row["accepted_count"],
+                    rejected_count=row["rejected_count"],
+                    last_action=row["last_action"],
+                )
+                for row in rows
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0016_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('owner', 'Owner'), ('requester', 'Requester')], max_length=9)),
+                ('open_count', models.PositiveIntegerField(default=0)),
+                ('accepted_count', models.PositiveIntegerField(default=0)),
+                ('rejected_count', models.PositiveIntegerField(default=0)),
+                ('last_action', models.DateTimeField()),
+                ('has_live', models.GeneratedField(db_persist=True, expression=models.Case(models.When(open_count__gt=0, then=models.Value(1)), default=models.Value(0)), output_field=models.IntegerField())),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='request_summaries', to='books.book')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='request_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'role', '-has_live', '-last_action', 'book'], name='requestsummary_page_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='requestsummary',
+            constraint=models.UniqueConstraint(fields=('user', 'role', 'book'), name='requestsummary_unique'),
+        ),
+        migrations.RunPython(backfill_request_summaries, migrations.RunPython.noop),
+    ]
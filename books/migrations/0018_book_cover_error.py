@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0017_requestsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='cover_error',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 05:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0018_book_cover_error'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='metadata_failures',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='metadata_retry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
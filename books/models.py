@@ -1,12 +1,17 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 
 # slugify removes non-alphanumeric chars to so URLs can be created
 from django.template.defaultfilters import slugify
 from django.core.exceptions import ValidationError
-from django.db.models.signals import post_save
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Cast, Coalesce, Greatest, Upper
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 from django.utils import timezone
+from collections import Counter
 import misaka  # Misaka allows rendering markdown
 import logging
 
@@ -59,9 +64,38 @@ class Book(models.Model):
     # Maturity rating (e.g., "NOT_MATURE" or "MATURE")
     maturity_rating = models.CharField(max_length=20, blank=True)  # volumeInfo.maturityRating
 
+    # Last time the fields above were refreshed from Google (see books/enrichment.py)
+    metadata_refreshed_at = models.DateTimeField(null=True, blank=True)
+    metadata_failures = models.PositiveSmallIntegerField(default=0)  # Failed fetches since the last success
+    metadata_retry_at = models.DateTimeField(null=True, blank=True)  # Skipped by enrichment until then
+
+    # Locally cached copy of the thumbnail (see books/covers.py). Blank until the cover worker has stored it
+    cover_key = models.CharField(max_length=64, blank=True, default="")  # SHA-256 of the original image
+    cover_checked_at = models.DateTimeField(null=True, blank=True)  # Last download attempt
+    cover_error = models.CharField(max_length=255, blank=True, default="")  # Why the last attempt failed
+
     # Relationship to users
     owner = models.ManyToManyField(CustomUser, through="UserBook")
 
+    # Full-text search document for the local catalog, maintained by Postgres
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector("title", weight="A", config="english")
+            + SearchVector("authors", weight="A", config="english")
+            + SearchVector("publisher", "categories", weight="B", config="english")
+            + SearchVector("description", weight="C", config="english")
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="book_search_vector_gin"),
+            # Keyset pagination of the catalog (see books/pagination.py)
+            models.Index(fields=["title", "google_book_id"], name="book_title_id_idx"),
+        ]
+
     def __str__(self):
         return f"{self.title}"
 
@@ -73,10 +107,30 @@ class Group(models.Model):
     description_html = models.TextField(editable=False, default="", blank=True)
     is_private = models.BooleanField(default=False, blank=False)
     members = models.ManyToManyField(CustomUser, through="GroupMember")
+    # Kept in step by the GroupMember signals below, so listings don't count memberships.
+    # `manage.py reconcile_group_members` repairs any drift
+    member_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Case-insensitive name prefix search (group_name__istartswith) in the directory
+            models.Index(
+                OpClass(Upper(Cast("group_name", models.TextField())), name="text_pattern_ops"),
+                name="group_name_prefix_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.group_name
 
+    @classmethod
+    def recount_members(cls, group_ids):
+        """Memberships from the GroupMember table: {group_id: n} for each of `group_ids`"""
+        counts = dict.fromkeys(group_ids, 0)
+        rows = GroupMember.objects.filter(group_id__in=counts).values("group_id").annotate(n=Count("pk")).order_by()
+        counts.update((row["group_id"], row["n"]) for row in rows)
+        return counts
+
     def save(self, *args, **kwargs):
         self.slug = slugify(self.group_name)  # Lowercase & replace spaces with hyphens
         self.description_html = misaka.html(self.description)  # Allows markdown
@@ -118,6 +172,19 @@ class GroupMember(models.Model):
     class Meta:
         unique_together = ("user", "group")
 
+    @classmethod
+    def join(cls, user, group, admin=False):
+        """Add user to group. Returns (membership, created)"""
+        with transaction.atomic():
+            return cls.objects.get_or_create(user=user, group=group, defaults={"admin": admin})
+
+    @classmethod
+    def leave(cls, user, group):
+        """Remove user from group. Returns whether they were a member"""
+        with transaction.atomic():
+            deleted, _ = cls.objects.filter(user=user, group=group).delete()
+        return bool(deleted)
+
     @classmethod
     def assign_user_to_group(cls, user, group_name):
         group_user, GroupUser_created = cls.objects.get_or_create(
@@ -166,6 +233,17 @@ class Transaction(models.Model):
         else:
             return f"{self.borrower.username} borrowed {self.book.title} from {self.owner.username} on {self.borrowed_datetime}"
 
+    class Meta:
+        indexes = [
+            # "Is this book lent out?" (per book, optionally per owner): most loans
+            # are returned, so the index only holds the handful still out
+            models.Index(
+                fields=["book", "owner"],
+                name="transaction_active_book_idx",
+                condition=Q(returned_datetime__isnull=True),
+            ),
+        ]
+
 
 class Wishlist(models.Model):
     user = models.ForeignKey(
@@ -195,6 +273,19 @@ class Wishlist(models.Model):
 
     class Meta:
         unique_together = ("user", "book")
+        indexes = [
+            # Open wishes by member (profiles) and by book (owners' "wanted by" checks)
+            models.Index(
+                fields=["user", "book"],
+                name="wishlist_active_user_idx",
+                condition=Q(removed_datetime__isnull=True),
+            ),
+            models.Index(
+                fields=["book", "user"],
+                name="wishlist_active_book_idx",
+                condition=Q(removed_datetime__isnull=True),
+            ),
+        ]
 
 
 # Runs automatically when transaction is created
@@ -229,7 +320,36 @@ def update_wishlist_ownership(sender, instance, created, **kwargs):
             wishlist_entry.save()
 
 
+# Every way a membership appears or goes (join/leave, cascades from deleting a
+# user or group, direct creates) moves Group.member_count
+@receiver(post_save, sender=GroupMember)
+def count_group_member(sender, instance, created, **kwargs):
+    if created:
+        Group.objects.filter(pk=instance.group_id).update(member_count=F("member_count") + 1)
+
+
+@receiver(post_delete, sender=GroupMember)
+def uncount_group_member(sender, instance, **kwargs):
+    Group.objects.filter(pk=instance.group_id).update(member_count=Greatest(F("member_count") - 1, 0))
+
+
+class RequestStatus:
+    """Template-friendly flags for one RequestBook.State"""
+
+    def __init__(self, state):
+        self.is_live = state == RequestBook.State.OPEN
+        self.is_accepted = state == RequestBook.State.ACCEPTED
+        self.is_rejected = state == RequestBook.State.REJECTED
+        self.is_cancelled = state == RequestBook.State.CANCELLED
+
+
 class RequestBook(models.Model):
+    class State(models.TextChoices):
+        OPEN = "open"
+        ACCEPTED = "accepted"
+        REJECTED = "rejected"
+        CANCELLED = "cancelled"
+
     owner = models.ForeignKey(
         CustomUser,
         related_name="request_book_owner",
@@ -258,20 +378,529 @@ class RequestBook(models.Model):
         max_length=26, choices=REJECT_REASON_CHOICES, null=True, blank=True
     )
 
+    # Where the request stands. Computed by Postgres from the columns above on
+    # every write, including queryset.update(), so it can never disagree with them
+    state = models.GeneratedField(
+        expression=models.Case(
+            models.When(decision_datetime__isnull=False, decision=True, then=Value(State.ACCEPTED)),
+            models.When(decision_datetime__isnull=False, then=Value(State.REJECTED)),
+            models.When(cancelled_datetime__isnull=False, then=Value(State.CANCELLED)),
+            default=Value(State.OPEN),
+        ),
+        output_field=models.CharField(max_length=9, choices=State.choices),
+        db_persist=True,
+    )
+
+    def current_state(self):
+        """`state` for the columns as they are in memory.
+
+        The stored column is only read back when the row is reloaded, so after
+        a transition in this process it is stale. Same rules as its expression.
+        """
+        if self.decision_datetime is not None:
+            return self.State.ACCEPTED if self.decision else self.State.REJECTED
+        if self.cancelled_datetime is not None:
+            return self.State.CANCELLED
+        return self.State.OPEN
+
     @property
     def status(self):
         """Return a status object with is_live, is_accepted, is_rejected, and is_cancelled properties"""
-        class RequestStatus:
-            def __init__(self, request):
-                self.is_live = request.decision_datetime is None and request.cancelled_datetime is None
-                self.is_accepted = request.decision_datetime is not None and request.decision is True
-                self.is_rejected = request.decision_datetime is not None and request.decision is False
-                self.is_cancelled = request.cancelled_datetime is not None
+        return REQUEST_STATUSES[self.current_state()]
 
-        return RequestStatus(self)
+    @classmethod
+    def decide(cls, request_id, owner, approve, reject_reason=None):
+        """Approve or reject one of `owner`'s open requests. Returns the request.
+
+        The request row is locked, so a double submission sees the first
+        decision and fails instead of applying twice. Approving also locks the
+        owner's copy, lends it to the requester and rejects every other open
+        request for it, all in one transaction; the number of queries doesn't
+        depend on how many requests are rejected.
+
+        Raises RequestBook.DoesNotExist if `owner` has no such request, and
+        ValidationError if it isn't open or the copy can't be lent.
+        """
+        with transaction.atomic():
+            request = cls.objects.select_for_update().get(pk=request_id, owner=owner)
+            if request.current_state() != cls.State.OPEN:
+                raise ValidationError("This request has already been responded to or cancelled")
+
+            now = timezone.now()
+            if approve:
+                cls._approve(request, owner, now)
+            else:
+                request.decision = False
+                request.reject_reason = reject_reason
+                request.decision_datetime = now
+                request.save()
+        return request
+
+    @classmethod
+    def decide_many(cls, request_ids, owner, approve, reject_reason=None):
+        """Approve or reject a batch of `owner`'s open requests. Returns the ids decided.
+
+        Ids that aren't `owner`'s open requests are skipped rather than failing
+        the batch. Rejecting takes one locked read and one UPDATE however many
+        ids are given. Every approval lends a copy, so approvals go one at a
+        time through the same steps as decide(), oldest request first; once a
+        copy is lent, the other picked requests for it are rejected along with
+        its competitors, and copies that can't be lent are skipped.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            if not approve:
+                requests = cls.objects.filter(pk__in=request_ids, owner=owner)
+                return cls._close_all(requests, decision=False, reject_reason=reject_reason, decision_datetime=now)
+
+            requests = (
+                cls.objects.select_for_update()
+                .filter(pk__in=request_ids, owner=owner, state=cls.State.OPEN)
+                .order_by("request_datetime", "pk")
+            )
+            approved, lent = [], set()
+            for request in requests:
+                if request.book_id in lent:
+                    continue
+                try:
+                    cls._approve(request, owner, now)
+                except ValidationError:
+                    continue
+                lent.add(request.book_id)
+                approved.append(request.pk)
+        return approved
+
+    @classmethod
+    def cancel_many(cls, request_ids, requester):
+        """Cancel a batch of `requester`'s open requests with one UPDATE. Returns the ids cancelled.
+
+        Ids that aren't `requester`'s open requests are skipped.
+        """
+        with transaction.atomic():
+            requests = cls.objects.filter(pk__in=request_ids, requester=requester)
+            return cls._close_all(requests, cancelled_datetime=timezone.now())
+
+    @classmethod
+    def _approve(cls, request, owner, now):
+        """Lend the copy for the locked, open `request` and reject the other open requests for it.
+
+        Must run inside a transaction. Raises ValidationError, before writing
+        anything, if the copy can't be lent.
+        """
+        # Serialises approvals of the same copy, and checks it is still owned
+        if not UserBook.objects.select_for_update().filter(user=owner, book_id=request.book_id).exists():
+            raise ValidationError("You no longer own this book")
+        if Transaction.objects.filter(owner=owner, book_id=request.book_id, returned_datetime__isnull=True).exists():
+            raise ValidationError("This book is already on loan")
+        Transaction.objects.create(owner=owner, borrower_id=request.requester_id, book_id=request.book_id)
+
+        request.decision = True
+        request.reject_reason = None
+        request.decision_datetime = now
+        request.save()
+
+        competing = cls.objects.filter(owner=owner, book_id=request.book_id).exclude(pk=request.pk)
+        cls._close_all(competing, decision=False, reject_reason="Book already loaned", decision_datetime=now)
+
+    @classmethod
+    def _close_all(cls, queryset, **changes):
+        """Apply `changes` to the open requests in `queryset` with one UPDATE, keeping UserStats
+        and RequestSummary in step.
+
+        Must run inside a transaction. Returns the ids of the requests closed.
+        """
+        rows = list(
+            queryset.filter(state=cls.State.OPEN)
+            .select_for_update()
+            .values_list("pk", "requester_id", "owner_id", "book_id")
+        )
+        if not rows:
+            return []
+        # Update exactly the rows locked above, not whatever matches the filter by now
+        ids = [pk for pk, _, _, _ in rows]
+        cls.objects.filter(pk__in=ids).update(**changes)
+
+        # The update skips the signals, so move the counters here
+        requesters = Counter(requester_id for _, requester_id, _, _ in rows)
+        owners = Counter(owner_id for _, _, owner_id, _ in rows)
+        UserStats.adjust_many("requests_open", {user_id: -n for user_id, n in requesters.items()})
+        UserStats.adjust_many("requests_received_open", {user_id: -n for user_id, n in owners.items()})
+        RequestSummary.refresh((requester_id, owner_id, book_id) for _, requester_id, owner_id, book_id in rows)
+        return ids
 
     def __str__(self):
         return f"{self.requester} requested {self.book} from {self.owner}"
 
     class Meta:
         unique_together = ("owner", "requester", "book", "request_datetime")
+        indexes = [
+            # Open requests by owner (the header badge, the requests page) and
+            # by requester; the book column serves "already requested?" checks
+            models.Index(
+                fields=["owner", "book"],
+                name="requestbook_open_owner_idx",
+                condition=Q(state="open"),
+            ),
+            models.Index(
+                fields=["requester", "book"],
+                name="requestbook_open_requester_idx",
+                condition=Q(state="open"),
+            ),
+        ]
+
+
+REQUEST_STATUSES = {state: RequestStatus(state) for state in RequestBook.State}
+
+
+class ApiQuota(models.Model):
+    """Token bucket shared by every process that calls a rate-limited API (see books/quota.py)"""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    tokens = models.FloatField()
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}: {self.tokens:.1f} tokens"
+
+
+class BookStats(models.Model):
+    """Per-book counters for listings, kept up to date by the signals below.
+
+    A row exists for every book that has ever been owned, wished for or lent.
+
+    Saves and deletes of Wishlist, UserBook and Transaction rows adjust the
+    counters with F() expressions; `manage.py rebuild_book_stats` recounts
+    everything from scratch if they ever drift (e.g. after a raw SQL fix).
+    """
+
+    book = models.OneToOneField(Book, primary_key=True, related_name="stats", on_delete=models.CASCADE)
+    active_wishers = models.PositiveIntegerField(default=0)  # Wishlist rows not removed
+    owners = models.PositiveIntegerField(default=0)  # UserBook rows
+    active_loans = models.PositiveIntegerField(default=0)  # Transactions not returned
+
+    # Copies that could be lent right now. Computed by Postgres in the same row
+    # update as the counters above, so it can never disagree with them
+    available_copies = models.GeneratedField(
+        expression=Greatest(F("owners") - F("active_loans"), Value(0)),
+        output_field=models.PositiveIntegerField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            # The "wanted" page: most wished-for first, keyset-paginated
+            models.Index(
+                fields=["-active_wishers", "book"],
+                name="bookstats_wanted_idx",
+                condition=Q(active_wishers__gt=0),
+            ),
+            # "Available now" filtering and sorting in the catalog
+            models.Index(
+                fields=["-available_copies", "book"],
+                name="bookstats_available_idx",
+                condition=Q(available_copies__gt=0),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.book_id}: {self.active_wishers} wishers, {self.owners} owners, {self.active_loans} on loan"
+
+    @classmethod
+    def adjust(cls, book_id, field, delta):
+        updated = cls.objects.filter(book_id=book_id).update(**{field: Greatest(F(field) + delta, 0)})
+        if not updated and delta > 0:
+            # No row yet: count from scratch, which already includes this change.
+            # (Decrements skip this: the book may be being deleted along with its stats)
+            cls.rebuild([book_id])
+
+    @classmethod
+    def rebuild(cls, book_ids):
+        """Recount the stats of the given books from the source tables"""
+        book_ids = list(book_ids)
+        counts = {book_id: {"active_wishers": 0, "owners": 0, "active_loans": 0} for book_id in book_ids}
+        sources = (
+            ("active_wishers", Wishlist.objects.filter(removed_datetime__isnull=True)),
+            ("owners", UserBook.objects.all()),
+            ("active_loans", Transaction.objects.filter(returned_datetime__isnull=True)),
+        )
+        for field, queryset in sources:
+            rows = queryset.filter(book_id__in=book_ids).values("book_id").annotate(n=Count("pk")).order_by()
+            for row in rows:
+                counts[row["book_id"]][field] = row["n"]
+
+        cls.objects.bulk_create(
+            [cls(book_id=book_id, **values) for book_id, values in counts.items()],
+            update_conflicts=True,
+            unique_fields=["book"],
+            update_fields=["active_wishers", "owners", "active_loans"],
+        )
+
+
+# Which BookStats counter each model feeds, and whether an instance currently counts towards it
+STATS_COUNTERS = {
+    Wishlist: ("active_wishers", lambda wish: wish.removed_datetime is None),
+    UserBook: ("owners", lambda user_book: True),
+    Transaction: ("active_loans", lambda loan: loan.returned_datetime is None),
+}
+
+
+def remember_stats_state(sender, instance, **kwargs):
+    # What this row contributed when loaded, so a save only applies the difference
+    _, counts = STATS_COUNTERS[sender]
+    instance._counted_in_stats = instance.pk is not None and counts(instance)
+
+
+def update_stats_on_save(sender, instance, **kwargs):
+    field, counts = STATS_COUNTERS[sender]
+    now_counted = counts(instance)
+    delta = int(now_counted) - int(instance._counted_in_stats)
+    if delta:
+        BookStats.adjust(instance.book_id, field, delta)
+    instance._counted_in_stats = now_counted
+
+
+def update_stats_on_delete(sender, instance, **kwargs):
+    field, _ = STATS_COUNTERS[sender]
+    if instance._counted_in_stats:
+        BookStats.adjust(instance.book_id, field, -1)
+
+
+for model in STATS_COUNTERS:
+    post_init.connect(remember_stats_state, sender=model)
+    post_save.connect(update_stats_on_save, sender=model)
+    post_delete.connect(update_stats_on_delete, sender=model)
+
+
+class UserStats(models.Model):
+    """Per-member counters for the profile page and the header badge, kept up to date by the signals below.
+
+    Saves and deletes of UserBook, Wishlist, GroupMember and RequestBook rows
+    adjust the counters with F() expressions, so reading them is a primary key
+    lookup. `manage.py reconcile_user_stats` reports and repairs any drift.
+    """
+
+    user = models.OneToOneField(CustomUser, primary_key=True, related_name="stats", on_delete=models.CASCADE)
+    books = models.PositiveIntegerField(default=0)  # UserBook rows
+    wishes = models.PositiveIntegerField(default=0)  # Wishlist rows not removed
+    groups = models.PositiveIntegerField(default=0)  # GroupMember rows
+    requests_open = models.PositiveIntegerField(default=0)  # Live requests made
+    requests_received_open = models.PositiveIntegerField(default=0)  # Live requests awaiting a decision
+
+    COUNTERS = ("books", "wishes", "groups", "requests_open", "requests_received_open")
+
+    def __str__(self):
+        return f"{self.user_id}: " + ", ".join(f"{getattr(self, field)} {field}" for field in self.COUNTERS)
+
+    @classmethod
+    def adjust(cls, user_id, field, delta):
+        updated = cls.objects.filter(user_id=user_id).update(**{field: Greatest(F(field) + delta, 0)})
+        if not updated and delta > 0:
+            # No row yet: count from scratch, which already includes this change.
+            # (Decrements skip this: the user may be being deleted along with their stats)
+            cls.rebuild([user_id])
+
+    @classmethod
+    def adjust_many(cls, field, deltas):
+        """Apply {user_id: delta} to one counter in a single UPDATE, for bulk transitions"""
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        change = models.Case(
+            *(models.When(user_id=user_id, then=Value(delta)) for user_id, delta in deltas.items()),
+            default=Value(0),
+            output_field=models.IntegerField(),
+        )
+        cls.objects.filter(user_id__in=deltas).update(**{field: Greatest(F(field) + change, 0)})
+        grown = [user_id for user_id, delta in deltas.items() if delta > 0]
+        if grown:
+            # As in adjust(): members without a row yet get one counted from scratch
+            existing = cls.objects.filter(user_id__in=grown).values_list("user_id", flat=True)
+            missing = set(grown) - set(existing)
+            if missing:
+                cls.rebuild(missing)
+
+    @classmethod
+    def recount(cls, user_ids):
+        """Counts from the source tables: {user_id: {counter: n}} for each of `user_ids`"""
+        user_ids = list(user_ids)
+        counts = {user_id: dict.fromkeys(cls.COUNTERS, 0) for user_id in user_ids}
+        live_requests = RequestBook.objects.filter(state=RequestBook.State.OPEN)
+        sources = (
+            ("books", "user_id", UserBook.objects.all()),
+            ("wishes", "user_id", Wishlist.objects.filter(removed_datetime__isnull=True)),
+            ("groups", "user_id", GroupMember.objects.all()),
+            ("requests_open", "requester_id", live_requests),
+            ("requests_received_open", "owner_id", live_requests),
+        )
+        for field, user_field, queryset in sources:
+            rows = queryset.filter(**{f"{user_field}__in": user_ids}).values(user_field).annotate(n=Count("pk")).order_by()
+            for row in rows:
+                counts[row[user_field]][field] = row["n"]
+        return counts
+
+    @classmethod
+    def rebuild(cls, user_ids):
+        """Recount the stats of the given users from the source tables"""
+        counts = cls.recount(user_ids)
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, **values) for user_id, values in counts.items()],
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=list(cls.COUNTERS),
+        )
+
+
+# Which UserStats counters each model feeds (through which user column), and
+# whether an instance currently counts towards them
+USER_STATS_COUNTERS = {
+    UserBook: ((("user_id", "books"),), lambda user_book: True),
+    Wishlist: ((("user_id", "wishes"),), lambda wish: wish.removed_datetime is None),
+    GroupMember: ((("user_id", "groups"),), lambda membership: True),
+    RequestBook: (
+        (("requester_id", "requests_open"), ("owner_id", "requests_received_open")),
+        lambda request: request.status.is_live,
+    ),
+}
+
+
+def remember_user_stats_state(sender, instance, **kwargs):
+    _, counts = USER_STATS_COUNTERS[sender]
+    instance._counted_in_user_stats = instance.pk is not None and counts(instance)
+
+
+def update_user_stats_on_save(sender, instance, **kwargs):
+    targets, counts = USER_STATS_COUNTERS[sender]
+    now_counted = counts(instance)
+    delta = int(now_counted) - int(instance._counted_in_user_stats)
+    if delta:
+        for user_field, field in targets:
+            UserStats.adjust(getattr(instance, user_field), field, delta)
+    instance._counted_in_user_stats = now_counted
+
+
+def update_user_stats_on_delete(sender, instance, **kwargs):
+    targets, _ = USER_STATS_COUNTERS[sender]
+    if instance._counted_in_user_stats:
+        for user_field, field in targets:
+            UserStats.adjust(getattr(instance, user_field), field, -1)
+
+
+for model in USER_STATS_COUNTERS:
+    post_init.connect(remember_user_stats_state, sender=model)
+    post_save.connect(update_user_stats_on_save, sender=model)
+    post_delete.connect(update_user_stats_on_delete, sender=model)
+
+
+class RequestSummary(models.Model):
+    """One member's requests for one book, summarised for the requests page.
+
+    There is a row per book on each side of a request: the owner's and the
+    requester's. The page keyset-paginates these rows, so it never groups a
+    member's whole request history. Saves and deletes of RequestBook rows
+    recount the summaries they touch from that book's requests (see
+    refresh()); `manage.py rebuild_request_summaries` recounts them all.
+    """
+
+    class Role(models.TextChoices):
+        OWNER = "owner"
+        REQUESTER = "requester"
+
+    user = models.ForeignKey(CustomUser, related_name="request_summaries", on_delete=models.CASCADE)
+    role = models.CharField(max_length=9, choices=Role.choices)
+    book = models.ForeignKey(Book, related_name="request_summaries", on_delete=models.CASCADE)
+    open_count = models.PositiveIntegerField(default=0)
+    accepted_count = models.PositiveIntegerField(default=0)
+    rejected_count = models.PositiveIntegerField(default=0)
+    last_action = models.DateTimeField()  # Latest request or decision
+    has_live = models.GeneratedField(
+        expression=models.Case(models.When(open_count__gt=0, then=Value(1)), default=Value(0)),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
+
+    COUNTS = ("open_count", "accepted_count", "rejected_count", "last_action")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "role", "book"], name="requestsummary_unique"),
+        ]
+        indexes = [
+            # The requests page: live books first, then most recent action
+            models.Index(fields=["user", "role", "-has_live", "-last_action", "book"], name="requestsummary_page_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} ({self.role}) {self.book_id}: {self.open_count} open"
+
+    @classmethod
+    def counts(cls, role, queryset):
+        """Aggregates of `queryset` (RequestBook rows) per (user, book) on one side, as dicts"""
+        user_field = f"{role}_id"
+        return (
+            queryset.values(user_id=F(user_field), book_key=F("book_id"))
+            .annotate(
+                open_count=Count("pk", filter=Q(state=RequestBook.State.OPEN)),
+                accepted_count=Count("pk", filter=Q(state=RequestBook.State.ACCEPTED)),
+                rejected_count=Count("pk", filter=Q(state=RequestBook.State.REJECTED)),
+                last_action=models.Max(
+                    Greatest("request_datetime", Coalesce("decision_datetime", "request_datetime"))
+                ),
+            )
+            .order_by()
+        )
+
+    @classmethod
+    def refresh(cls, requests):
+        """Recount the summaries of (requester_id, owner_id, book_id) triples from their books' requests.
+
+        Costs the same few queries however many triples are given; each recount
+        only reads the requests between one member and one book.
+        """
+        keys = {cls.Role.REQUESTER: set(), cls.Role.OWNER: set()}
+        for requester_id, owner_id, book_id in requests:
+            keys[cls.Role.REQUESTER].add((requester_id, book_id))
+            keys[cls.Role.OWNER].add((owner_id, book_id))
+        for role, pairs in keys.items():
+            if not pairs:
+                continue
+            match = Q()
+            for user_id, book_id in pairs:
+                match |= Q(**{f"{role}_id": user_id, "book_id": book_id})
+            found = {(row["user_id"], row["book_key"]): row for row in cls.counts(role, RequestBook.objects.filter(match))}
+            cls._store(role, found.values())
+
+            gone = pairs - found.keys()
+            if gone:
+                match = Q()
+                for user_id, book_id in gone:
+                    match |= Q(user_id=user_id, book_id=book_id)
+                cls.objects.filter(match, role=role).delete()
+
+    @classmethod
+    def rebuild(cls, user_ids):
+        """Recount every summary of the given members, on both sides, from the RequestBook table"""
+        user_ids = list(user_ids)
+        cls.objects.filter(user_id__in=user_ids).delete()
+        for role in cls.Role:
+            cls._store(role, cls.counts(role, RequestBook.objects.filter(**{f"{role}_id__in": user_ids})))
+
+    @classmethod
+    def _store(cls, role, rows):
+        cls.objects.bulk_create(
+            [
+                cls(user_id=row["user_id"], role=role, book_id=row["book_key"], **{field: row[field] for field in cls.COUNTS})
+                for row in rows
+            ],
+            update_conflicts=True,
+            unique_fields=["user", "role", "book"],
+            update_fields=list(cls.COUNTS),
+            batch_size=1000,
+        )
+
+
+def refresh_request_summaries(sender, instance, **kwargs):
+    RequestSummary.refresh([(instance.requester_id, instance.owner_id, instance.book_id)])
+
+
+post_save.connect(refresh_request_summaries, sender=RequestBook)
+post_delete.connect(refresh_request_summaries, sender=RequestBook)
@@ -0,0 +1,127 @@
+"""
+Keyset ("cursor") pagination for long lists.
+
+OFFSET pagination makes Postgres read and throw away every row before the
+page, so page 500 costs 500 pages of work. Here a page instead starts from
+the sort key of the last row shown, which an index on those columns finds
+directly: every page costs the same.
+
+Cursors are opaque URL-safe tokens holding that sort key. A cursor that
+doesn't decode is treated as "start from the beginning" rather than an
+error, since they end up in bookmarks and shared links.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+
+from django.db.models import Q
+
+
+def _json_default(value):
+    # Timestamps travel as ISO strings, which the field lookups parse back
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"Can't use {type(value).__name__} in a cursor")
+
+
+def encode_cursor(values):
+    data = json.dumps(list(values), separators=(",", ":"), default=_json_default).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(token, length):
+    """The key values in a cursor, or None if the token is missing or malformed"""
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != length:
+        return None
+    if not all(isinstance(value, (str, int)) for value in values):
+        return None
+    return values
+
+
+def _split(field):
+    """("title", False) for "title", ("title", True) for "-title" """
+    return (field[1:], True) if field.startswith("-") else (field, False)
+
+
+def _flip(field):
+    name, descending = _split(field)
+    return name if descending else f"-{name}"
+
+
+def keyset_filter(fields, values, reverse=False):
+    """Rows after (or, with reverse, before) `values` in `fields` order.
+
+    Fields use order_by syntax, so "-name" sorts descending. Expands
+    (a, b) > (x, y) to a >= x AND (a > x OR b > y); the leading range
+    condition is what lets Postgres start an index scan at the cursor.
+    """
+
+    def lookup(field, strict):
+        name, descending = _split(field)
+        op = "lt" if descending != reverse else "gt"
+        return f"{name}__{op}" if strict else f"{name}__{op}e"
+
+    condition = Q(**{lookup(fields[-1], True): values[-1]})
+    for field, value in zip(reversed(fields[:-1]), reversed(values[:-1])):
+        condition = Q(**{lookup(field, True): value}) | (Q(**{_split(field)[0]: value}) & condition)
+    return Q(**{lookup(fields[0], False): values[0]}) & condition
+
+
+class KeysetPage:
+    """One page of results plus the cursors either side of it"""
+
+    def __init__(self, items, fields, has_next, has_previous):
+        self.items = items
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = self._cursor(items[-1], fields) if has_next else None
+        self.previous_cursor = self._cursor(items[0], fields) if has_previous else None
+
+    @staticmethod
+    def _cursor(item, fields):
+        # Items are model instances, or dicts from a values() queryset
+        if isinstance(item, dict):
+            return encode_cursor(item[_split(field)[0]] for field in fields)
+        return encode_cursor(getattr(item, _split(field)[0]) for field in fields)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def keyset_page(queryset, fields, per_page, after=None, before=None):
+    """Fetch one page of `queryset` ordered by `fields`, whose last entry must be unique.
+
+    `after` and `before` are cursors from a previous page's next_cursor and
+    previous_cursor. Runs a single query: one extra row is read to find out
+    whether there is another page.
+    """
+    fields = list(fields)
+    after_values = decode_cursor(after, len(fields))
+    before_values = None if after_values else decode_cursor(before, len(fields))
+
+    if before_values:
+        # Walk backwards from the cursor, then put the page back in order
+        rows = list(
+            queryset.filter(keyset_filter(fields, before_values, reverse=True))
+            .order_by(*(_flip(field) for field in fields))[: per_page + 1]
+        )
+        has_more = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        return KeysetPage(items, fields, has_next=bool(items), has_previous=has_more)
+
+    if after_values:
+        queryset = queryset.filter(keyset_filter(fields, after_values))
+    rows = list(queryset.order_by(*fields)[: per_page + 1])
+    items = rows[:per_page]
+    return KeysetPage(items, fields, has_next=len(rows) > per_page, has_previous=bool(after_values and items))
@@ -0,0 +1,155 @@
+"""
+Speculative prefetch of the next page of Google Books search results.
+
+Opt-in via settings.GOOGLE_BOOKS_PREFETCH["ENABLED"]. After a results page
+is served, the next page for the same query is fetched on a small thread
+pool and stored in the search cache, so the "next" click is served locally.
+Per-user limits stop one user's browsing from taking the whole pool, and
+the hit counters show whether prefetching pays for itself. Prefetches spend
+quota at background priority, so they stop before the interactive reserve.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connections
+
+from . import google_books
+from .quota import background_priority
+from .search_cache import make_key, search_cache
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_DEFAULTS = {
+    "ENABLED": False,
+    "MAX_WORKERS": 2,  # Threads per process doing prefetches
+    "PER_USER_LIMIT": 1,  # Prefetches one user may have in flight at once
+    "TRACKED_PAGES": 1024,  # Prefetched pages remembered for hit accounting
+}
+
+
+class SearchPrefetcher:
+    """Background fetcher for the page after the one just served"""
+
+    def __init__(self, config=None):
+        self._config = config
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = {}  # user key -> prefetches running
+        self._futures = set()
+        self._prefetched = OrderedDict()  # cache keys fetched ahead and not yet requested
+        self._counters = {
+            "scheduled": 0,
+            "skipped_user_limit": 0,
+            "skipped_cached": 0,
+            "completed": 0,
+            "failed": 0,
+            "hits": 0,
+        }
+
+    @property
+    def config(self):
+        if self._config is not None:
+            return self._config
+        return {**PREFETCH_DEFAULTS, **getattr(settings, "GOOGLE_BOOKS_PREFETCH", {})}
+
+    @property
+    def enabled(self):
+        return self.config["ENABLED"]
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.config["MAX_WORKERS"], thread_name_prefix="search-prefetch"
+                )
+            return self._executor
+
+    def schedule(self, user_key, query, start_index, max_results):
+        """Queue a prefetch of the given page. Never blocks the request.
+
+        Returns the Future, or None if prefetch is disabled or the user is at their limit.
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            if self._in_flight.get(user_key, 0) >= self.config["PER_USER_LIMIT"]:
+                self._counters["skipped_user_limit"] += 1
+                return None
+            self._in_flight[user_key] = self._in_flight.get(user_key, 0) + 1
+            self._counters["scheduled"] += 1
+
+        future = self._get_executor().submit(self._prefetch, user_key, query, start_index, max_results)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._discard_future)
+        return future
+
+    def _discard_future(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _prefetch(self, user_key, query, start_index, max_results):
+        try:
+            if search_cache.peek(query, start_index, max_results) is not None:
+                self._count("skipped_cached")
+                return
+            with background_priority():
+                google_books.fetch_search(query, start_index, max_results)
+            with self._lock:
+                self._counters["completed"] += 1
+                self._prefetched[make_key(query, start_index, max_results)] = True
+                while len(self._prefetched) > self.config["TRACKED_PAGES"]:
+                    self._prefetched.popitem(last=False)
+            logger.debug("Prefetched %r from index %s", query, start_index)
+        except Exception as e:
+            # A failed prefetch only costs the user the normal fetch later
+            self._count("failed")
+            logger.info("Prefetch of %r from index %s failed: %s", query, start_index, e)
+        finally:
+            with self._lock:
+                self._in_flight[user_key] -= 1
+                if not self._in_flight[user_key]:
+                    del self._in_flight[user_key]
+            # Pool threads outlive the request cycle that normally closes connections
+            connections.close_all()
+
+    def record_request(self, query, start_index, max_results):
+        """Count a hit if the requested page was one we fetched ahead"""
+        if not self._prefetched:
+            return
+        with self._lock:
+            if self._prefetched.pop(make_key(query, start_index, max_results), None):
+                self._counters["hits"] += 1
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def join(self, timeout=None):
+        """Wait for outstanding prefetches to finish"""
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures, timeout=timeout)
+
+    def stats(self):
+        """Counters for this process. hit_rate is the share of completed prefetches later requested"""
+        with self._lock:
+            stats = dict(self._counters, in_flight=sum(self._in_flight.values()))
+        stats["hit_rate"] = stats["hits"] / stats["completed"] if stats["completed"] else 0.0
+        return stats
+
+
+# One pool per process
+search_prefetcher = SearchPrefetcher()
+
+
+def prefetch_key_for(request, user):
+    """Identify who a prefetch is for, so per-user limits also cover anonymous users"""
+    if user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
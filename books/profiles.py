@@ -0,0 +1,77 @@
+"""
+Data for a member's profile page in a fixed number of queries.
+
+All the counters shown on the page are read from the member's UserStats
+row, joined onto the one query that loads the member. The shelves are
+fetched separately, a page at a time, by the profile JSON endpoints: each
+is a projection of just the columns the page renders, keyset-paginated in
+one of a few fixed sort orders, so the cost stays the same however many
+books a member has.
+"""
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.shortcuts import get_object_or_404
+
+from .models import CustomUser, Group, UserBook, Wishlist
+
+# Keyset orderings for each sort option; the last field of each is unique per member
+BOOK_SORTS = {
+    "title-asc": ("title", "id"),
+    "title-desc": ("-title", "-id"),
+    "recent": ("-date_added", "-id"),
+    "oldest": ("date_added", "id"),
+}
+WISH_SORTS = {
+    "title-asc": ("title", "book_id"),
+    "title-desc": ("-title", "-book_id"),
+    "most-available": ("-owners_count", "title", "book_id"),
+}
+GROUP_SORTS = {
+    "name-asc": ("group_name", "slug"),
+    "name-desc": ("-group_name", "-slug"),
+}
+
+
+def _open_wishes(user_pk):
+    return Wishlist.objects.filter(user=user_pk, removed_datetime__isnull=True)
+
+
+def profile_user(user_pk):
+    """The member with book_count, wish_count, group_count, requests_open, requests_received_open
+    and wishes_available (open wishes someone owns a copy of)"""
+    wishes_available = (
+        _open_wishes(OuterRef("pk"))
+        .filter(book__stats__owners__gt=0)
+        .order_by()
+        .values("user")
+        .annotate(n=Count("pk"))
+        .values("n")
+    )
+    # Members who have never done anything have no UserStats row yet
+    users = CustomUser.objects.annotate(
+        book_count=Coalesce(F("stats__books"), 0),
+        wish_count=Coalesce(F("stats__wishes"), 0),
+        group_count=Coalesce(F("stats__groups"), 0),
+        requests_open=Coalesce(F("stats__requests_open"), 0),
+        requests_received_open=Coalesce(F("stats__requests_received_open"), 0),
+        wishes_available=Coalesce(Subquery(wishes_available, output_field=IntegerField()), Value(0)),
+    )
+    return get_object_or_404(users, pk=user_pk)
+
+
+def profile_books(user_pk):
+    """The member's shelf: dicts of id, book_id, title and date_added"""
+    return UserBook.objects.filter(user=user_pk).values("id", "book_id", "date_added", title=F("book__title"))
+
+
+def profile_wishes(user_pk):
+    """Open wishes: dicts of book_id, title and owners_count from BookStats"""
+    return _open_wishes(user_pk).values(
+        "book_id", title=F("book__title"), owners_count=Coalesce(F("book__stats__owners"), 0)
+    )
+
+
+def profile_groups(user_pk):
+    """Groups the member belongs to: dicts of slug and group_name"""
+    return Group.objects.filter(group_memberships__user=user_pk).values("slug", "group_name")
@@ -0,0 +1,161 @@
+"""
+Shared Google Books quota, as a token bucket stored in the database.
+
+Every process draws from one ApiQuota row, so web workers, the prefetch
+pool and management commands all count against the same budget. Taking a
+token is a single conditional UPDATE (refill, check and spend in one
+statement), so no lock is held across round trips and a call costs one
+query. The bucket holds up to DAILY_QUOTA tokens
+and refills at DAILY_QUOTA per day.
+
+Work runs at interactive priority unless it is wrapped in
+`with background_priority():`. Background work may only spend tokens above
+RESERVE, so a refresh job or prefetching can never use up the budget that
+searches need. Both priorities fail fast with QuotaExceededError rather
+than waiting.
+"""
+
+import contextvars
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from requests.exceptions import RequestException
+
+from .models import ApiQuota
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+QUOTA_DEFAULTS = {
+    "ENABLED": True,
+    "BUCKET": "google_books",  # ApiQuota row name
+    "DAILY_QUOTA": 1000,  # Bucket size, refilled evenly over 24 hours
+    "RESERVE": 0.3,  # Share of the bucket only interactive calls may use
+}
+
+_priority = contextvars.ContextVar("google_books_priority", default=INTERACTIVE)
+
+
+class QuotaExceededError(RequestException):
+    """Raised instead of calling Google when the shared quota is spent"""
+
+
+@contextmanager
+def background_priority():
+    """Run Google calls in this block (and tasks it starts) at background priority.
+
+    Thread pools don't inherit context, so enter this inside the worker function.
+    """
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+class TokenBucket:
+    """Database-backed token bucket with an interactive-only reserve"""
+
+    def __init__(self, config=None):
+        self._config = config
+        self._lock = threading.Lock()
+        self._counters = {f"{outcome}_{priority}": 0 for outcome in ("granted", "denied") for priority in (INTERACTIVE, BACKGROUND)}
+
+    @property
+    def config(self):
+        # Read lazily so override_settings in tests is honoured
+        if self._config is not None:
+            return self._config
+        return {**QUOTA_DEFAULTS, **getattr(settings, "GOOGLE_BOOKS_QUOTA", {})}
+
+    @property
+    def capacity(self):
+        return float(self.config["DAILY_QUOTA"])
+
+    @property
+    def reserve(self):
+        return self.capacity * self.config["RESERVE"]
+
+    def _refilled(self, bucket, now):
+        rate = self.capacity / (24 * 60 * 60)
+        elapsed = max(0.0, (now - bucket.updated_at).total_seconds())
+        return min(self.capacity, bucket.tokens + elapsed * rate)
+
+    def _take(self, cost, floor):
+        """Refill and spend in one statement. Returns whether a row was updated"""
+        table = connection.ops.quote_name(ApiQuota._meta.db_table)
+        # The same refill as _refilled(), computed by Postgres against the row's current values
+        refilled = "LEAST(%(capacity)s, tokens + GREATEST(0, EXTRACT(EPOCH FROM (%(now)s - updated_at))) * %(rate)s)"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET tokens = {refilled} - %(cost)s, updated_at = GREATEST(updated_at, %(now)s) "
+                f"WHERE name = %(name)s AND {refilled} - %(cost)s >= %(floor)s",
+                {
+                    "capacity": self.capacity,
+                    "rate": self.capacity / (24 * 60 * 60),
+                    "now": timezone.now(),
+                    "cost": float(cost),
+                    "floor": floor,
+                    "name": self.config["BUCKET"],
+                },
+            )
+            return cursor.rowcount == 1
+
+    def acquire(self, cost=1):
+        """Take `cost` tokens at the current priority, or raise QuotaExceededError"""
+        if not self.config["ENABLED"]:
+            return
+        priority = current_priority()
+        floor = self.reserve if priority == BACKGROUND else 0.0
+
+        granted = self._take(cost, floor)
+        if not granted and not ApiQuota.objects.filter(name=self.config["BUCKET"]).exists():
+            # First use: start full. ignore_conflicts covers another process creating it first
+            ApiQuota.objects.bulk_create(
+                [ApiQuota(name=self.config["BUCKET"], tokens=self.capacity, updated_at=timezone.now())],
+                ignore_conflicts=True,
+            )
+            granted = self._take(cost, floor)
+
+        self._count(f"{'granted' if granted else 'denied'}_{priority}")
+        if not granted:
+            logger.warning("Google Books %s call refused: %.1f quota tokens left", priority, self.remaining())
+            raise QuotaExceededError("Book search has reached its usage limit, please try again later")
+
+    def remaining(self):
+        """Tokens available right now, without spending any"""
+        bucket = ApiQuota.objects.filter(name=self.config["BUCKET"]).first()
+        if bucket is None:
+            return self.capacity
+        return self._refilled(bucket, timezone.now())
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self):
+        """Shared remaining budget plus this process's grant/deny counters"""
+        remaining = self.remaining()
+        with self._lock:
+            stats = dict(self._counters)
+        stats.update(
+            remaining=round(remaining, 1),
+            capacity=self.capacity,
+            background_available=round(max(0.0, remaining - self.reserve), 1),
+            refill_per_hour=round(self.capacity / 24, 1),
+        )
+        return stats
+
+
+# One instance per process; the bucket itself lives in the database
+google_books_quota = TokenBucket()
@@ -0,0 +1,137 @@
+"""
+Response cache for Google Books volume searches.
+
+Two levels: a small in-process LRU (L1) in front of a Django cache shared
+by every worker process (L2, database-backed by default - see CACHES in
+settings). Entries are keyed on the normalized (query, startIndex,
+maxResults) tuple and expire after a TTL at both levels.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_DEFAULTS = {
+    "ALIAS": "google_books",  # Django cache used as the shared L2
+    "TTL": 60 * 60,  # Seconds a search response stays valid
+    "L1_MAX_ENTRIES": 256,  # In-process LRU size
+    "L1_TTL": 5 * 60,  # L1 is capped lower so workers don't drift far apart
+}
+
+
+def normalize_query(query):
+    """Collapse whitespace and case so trivially different searches share an entry"""
+    return " ".join(str(query).split()).lower()
+
+
+def make_key(query, start_index, max_results):
+    """Build a cache key from the normalized search parameters.
+
+    Hashed so arbitrary user input is always a valid, fixed-length cache key.
+    """
+    raw = f"{normalize_query(query)}|{int(start_index)}|{int(max_results)}"
+    return "books:search:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """TTL-bounded two-level cache for raw Google Books search responses"""
+
+    def __init__(self, config=None):
+        self._config = config
+        self._l1 = OrderedDict()  # key -> (expires_at, data)
+        self._lock = threading.Lock()
+        self._counters = {"l1_hits": 0, "l2_hits": 0, "misses": 0}
+
+    @property
+    def config(self):
+        # Read lazily so override_settings in tests is honoured
+        if self._config is not None:
+            return self._config
+        return {**SEARCH_CACHE_DEFAULTS, **getattr(settings, "GOOGLE_BOOKS_SEARCH_CACHE", {})}
+
+    @property
+    def backend(self):
+        return caches[self.config["ALIAS"]]
+
+    def get(self, query, start_index, max_results):
+        """Return the cached response for a search, or None on a miss"""
+        key = make_key(query, start_index, max_results)
+
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is not None:
+                expires_at, data = entry
+                if expires_at > time.monotonic():
+                    self._l1.move_to_end(key)
+                    self._counters["l1_hits"] += 1
+                    logger.debug("Search cache L1 hit for %r", query)
+                    return data
+                del self._l1[key]
+
+        data = self.backend.get(key)
+        if data is not None:
+            self._store_l1(key, data)
+            self._count("l2_hits")
+            logger.debug("Search cache L2 hit for %r", query)
+            return data
+
+        self._count("misses")
+        logger.debug("Search cache miss for %r", query)
+        return None
+
+    def peek(self, query, start_index, max_results):
+        """Shared-level lookup that doesn't touch the hit/miss counters.
+
+        Used while waiting on another process to fill the entry.
+        """
+        key = make_key(query, start_index, max_results)
+        data = self.backend.get(key)
+        if data is not None:
+            self._store_l1(key, data)
+        return data
+
+    def set(self, query, start_index, max_results, data):
+        """Store a search response at both cache levels"""
+        key = make_key(query, start_index, max_results)
+        self.backend.set(key, data, timeout=self.config["TTL"])
+        self._store_l1(key, data)
+
+    def _store_l1(self, key, data):
+        ttl = min(self.config["L1_TTL"], self.config["TTL"])
+        with self._lock:
+            self._l1[key] = (time.monotonic() + ttl, data)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.config["L1_MAX_ENTRIES"]:
+                self._l1.popitem(last=False)  # Evict least recently used
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self):
+        """Hit/miss counters for this process"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["l1_size"] = len(self._l1)
+        lookups = stats["l1_hits"] + stats["l2_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["l1_hits"] + stats["l2_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self, shared=False):
+        """Drop the L1 (and optionally the shared L2) and reset the counters"""
+        with self._lock:
+            self._l1.clear()
+            self._counters = dict.fromkeys(self._counters, 0)
+        if shared:
+            self.backend.clear()
+
+
+# One instance per process, shared by every request thread
+search_cache = SearchCache()
@@ -0,0 +1,140 @@
+"""
+Single-flight coalescing of identical concurrent calls.
+
+Within a process, the first caller for a key runs the call and every
+concurrent caller with the same key waits for its result. Across processes,
+the leader also takes a short lease in the shared cache; a leader in another
+process that finds the lease held polls for the result (via `recheck`)
+instead of calling upstream, until the lease is released or a wait timeout
+passes. Each lease holds a token unique to its leader, so a leader whose
+fetch outlived the lease doesn't release the one another process has
+taken since.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+import weakref
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_DEFAULTS = {
+    "ALIAS": "google_books",  # Shared cache holding cross-process leases
+    "LEASE_TIMEOUT": 20,  # Seconds before a crashed leader's lease lapses
+    "WAIT_TIMEOUT": 10,  # Seconds a follower waits before fetching itself
+    "POLL_INTERVAL": 0.1,  # Seconds between cross-process rechecks
+}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key"""
+
+    def __init__(self, config=None):
+        self._config = config
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._async_calls = weakref.WeakKeyDictionary()  # event loop -> {key: task}
+        self._counters = {"leaders": 0, "followers": 0, "remote_waits": 0}
+
+    @property
+    def config(self):
+        if self._config is not None:
+            return self._config
+        return {**SINGLE_FLIGHT_DEFAULTS, **getattr(settings, "GOOGLE_BOOKS_SINGLE_FLIGHT", {})}
+
+    def do(self, key, fn, recheck=None):
+        """Return fn(), running it at most once at a time per key.
+
+        `recheck` returns the result if another process has already produced
+        it (e.g. a shared-cache lookup), or None.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._counters["leaders" if leader else "followers"] += 1
+
+        if not leader:
+            if not call.done.wait(self.config["WAIT_TIMEOUT"]):
+                logger.warning("Timed out waiting for in-flight call %s, calling directly", key)
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._lead(key, fn, recheck)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _lead(self, key, fn, recheck):
+        lease_key = f"{key}:lease"
+        token = uuid.uuid4().hex
+        backend = caches[self.config["ALIAS"]]
+
+        if recheck is not None and not backend.add(lease_key, token, timeout=self.config["LEASE_TIMEOUT"]):
+            # Another process is already fetching this key: wait for its result
+            self._count("remote_waits")
+            deadline = time.monotonic() + self.config["WAIT_TIMEOUT"]
+            while time.monotonic() < deadline:
+                time.sleep(self.config["POLL_INTERVAL"])
+                result = recheck()
+                if result is not None:
+                    return result
+                if backend.add(lease_key, token, timeout=self.config["LEASE_TIMEOUT"]):
+                    break  # The other leader gave up without a result; take over
+            else:
+                logger.warning("Timed out waiting for another process on %s, calling directly", key)
+                return fn()
+
+        try:
+            return fn()
+        finally:
+            # Compare-then-delete: past LEASE_TIMEOUT the lease may be another leader's.
+            # (The cache API has no atomic version; the race needs a lapse in between)
+            if recheck is not None and backend.get(lease_key) == token:
+                backend.delete(lease_key)
+
+    async def ado(self, key, coro_fn):
+        """Async do(): coalesces concurrent calls on the same event loop"""
+        calls = self._async_calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        if task is None:
+            self._count("leaders")
+            task = calls[key] = asyncio.ensure_future(coro_fn())
+            task.add_done_callback(lambda _: calls.pop(key, None))
+        else:
+            self._count("followers")
+        # Shield so one cancelled waiter doesn't cancel the fetch for the rest
+        return await asyncio.shield(task)
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, in_flight=len(self._calls))
+
+
+# One instance per process for Google Books searches
+search_flight = SingleFlight()
@@ -1,5 +1,7 @@
 from django import template
 
+from books.covers import cover_sources
+
 register = template.Library()
 
 @register.filter(name='split')
@@ -8,3 +10,20 @@ def split(value, arg):
     if value:
         return [item.strip() for item in value.split(arg)]
     return []
+
+
+@register.inclusion_tag("books/book_cover.html")
+def book_cover(book, width, css_class="", style="", alt=None):
+    """<picture> for a book cover shown `width` CSS pixels wide.
+
+    Uses the locally cached WebP/JPEG renditions once the cover worker has
+    stored them, and the remote thumbnail until then.
+    """
+    return {
+        "book": book,
+        "sources": cover_sources(book, int(width)),
+        "width": width,
+        "css_class": css_class,
+        "style": style,
+        "alt": book.title if alt is None else alt,
+    }
@@ -0,0 +1,154 @@
+"""
+Unit tests for the incrementally maintained BookStats counters
+"""
+import io
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from books.models import Book, BookStats, Transaction, UserBook, Wishlist
+
+User = get_user_model()
+
+
+class TestBookStatsSignals(TestCase):
+    """Test cases for keeping the counters in step with the source tables"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="testpass123")
+        self.reader = User.objects.create_user(username="reader", password="testpass123")
+        self.other = User.objects.create_user(username="other", password="testpass123")
+        self.book = Book.objects.create(google_book_id="vol_dune", title="Dune")
+
+    def stats(self):
+        return BookStats.objects.get(book=self.book)
+
+    def counters(self):
+        stats = self.stats()
+        return stats.active_wishers, stats.owners, stats.active_loans
+
+    def test_wish_lifecycle(self):
+        wish = Wishlist.objects.create(user=self.reader, book=self.book)
+        Wishlist.objects.create(user=self.other, book=self.book)
+        self.assertEqual(self.counters(), (2, 0, 0))
+
+        wish.removed_datetime = timezone.now()
+        wish.save()
+        wish.save()  # Saving again doesn't decrement twice
+        self.assertEqual(self.counters(), (1, 0, 0))
+
+        Wishlist.objects.get(pk=wish.pk).delete()  # Already removed, so no change
+        self.assertEqual(self.counters(), (1, 0, 0))
+
+    def test_owning_and_lending(self):
+        Wishlist.objects.create(user=self.reader, book=self.book)
+        user_book = UserBook.objects.create(user=self.owner, book=self.book)
+        self.assertEqual(self.counters(), (1, 1, 0))
+
+        # Lending to the wisher also clears their wish
+        loan = Transaction.objects.create(owner=self.owner, borrower=self.reader, book=self.book)
+        self.assertEqual(self.counters(), (0, 1, 1))
+
+        loan.returned_datetime = timezone.now()
+        loan.save()
+        user_book.delete()
+        self.assertEqual(self.counters(), (0, 0, 0))
+
+    def test_deleting_a_book_removes_its_stats(self):
+        UserBook.objects.create(user=self.owner, book=self.book)
+        Wishlist.objects.create(user=self.reader, book=self.book)
+        self.book.delete()
+        self.assertFalse(BookStats.objects.exists())
+
+    def test_rebuild_command_fixes_drift(self):
+        UserBook.objects.create(user=self.owner, book=self.book)
+        Wishlist.objects.create(user=self.reader, book=self.book)
+        BookStats.objects.update(active_wishers=7, owners=0)
+        Book.objects.create(google_book_id="vol_empty", title="Unloved")
+
+        call_command("rebuild_book_stats", "--batch-size", "1", stdout=io.StringIO())
+
+        self.assertEqual(self.counters(), (1, 1, 0))
+        self.assertEqual(BookStats.objects.count(), 2)
+
+
+class TestWantedBooksPage(TestCase):
+    """Test cases for the paginated most-wanted listing"""
+
+    def setUp(self):
+        users = [User.objects.create_user(username=f"user{i}", password="testpass123") for i in range(3)]
+        for i, wishers in enumerate([1, 3, 0, 2]):
+            book = Book.objects.create(google_book_id=f"vol_{i}", title=f"Book {i}")
+            for user in users[:wishers]:
+                Wishlist.objects.create(user=user, book=book)
+        UserBook.objects.create(user=users[2], book=Book.objects.get(pk="vol_0"))
+
+    def test_most_wanted_first_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("book_database_wishes"))
+        self.assertEqual([stats.book_id for stats in response.context["book_stats"]], ["vol_1", "vol_3", "vol_0"])
+        self.assertContains(response, "3 wanted")
+        self.assertContains(response, "1 available")
+
+    def test_lent_copies_are_not_available(self):
+        owner, borrower = User.objects.get(username="user2"), User.objects.get(username="user0")
+        Transaction.objects.create(owner=owner, borrower=borrower, book=Book.objects.get(pk="vol_0"))
+        response = self.client.get(reverse("book_database_wishes"))
+        self.assertNotContains(response, "available</span>")
+
+
+class TestAvailableNow(TestCase):
+    """Test cases for filtering and sorting by copies free to borrow"""
+
+    def setUp(self):
+        self.owners = [User.objects.create_user(username=f"owner{i}", password="testpass123") for i in range(3)]
+        self.borrower = User.objects.create_user(username="borrower", password="testpass123")
+        # Dune: 3 copies, 1 on loan. Emma: 1 copy, on loan. Hobbit: 1 copy
+        self.dune = self.make_book("vol_dune", "Dune", owners=3, on_loan=1)
+        self.emma = self.make_book("vol_emma", "Emma", owners=1, on_loan=1)
+        self.hobbit = self.make_book("vol_hobbit", "The Hobbit", owners=1, on_loan=0)
+
+    def make_book(self, pk, title, owners, on_loan):
+        book = Book.objects.create(google_book_id=pk, title=title, authors="Someone")
+        for owner in self.owners[:owners]:
+            UserBook.objects.create(user=owner, book=book)
+        for owner in self.owners[:on_loan]:
+            Transaction.objects.create(owner=owner, borrower=self.borrower, book=book)
+        return book
+
+    def test_counter_follows_loans(self):
+        self.assertEqual(BookStats.objects.get(book=self.dune).available_copies, 2)
+        loan = Transaction.objects.get(book=self.emma)
+        loan.returned_datetime = timezone.now()
+        loan.save()
+        self.assertEqual(BookStats.objects.get(book=self.emma).available_copies, 1)
+
+    def test_catalog_filter_and_sort(self):
+        response = self.client.get(reverse("book_database"), {"available": "1", "sort": "available"})
+        self.assertEqual([book.pk for book in response.context["books"]], ["vol_dune", "vol_hobbit"])
+        self.assertEqual([book.available_copies for book in response.context["books"]], [2, 1])
+
+        response = self.client.get(reverse("book_database"))
+        self.assertEqual([book.pk for book in response.context["books"]], ["vol_dune", "vol_emma", "vol_hobbit"])
+        self.assertContains(response, "All on loan")
+
+    def test_available_only_search_stays_local(self):
+        with mock.patch("books.google_books.GoogleBooksClient.search_volumes") as search_volumes:
+            response = self.client.get(reverse("book_search"), {"query": "someone", "available": "1"})
+        search_volumes.assert_not_called()
+        self.assertEqual({book.pk for book in response.context["local_books"]}, {"vol_dune", "vol_hobbit"})
+
+    def test_detail_page_shows_counts(self):
+        response = self.client.get(reverse("single_book", kwargs={"pk": "vol_dune"}))
+        self.assertEqual(response.context["owners_count"], 3)
+        self.assertEqual(response.context["available_copies"], 2)
+
+    def test_profile_page_keeps_its_own_counts(self):
+        Wishlist.objects.create(user=self.borrower, book=self.hobbit)
+        response = self.client.get(reverse("user_account", kwargs={"pk": self.borrower.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["user_wish_count"], 1)
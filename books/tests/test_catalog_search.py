@@ -0,0 +1,106 @@
+"""
+Unit tests for local-first full-text search over the Book table
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from requests.exceptions import ConnectionError
+
+from books.catalog_search import search_catalog
+from books.models import Book, Transaction, UserBook
+from books.search_cache import search_cache
+
+User = get_user_model()
+
+
+def fake_search_response():
+    return {"totalItems": 1, "items": [{"id": "vol_google", "volumeInfo": {"title": "Dune Messiah"}}]}
+
+
+class TestCatalogSearch(TestCase):
+    """Test cases for matching, ranking and availability"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="testpass123")
+        self.borrower = User.objects.create_user(username="borrower", password="testpass123")
+        self.dune = Book.objects.create(
+            google_book_id="vol_dune", title="Dune", authors="Frank Herbert", categories="Fiction"
+        )
+        self.guide = Book.objects.create(
+            google_book_id="vol_guide",
+            title="A Reader's Guide",
+            authors="Various",
+            description="Covers classic science fiction such as Dune.",
+        )
+        Book.objects.create(google_book_id="vol_hobbit", title="The Hobbit", authors="J.R.R. Tolkien")
+
+    def test_matches_across_fields(self):
+        self.assertEqual([b.pk for b in search_catalog("herbert")], ["vol_dune"])
+        self.assertEqual([b.pk for b in search_catalog("tolkien hobbit")], ["vol_hobbit"])
+
+    def test_title_match_ranks_above_description_match(self):
+        self.assertEqual([b.pk for b in search_catalog("dune")], ["vol_dune", "vol_guide"])
+
+    def test_stemming_and_websearch_syntax(self):
+        """Test that plurals match and "-term" excludes"""
+        self.assertEqual([b.pk for b in search_catalog("hobbits")], ["vol_hobbit"])
+        self.assertEqual([b.pk for b in search_catalog("dune -herbert")], ["vol_guide"])
+
+    def test_malformed_query_does_not_raise(self):
+        self.assertEqual(search_catalog('"unterminated & | !'), [])
+
+    def test_availability_counts(self):
+        UserBook.objects.create(user=self.owner, book=self.dune)
+        UserBook.objects.create(user=self.borrower, book=self.dune)
+        Transaction.objects.create(owner=self.owner, borrower=self.borrower, book=self.dune)
+
+        dune = search_catalog("herbert")[0]
+
+        self.assertEqual(dune.owners_count, 2)
+        self.assertEqual(dune.on_loan_count, 1)
+        self.assertEqual(dune.available_copies, 1)
+
+    def test_limit(self):
+        self.assertEqual(len(search_catalog("dune", limit=1)), 1)
+
+
+@override_settings(CATALOG_SEARCH={"MIN_RESULTS": 2, "MAX_RESULTS": 12})
+@mock.patch("books.google_books.GoogleBooksClient.search_volumes", return_value=fake_search_response())
+class TestBookSearchLocalFirst(TestCase):
+    """Test that book_search only goes to Google when the catalog isn't enough"""
+
+    def setUp(self):
+        search_cache.clear(shared=True)
+        Book.objects.create(google_book_id="vol_dune", title="Dune", authors="Frank Herbert")
+        Book.objects.create(google_book_id="vol_children", title="Children of Dune", authors="Frank Herbert")
+
+    def test_enough_local_results_skip_google(self, mock_search):
+        response = self.client.get(reverse("book_search"), {"query": "dune"})
+
+        mock_search.assert_not_called()
+        self.assertEqual({b.pk for b in response.context["local_books"]}, {"vol_dune", "vol_children"})
+        self.assertFalse(response.context["searched_google"])
+        self.assertContains(response, "source=google")
+
+    def test_too_few_local_results_also_search_google(self, mock_search):
+        response = self.client.get(reverse("book_search"), {"query": "children"})
+
+        mock_search.assert_called_once()
+        self.assertEqual(len(response.context["local_books"]), 1)
+        self.assertEqual(response.context["books"][0]["id_google"], "vol_google")
+
+    def test_user_can_ask_for_google_results(self, mock_search):
+        response = self.client.get(reverse("book_search"), {"query": "dune", "source": "google"})
+
+        mock_search.assert_called_once()
+        self.assertTrue(response.context["searched_google"])
+
+    def test_google_failure_still_shows_local_results(self, mock_search):
+        mock_search.side_effect = ConnectionError("down")
+        response = self.client.get(reverse("book_search"), {"query": "children"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("down", response.context["error_message"])
+        self.assertEqual(len(response.context["local_books"]), 1)
@@ -0,0 +1,193 @@
+"""
+Unit tests for the local cover image cache
+"""
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from books.covers import CoverError, cache_cover, cover_path, download, pending_books, store
+from books.models import Book
+
+COVERS = {"DIR": "covers", "WIDTHS": (80, 160)}
+
+
+def fake_jpeg(width=128, height=192, color="red"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@override_settings(BOOK_COVERS=COVERS)
+class CoverTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class TestCoverStorage(CoverTestCase):
+    """Test cases for resizing and content-addressed storage"""
+
+    def test_store_writes_every_width_and_format(self):
+        key = store(fake_jpeg())
+
+        for name in ("80.webp", "80.jpg", "160.webp", "160.jpg"):
+            self.assertTrue(default_storage.exists(cover_path(key, name)), name)
+        with default_storage.open(cover_path(key, "80.webp")) as f:
+            self.assertEqual(Image.open(f).size, (80, 120))
+        with default_storage.open(cover_path(key, "160.jpg")) as f:
+            self.assertEqual(Image.open(f).size, (128, 192))  # Never upscaled
+
+    def test_identical_images_share_a_key(self):
+        self.assertEqual(store(fake_jpeg()), store(fake_jpeg()))
+        self.assertNotEqual(store(fake_jpeg()), store(fake_jpeg(color="blue")))
+
+    def test_rejects_non_images(self):
+        with self.assertRaises(CoverError):
+            store(b"<html>Not found</html>")
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 100), self.assertRaises(CoverError):
+            store(fake_jpeg())  # A decompression bomb, as far as PIL is concerned
+
+
+class TestCacheCover(CoverTestCase):
+    """Test cases for the worker's per-book step"""
+
+    def setUp(self):
+        super().setUp()
+        self.book = Book.objects.create(google_book_id="vol_001", title="Dune", thumbnail="http://books.google.com/x")
+
+    @mock.patch("books.covers.download", return_value=fake_jpeg())
+    def test_cached_cover_recorded_on_book(self, mock_download):
+        self.assertTrue(cache_cover(self.book))
+
+        self.book.refresh_from_db()
+        self.assertEqual(len(self.book.cover_key), 64)
+        self.assertNotIn(self.book, pending_books())
+
+    @mock.patch("books.covers.download", side_effect=CoverError("404"))
+    def test_failures_retried_later(self, mock_download):
+        self.assertFalse(cache_cover(self.book))
+
+        self.assertNotIn(self.book, pending_books())
+        Book.objects.filter(pk=self.book.pk).update(cover_checked_at=timezone.now() - timedelta(days=2))
+        self.assertIn(self.book, pending_books())
+
+    def test_never_checked_books_come_first(self):
+        Book.objects.filter(pk=self.book.pk).update(cover_checked_at=timezone.now() - timedelta(days=2))
+        Book.objects.create(google_book_id="vol_002", title="Emma", thumbnail="http://books.google.com/y")
+        self.assertEqual([b.pk for b in pending_books()], ["vol_002", "vol_001"])
+
+    def test_books_without_thumbnail_not_pending(self):
+        Book.objects.create(google_book_id="vol_002", title="No Cover", thumbnail="")
+        self.assertEqual([b.pk for b in pending_books()], ["vol_001"])
+
+    @mock.patch("books.covers.download", return_value=fake_jpeg())
+    def test_fetch_covers_command(self, mock_download):
+        Book.objects.create(google_book_id="vol_002", title="Children of Dune", thumbnail="http://books.google.com/y")
+
+        call_command("fetch_covers", "--workers", "2", stdout=io.StringIO())
+
+        self.assertEqual(mock_download.call_count, 2)
+        self.assertFalse(Book.objects.filter(cover_key="").exists())
+
+    def test_fetch_covers_command_survives_unexpected_errors(self):
+        Book.objects.create(google_book_id="vol_002", title="Children of Dune", thumbnail="http://books.google.com/y")
+        bomb = Image.DecompressionBombError("Image size exceeds limit")
+        with mock.patch("books.covers.download", return_value=fake_jpeg()), \
+                mock.patch("books.covers.store", side_effect=[bomb, RuntimeError("disk full")]):
+            call_command("fetch_covers", "--workers", "1", stdout=io.StringIO())
+
+        errors = dict(Book.objects.values_list("pk", "cover_error"))
+        self.assertEqual(errors, {"vol_001": "DecompressionBombError: Image size exceeds limit", "vol_002": "RuntimeError: disk full"})
+        self.assertFalse(Book.objects.filter(cover_checked_at__isnull=True).exists())
+
+
+class TestCoverDownload(CoverTestCase):
+    """Test cases for which URLs the cover worker will fetch"""
+
+    def response(self, status=200, location=None):
+        response = mock.MagicMock(status_code=status, is_redirect=location is not None, headers={"Location": location})
+        response.__enter__.return_value = response
+        response.raw.read.return_value = b"image"
+        return response
+
+    def test_only_google_image_hosts_over_https(self):
+        for url in (
+            "http://169.254.169.254/latest/meta-data",
+            "https://books.google.com.evil.example/x",
+            "https://user@books.google.com/x",
+            "https://books.google.com:8443/x",
+            "file:///etc/passwd",
+        ):
+            with mock.patch("books.covers._session.get") as get, self.assertRaises(CoverError, msg=url):
+                download(url)
+            get.assert_not_called()
+
+    def test_http_thumbnails_are_fetched_over_https(self):
+        with mock.patch("books.covers._session.get", return_value=self.response()) as get:
+            self.assertEqual(download("http://books.google.com/books/content?id=x"), b"image")
+        self.assertEqual(get.call_args.args[0], "https://books.google.com/books/content?id=x")
+        self.assertFalse(get.call_args.kwargs["allow_redirects"])
+
+    def test_redirects_must_stay_on_google_hosts(self):
+        hops = [self.response(302, "https://books.googleusercontent.com/img"), self.response()]
+        with mock.patch("books.covers._session.get", side_effect=hops):
+            self.assertEqual(download("https://books.google.com/x"), b"image")
+
+        with mock.patch("books.covers._session.get", return_value=self.response(302, "http://10.0.0.1/admin")) as get, \
+                self.assertRaises(CoverError):
+            download("https://books.google.com/x")
+        self.assertEqual(get.call_count, 1)
+
+
+class TestCoverServing(CoverTestCase):
+    """Test cases for the cover view and the book_cover template tag"""
+
+    def setUp(self):
+        super().setUp()
+        self.key = store(fake_jpeg())
+        self.book = Book.objects.create(google_book_id="vol_001", title="Dune", thumbnail="http://books.google.com/x")
+
+    def test_served_with_immutable_cache_headers(self):
+        response = self.client.get(reverse("cover_image", kwargs={"key": self.key, "name": "80.webp"}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+
+    def test_unknown_or_malformed_paths_404(self):
+        for key, name in ((self.key, "81.jpg"), ("0" * 64, "80.jpg"), (self.key, "80.png"), ("..", "80.jpg")):
+            response = self.client.get(reverse("cover_image", kwargs={"key": key, "name": name}))
+            self.assertEqual(response.status_code, 404, (key, name))
+
+    def render_cover(self):
+        template = Template('{% load book_extras %}{% book_cover book 80 css_class="cover" %}')
+        return template.render(Context({"book": self.book}))
+
+    def test_tag_uses_remote_thumbnail_until_cached(self):
+        html = self.render_cover()
+        self.assertIn('src="http://books.google.com/x"', html)
+        self.assertNotIn("<picture", html)
+
+    def test_tag_uses_local_renditions_once_cached(self):
+        self.book.cover_key = self.key
+        html = self.render_cover()
+
+        self.assertIn('type="image/webp"', html)
+        self.assertIn(f"/covers/{self.key}/80.webp 80w", html)
+        self.assertIn(f"/covers/{self.key}/160.jpg 160w", html)
+        self.assertIn(f'src="/covers/{self.key}/80.jpg"', html)
+        self.assertNotIn("books.google.com", html)
@@ -0,0 +1,177 @@
+"""
+Unit tests for background enrichment of skeleton and stale books
+"""
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+from requests.exceptions import HTTPError
+
+from books import google_books
+from books.enrichment import RateLimiter
+from books.models import Book, CustomUser, UserBook
+
+
+def fake_volume(volume_id, title="Dune", isbn13="9780441013593", rating=4.5):
+    return {
+        "id": volume_id,
+        "volumeInfo": {
+            "title": title,
+            "authors": ["Frank Herbert"],
+            "industryIdentifiers": [{"type": "ISBN_13", "identifier": isbn13}],
+            "averageRating": rating,
+            "imageLinks": {"thumbnail": f"http://books.google.com/{volume_id}"},
+            "infoLink": f"https://books.google.com/info/{volume_id}",
+        },
+    }
+
+
+@mock.patch("books.google_books.GoogleBooksClient.get_volume")
+class TestEnrichBooks(TestCase):
+    """Test cases for the enrich_books command"""
+
+    def setUp(self):
+        fd, self.checkpoint = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        os.remove(self.checkpoint)
+        self.addCleanup(lambda: os.path.exists(self.checkpoint) and os.remove(self.checkpoint))
+        self.user = CustomUser.objects.create_user(username="testuser", password="testpass123")
+
+    def enrich(self, *args):
+        call_command(
+            "enrich_books", "--rate", "0", "--workers", "2", "--checkpoint", self.checkpoint, *args,
+            stdout=io.StringIO(),
+        )
+
+    def test_skeleton_books_filled_in(self, mock_get_volume):
+        mock_get_volume.side_effect = lambda volume_id: fake_volume(volume_id)
+        UserBook.assign_book_to_user(self.user, "vol_001")
+
+        self.enrich()
+
+        book = Book.objects.get(pk="vol_001")
+        self.assertEqual((book.title, book.authors, book.ID_ISBN_13), ("Dune", "Frank Herbert", "9780441013593"))
+        self.assertEqual(book.average_rating, 4.5)
+        self.assertIsNotNone(book.metadata_refreshed_at)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_only_stale_books_refreshed(self, mock_get_volume):
+        mock_get_volume.side_effect = lambda volume_id: fake_volume(volume_id, rating=3.0)
+        Book.objects.create(google_book_id="vol_fresh", title="Fresh", metadata_refreshed_at=timezone.now())
+        Book.objects.create(
+            google_book_id="vol_stale", title="Stale", description="Keep me",
+            thumbnail="http://old", cover_key="a" * 64,
+            metadata_refreshed_at=timezone.now() - timedelta(days=60),
+        )
+
+        self.enrich()
+
+        mock_get_volume.assert_called_once_with("vol_stale")
+        stale = Book.objects.get(pk="vol_stale")
+        self.assertEqual(stale.average_rating, 3)
+        self.assertEqual(stale.description, "Keep me")  # Google had none; not blanked
+        self.assertEqual(stale.cover_key, "")  # New thumbnail is queued for the cover worker
+
+    def test_duplicate_isbn_left_off(self, mock_get_volume):
+        mock_get_volume.side_effect = lambda volume_id: fake_volume(volume_id)
+        Book.objects.create(google_book_id="vol_owner", title="Dune", ID_ISBN_13="9780441013593",
+                            metadata_refreshed_at=timezone.now())
+        Book.objects.create(google_book_id="vol_a", title="")
+        Book.objects.create(google_book_id="vol_b", title="")
+
+        self.enrich()
+
+        self.assertEqual(Book.objects.filter(ID_ISBN_13="9780441013593").count(), 1)
+        self.assertEqual(Book.objects.filter(title="Dune").count(), 3)
+
+    def test_failed_volumes_skipped(self, mock_get_volume):
+        mock_get_volume.side_effect = HTTPError("404")
+        Book.objects.create(google_book_id="vol_gone", title="")
+
+        self.enrich()
+
+        book = Book.objects.get(pk="vol_gone")
+        self.assertIsNone(book.metadata_refreshed_at)
+        self.assertEqual(book.metadata_failures, 1)
+        self.assertAlmostEqual(book.metadata_retry_at - timezone.now(), timedelta(hours=1), delta=timedelta(minutes=1))
+
+    def test_failed_volumes_back_off_until_they_succeed(self, mock_get_volume):
+        mock_get_volume.side_effect = HTTPError("503")
+        Book.objects.create(google_book_id="vol_flaky", title="")
+        self.enrich()
+        self.enrich()  # Still backing off: not fetched again
+        self.assertEqual(mock_get_volume.call_count, 1)
+
+        Book.objects.update(metadata_retry_at=timezone.now())
+        self.enrich()
+        book = Book.objects.get(pk="vol_flaky")
+        self.assertEqual(book.metadata_failures, 2)
+        self.assertAlmostEqual(book.metadata_retry_at - timezone.now(), timedelta(hours=2), delta=timedelta(minutes=1))
+
+        Book.objects.update(metadata_retry_at=timezone.now())
+        mock_get_volume.side_effect = lambda volume_id: fake_volume(volume_id)
+        self.enrich()
+        book = Book.objects.get(pk="vol_flaky")
+        self.assertEqual((book.title, book.metadata_failures, book.metadata_retry_at), ("Dune", 0, None))
+
+    def test_worker_connections_closed(self, mock_get_volume):
+        mock_get_volume.side_effect = lambda volume_id: fake_volume(volume_id)
+        Book.objects.create(google_book_id="vol_001", title="")
+        closed_by = []
+
+        with mock.patch("books.enrichment.connections.close_all",
+                        side_effect=lambda: closed_by.append(threading.current_thread().name)):
+            self.enrich()
+
+        self.assertEqual(len(set(closed_by)), 2)
+        self.assertTrue(all(name.startswith("enrich-books") for name in closed_by))
+
+    def test_resumes_from_checkpoint(self, mock_get_volume):
+        mock_get_volume.side_effect = lambda volume_id: fake_volume(volume_id, isbn13=volume_id[-3:])
+        for volume_id in ("vol_001", "vol_002", "vol_003"):
+            Book.objects.create(google_book_id=volume_id, title="")
+        with open(self.checkpoint, "w") as f:
+            json.dump({"phase": "skeleton", "after": "vol_002"}, f)
+
+        self.enrich()
+
+        self.assertEqual([c.args[0] for c in mock_get_volume.call_args_list], ["vol_003"])
+
+    def test_open_breaker_stops_and_keeps_checkpoint(self, mock_get_volume):
+        for volume_id in ("vol_001", "vol_002"):
+            Book.objects.create(google_book_id=volume_id, title="")
+        mock_get_volume.side_effect = [fake_volume("vol_001"), google_books.CircuitOpenError("open")]
+
+        with self.assertRaises(CommandError):
+            self.enrich("--batch-size", "1")
+
+        with open(self.checkpoint) as f:
+            self.assertEqual(json.load(f), {"phase": "skeleton", "after": "vol_001"})
+        self.assertEqual(Book.objects.get(pk="vol_001").title, "Dune")
+
+    def test_bulk_update_per_batch(self, mock_get_volume):
+        mock_get_volume.side_effect = lambda volume_id: fake_volume(volume_id, isbn13=volume_id[-3:])
+        for i in range(4):
+            Book.objects.create(google_book_id=f"vol_00{i}", title="")
+
+        with mock.patch("books.enrichment.Book.objects.bulk_update") as bulk_update:
+            self.enrich("--batch-size", "2")
+
+        self.assertEqual(bulk_update.call_count, 2)
+
+
+class TestRateLimiter(TestCase):
+    def test_spaces_calls(self):
+        limiter = RateLimiter(rate=50)
+        start = time.monotonic()
+        for _ in range(5):
+            limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 4 / 50)
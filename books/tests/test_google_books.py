@@ -0,0 +1,212 @@
+"""
+Unit tests for the Google Books HTTP client - retries, circuit breaker and async search
+"""
+import asyncio
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from requests.exceptions import ConnectTimeout, HTTPError
+
+from books import google_books
+from books.google_books import CircuitBreaker, CircuitOpenError, GoogleBooksClient
+from books.models import Book, UserBook, Wishlist
+from books.search_cache import search_cache
+
+User = get_user_model()
+
+
+def fake_response(status_code=200, payload=None, headers=None):
+    response = mock.Mock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = payload if payload is not None else {"totalItems": 0}
+    if status_code >= 400:
+        response.raise_for_status.side_effect = HTTPError(f"{status_code} error", response=response)
+    return response
+
+
+class TestGoogleBooksClient(TestCase):
+    """Test cases for timeouts, retries and the circuit breaker"""
+
+    def setUp(self):
+        self.client_config = {
+            "MAX_RETRIES": 2,
+            "BACKOFF_BASE": 0,
+            "BREAKER_FAILURE_THRESHOLD": 2,
+            "BREAKER_RESET_TIMEOUT": 30,
+        }
+        self.books_client = GoogleBooksClient(api_key="test-key", config=self.client_config)
+        self.session_get = mock.patch.object(self.books_client.session, "get").start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_search_sends_params_with_timeouts(self):
+        """Test that queries are encoded as params and every call is timeout-bounded"""
+        self.session_get.return_value = fake_response(payload={"totalItems": 3})
+
+        data = self.books_client.search_volumes("war & peace", start_index=12, max_results=12)
+
+        self.assertEqual(data, {"totalItems": 3})
+        args, kwargs = self.session_get.call_args
+        self.assertTrue(args[0].endswith("/volumes"))
+        self.assertEqual(kwargs["params"]["q"], "war & peace")
+        self.assertEqual(kwargs["params"]["startIndex"], 12)
+        self.assertEqual(kwargs["params"]["key"], "test-key")
+        self.assertEqual(kwargs["timeout"], self.books_client.timeout)
+
+    def test_retries_server_errors_then_succeeds(self):
+        """Test that 5xx and 429 responses are retried"""
+        self.session_get.side_effect = [
+            fake_response(503),
+            fake_response(429),
+            fake_response(payload={"totalItems": 1}),
+        ]
+
+        self.assertEqual(self.books_client.search_volumes("dune"), {"totalItems": 1})
+        self.assertEqual(self.session_get.call_count, 3)
+        self.assertEqual(self.books_client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_retries_are_bounded(self):
+        """Test that a persistently failing upstream raises after MAX_RETRIES"""
+        self.session_get.side_effect = ConnectTimeout("timed out")
+
+        with self.assertRaises(ConnectTimeout):
+            self.books_client.search_volumes("dune")
+        self.assertEqual(self.session_get.call_count, 3)
+
+    def test_client_errors_not_retried(self):
+        """Test that a 400 is raised immediately and does not trip the breaker"""
+        self.session_get.return_value = fake_response(400)
+
+        for _ in range(3):
+            with self.assertRaises(HTTPError):
+                self.books_client.search_volumes("dune")
+
+        self.assertEqual(self.session_get.call_count, 3)
+        self.assertEqual(self.books_client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_breaker_opens_and_fails_fast(self):
+        """Test that repeated failures open the breaker and skip the upstream"""
+        self.session_get.return_value = fake_response(503)
+
+        for _ in range(2):
+            with self.assertRaises(HTTPError):
+                self.books_client.search_volumes("dune")
+        calls_before = self.session_get.call_count
+
+        with self.assertRaises(CircuitOpenError):
+            self.books_client.search_volumes("dune")
+        self.assertEqual(self.session_get.call_count, calls_before)
+        self.assertEqual(self.books_client.breaker.state, CircuitBreaker.OPEN)
+
+    def test_breaker_half_open_trial_closes_on_success(self):
+        """Test that one trial call is let through after the reset timeout"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow_request())
+
+        with mock.patch("books.google_books.time.monotonic", return_value=breaker._opened_at + 31):
+            self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+            self.assertTrue(breaker.allow_request())
+            # A concurrent caller is still refused while the trial is in flight
+            self.assertFalse(breaker.allow_request())
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+class TestBookSearchCircuitOpen(TestCase):
+    """Test that book_search fails fast through the existing error path"""
+
+    def setUp(self):
+        search_cache.clear(shared=True)
+
+    def test_open_breaker_renders_error_message(self):
+        books_client = google_books.get_client()
+        with mock.patch.object(books_client.breaker, "allow_request", return_value=False), \
+                mock.patch.object(books_client.session, "get") as session_get:
+            response = self.client.get(reverse("book_search"), {"query": "dune"})
+
+        session_get.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("temporarily unavailable", response.context["error_message"])
+
+
+class TestAsyncClientLifetime(TestCase):
+    """Test cases for the per-event-loop async client"""
+
+    def test_one_client_per_loop_closed_with_the_loop(self):
+        async def get_twice():
+            client = google_books.get_async_client()
+            self.assertIs(google_books.get_async_client(), client)
+            await asyncio.sleep(0)
+            return client
+
+        first = async_to_sync(get_twice)()
+        second = asyncio.run(get_twice())
+
+        self.assertIsNot(first, second)
+        self.assertTrue(first.http.is_closed)
+        self.assertTrue(second.http.is_closed)
+
+
+# Run the async view the way ASGI deployments do, without the sync-only toolbar middleware
+@override_settings(MIDDLEWARE=[m for m in settings.MIDDLEWARE if not m.startswith("debug_toolbar")])
+class TestBookSearchAsync(TestCase):
+    """Test cases for the non-blocking book_search variant"""
+
+    def setUp(self):
+        search_cache.clear(shared=True)
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.book = Book.objects.create(google_book_id="vol_001", title="Dune")
+        self.wished = Book.objects.create(google_book_id="vol_002", title="Children of Dune")
+        UserBook.objects.create(user=self.user, book=self.book)
+        Wishlist.objects.create(user=self.user, book=self.wished)
+
+    @mock.patch("books.google_books.AsyncGoogleBooksClient.search_volumes", new_callable=mock.AsyncMock)
+    async def test_async_search_matches_sync_context(self, mock_search):
+        mock_search.return_value = {
+            "totalItems": 2,
+            "items": [
+                {"id": "vol_001", "volumeInfo": {"title": "Dune"}},
+                {"id": "vol_002", "volumeInfo": {"title": "Children of Dune"}},
+            ],
+        }
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.get(reverse("book_search_async"), {"query": "dune"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([b["id_google"] for b in response.context["books"]], ["vol_001", "vol_002"])
+        self.assertEqual(response.context["user_owned_book_ids"], {"vol_001"})
+        self.assertEqual(response.context["user_wishlist_book_ids"], {"vol_002"})
+        mock_search.assert_awaited_once_with("dune", 0, 12)
+
+    async def test_async_search_calls_google_alongside_the_lookups_for_later_pages(self):
+        google_started = asyncio.Event()
+
+        async def lookup(queryset):
+            # Only finishes once Google has been called, so a sequential view would time out here
+            await asyncio.wait_for(google_started.wait(), 2)
+            return set()
+
+        async def search(query, start_index, max_results):
+            google_started.set()
+            return {"totalItems": 13, "items": [{"id": "vol_013", "volumeInfo": {"title": "Dune Messiah"}}]}
+
+        await self.async_client.aforce_login(self.user)
+        with mock.patch("books.views._aset", side_effect=lookup), \
+                mock.patch("books.google_books.asearch_volumes", side_effect=search):
+            response = await self.async_client.get(reverse("book_search_async"), {"query": "dune", "page": "2"})
+
+        self.assertEqual([b["id_google"] for b in response.context["books"]], ["vol_013"])
+
+    async def test_async_search_open_breaker_renders_error_message(self):
+        with mock.patch.object(google_books.get_client().breaker, "allow_request", return_value=False):
+            response = await self.async_client.get(reverse("book_search_async"), {"query": "dune"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("temporarily unavailable", response.context["error_message"])
@@ -0,0 +1,83 @@
+"""
+Unit tests for the cached group library
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from books.group_library import group_library
+from books.models import Book, Group, GroupMember, Transaction, UserBook
+
+User = get_user_model()
+
+
+@override_settings(GROUP_LIBRARY={"ALIAS": "shared", "TTL": 60, "PER_PAGE": 2})
+class TestGroupLibrary(TestCase):
+    """Test cases for de-duplicated library pages and their invalidation"""
+
+    def setUp(self):
+        self.group = Group.objects.create(group_name="Sci Fi")
+        self.alice, self.bob, self.carol = (
+            User.objects.create_user(username=name, password="testpass123") for name in ("alice", "bob", "carol")
+        )
+        self.outsider = User.objects.create_user(username="outsider", password="testpass123")
+        with self.captureOnCommitCallbacks(execute=True):
+            for user in (self.alice, self.bob, self.carol):
+                GroupMember.join(user, self.group)
+            self.dune = self.shelve("vol_dune", "Dune", self.alice, self.bob)
+            self.emma = self.shelve("vol_emma", "Emma", self.carol)
+            self.shelve("vol_hobbit", "The Hobbit", self.bob)
+            self.shelve("vol_ulysses", "Ulysses", self.outsider)  # Not a member's book
+
+    def shelve(self, pk, title, *owners):
+        book = Book.objects.create(google_book_id=pk, title=title)
+        for owner in owners:
+            UserBook.objects.create(user=owner, book=book)
+        return book
+
+    def library(self, **params):
+        return self.client.get(reverse("group_library_json", kwargs={"slug": self.group.slug}), params).json()
+
+    def test_books_are_deduplicated_with_copy_counts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(owner=self.alice, borrower=self.carol, book=self.dune)
+
+        first = self.library()
+        self.assertEqual([(b["id"], b["copies"], b["available"]) for b in first["books"]], [("vol_dune", 2, 1), ("vol_emma", 1, 1)])
+        second = self.library(after=first["next"])
+        self.assertEqual([b["id"] for b in second["books"]], ["vol_hobbit"])
+        self.assertIsNone(second["next"])
+
+    def test_pages_are_cached_until_a_write_commits(self):
+        url = reverse("group_library", kwargs={"slug": self.group.slug})
+        self.client.get(url)
+        with self.assertNumQueries(3):  # The group, then its version key and the page from the cache table
+            response = self.client.get(url)
+        self.assertEqual([book.pk for book in response.context["books"]], ["vol_dune", "vol_emma"])
+
+        # A member lending a copy makes the next read recompute
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(owner=self.carol, borrower=self.alice, book=self.emma)
+        self.assertEqual(self.library()["books"][1]["available"], 0)
+
+        # So does a new member bringing their books along
+        with self.captureOnCommitCallbacks(execute=True):
+            GroupMember.join(self.outsider, self.group)
+        self.assertEqual([b["id"] for b in self.library()["books"]], ["vol_dune", "vol_emma"])
+        self.assertEqual(self.library(after=self.library()["next"])["books"][-1]["id"], "vol_ulysses")
+
+    def test_leaving_and_removing_books_invalidate(self):
+        self.library()
+        with self.captureOnCommitCallbacks(execute=True):
+            UserBook.objects.get(user=self.bob, book__pk="vol_hobbit").delete()
+            GroupMember.leave(self.carol, self.group)
+        self.assertEqual([(b["id"], b["copies"]) for b in self.library()["books"]], [("vol_dune", 2)])
+        self.assertGreaterEqual(group_library.stats()["invalidations"], 2)
+
+    def test_private_library_is_members_only(self):
+        Group.objects.filter(pk=self.group.pk).update(is_private=True)
+        url = reverse("group_library", kwargs={"slug": self.group.slug})
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(url).status_code, 200)
@@ -0,0 +1,139 @@
+"""
+Unit tests for group membership counters and the group directory
+"""
+import io
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from books.models import Group, GroupMember
+
+User = get_user_model()
+
+
+class TestMemberCount(TestCase):
+    """Test cases for keeping Group.member_count in step with memberships"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="testpass123")
+        self.client.force_login(self.user)
+
+    def member_count(self, slug):
+        return Group.objects.get(slug=slug).member_count
+
+    def test_create_join_and_leave(self):
+        self.client.post(reverse("create_group"), {"group_name": "Sci Fi", "description": "Rockets"})
+        self.assertEqual(self.member_count("sci-fi"), 1)
+        self.assertTrue(GroupMember.objects.get(user=self.user).admin)
+
+        other = User.objects.create_user(username="other", password="testpass123")
+        self.client.force_login(other)
+        self.client.get(reverse("join_group", kwargs={"slug": "sci-fi"}))
+        self.client.get(reverse("join_group", kwargs={"slug": "sci-fi"}))  # Joining twice counts once
+        self.assertEqual(self.member_count("sci-fi"), 2)
+
+        self.client.get(reverse("leave_group", kwargs={"slug": "sci-fi"}))
+        self.assertEqual(self.member_count("sci-fi"), 1)
+        response = self.client.get(reverse("leave_group", kwargs={"slug": "sci-fi"}))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.member_count("sci-fi"), 1)
+
+    def test_deleting_a_member_and_direct_writes_are_counted(self):
+        group = Group.objects.create(group_name="Sci Fi")
+        other = User.objects.create_user(username="other", password="testpass123")
+        GroupMember.join(self.user, group)
+        GroupMember.objects.create(user=other, group=group)
+        self.assertEqual(self.member_count("sci-fi"), 2)
+
+        other.delete()  # Cascades to the membership
+        self.assertEqual(self.member_count("sci-fi"), 1)
+
+    def test_reconcile_command_repairs_drift(self):
+        group = Group.objects.create(group_name="Sci Fi")
+        GroupMember.join(self.user, group)
+        Group.objects.filter(pk=group.pk).update(member_count=7)
+
+        out = io.StringIO()
+        call_command("reconcile_group_members", "--dry-run", stdout=out)
+        self.assertIn(f"Group {group.pk}: member_count 7 -> 1", out.getvalue())
+        self.assertEqual(self.member_count("sci-fi"), 7)
+
+        call_command("reconcile_group_members", stdout=io.StringIO())
+        self.assertEqual(self.member_count("sci-fi"), 1)
+
+
+class TestGroupDatabase(TestCase):
+    """Test cases for the paginated, prefix-filterable group directory"""
+
+    @classmethod
+    def setUpTestData(cls):
+        names = [f"Book Club {i:02d}" for i in range(25)] + ["Poetry Corner", "poets united"]
+        Group.objects.bulk_create(Group(group_name=name, slug=name.lower().replace(" ", "-")) for name in names)
+
+    def test_one_query_per_page(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("group_database"))
+        self.assertEqual(len(response.context["groups"]), 20)
+
+        response = self.client.get(reverse("group_database"), {"after": response.context["page"].next_cursor})
+        self.assertEqual([group.group_name for group in response.context["groups"]][-2:], ["Poetry Corner", "poets united"])
+
+    def test_prefix_filter_is_case_insensitive(self):
+        response = self.client.get(reverse("group_database"), {"q": "POET"})
+        self.assertEqual([group.group_name for group in response.context["groups"]], ["Poetry Corner", "poets united"])
+        self.assertContains(response, 'value="POET"')
+
+    def test_prefix_filter_can_use_the_index(self):
+        queryset = Group.objects.filter(group_name__istartswith="poet")
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+        self.assertIn("group_name_prefix_idx", plan)
+
+
+class TestSingleGroup(TestCase):
+    """Test cases for the group page's membership check and member paging"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(group_name="Sci Fi")
+        cls.users = [User.objects.create_user(username=f"member{i:02d}", password="testpass123") for i in range(12)]
+        GroupMember.join(cls.users[11], cls.group, admin=True)
+        for user in cls.users[:11]:
+            GroupMember.join(user, cls.group)
+        cls.outsider = User.objects.create_user(username="outsider", password="testpass123")
+
+    def get(self, **params):
+        return self.client.get(reverse("single_group", kwargs={"slug": self.group.slug}), params)
+
+    def test_query_count_does_not_grow_with_members(self):
+        self.client.force_login(self.users[0])
+        self.get()
+        # Session, user, pending-requests badge, group, membership EXISTS and one page of members
+        with self.assertNumQueries(6):
+            response = self.get()
+        self.assertTrue(response.context["is_member"])
+        self.assertEqual(response.context["member_count"], 12)
+        self.assertContains(response, "Leave")
+        self.assertEqual(len(response.context["members"]), 12)  # All on the first page by default
+
+    @mock.patch("books.views.GROUP_MEMBERS_PER_PAGE", 5)
+    def test_members_are_paged_admins_first(self):
+        self.client.force_login(self.outsider)
+        first = self.get()
+        self.assertFalse(first.context["is_member"])
+        self.assertEqual([m.username for m in first.context["members"]], ["member11", "member00", "member01", "member02", "member03"])
+
+        names = []
+        response = first
+        while True:
+            names += [m.username for m in response.context["members"]]
+            if not response.context["members_page"].has_next:
+                break
+            response = self.get(after=response.context["members_page"].next_cursor)
+        self.assertEqual(len(names), 12)
+        self.assertTrue(response.context["show_members"])
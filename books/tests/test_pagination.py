@@ -0,0 +1,97 @@
+"""
+Unit tests for keyset pagination and the paginated book catalog
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from books.models import Book, UserBook
+from books.pagination import decode_cursor, encode_cursor, keyset_page
+
+User = get_user_model()
+
+
+class TestKeysetPage(TestCase):
+    """Test cases for walking a queryset forwards and backwards by cursor"""
+
+    def setUp(self):
+        # Duplicate titles check that the tie-breaker keeps pages disjoint
+        for i, title in enumerate(["Beta", "Alpha", "Beta", "Gamma", "Alpha", "Delta", "Beta"]):
+            Book.objects.create(google_book_id=f"vol_{i}", title=title)
+        self.ordered = list(Book.objects.order_by("title", "google_book_id").values_list("pk", flat=True))
+        self.fields = ("title", "google_book_id")
+
+    def walk_forward(self, per_page):
+        pages, cursor = [], None
+        while True:
+            page = keyset_page(Book.objects.all(), self.fields, per_page, after=cursor)
+            pages.append([book.pk for book in page])
+            if not page.has_next:
+                return pages, page
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_row_once_in_order(self):
+        pages, _ = self.walk_forward(per_page=3)
+        self.assertEqual([len(p) for p in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), self.ordered)
+
+    def test_previous_cursor_returns_the_earlier_page(self):
+        pages, last = self.walk_forward(per_page=3)
+        previous = keyset_page(Book.objects.all(), self.fields, 3, before=last.previous_cursor)
+        self.assertEqual([book.pk for book in previous], pages[1])
+        self.assertTrue(previous.has_previous)
+        self.assertTrue(previous.has_next)
+
+        first = keyset_page(Book.objects.all(), self.fields, 3, before=previous.previous_cursor)
+        self.assertEqual([book.pk for book in first], pages[0])
+        self.assertFalse(first.has_previous)
+
+    def test_descending_fields(self):
+        fields = ("-title", "google_book_id")
+        expected = list(Book.objects.order_by(*fields).values_list("pk", flat=True))
+        first = keyset_page(Book.objects.all(), fields, 4)
+        second = keyset_page(Book.objects.all(), fields, 4, after=first.next_cursor)
+        self.assertEqual([book.pk for book in first] + [book.pk for book in second], expected)
+
+        back = keyset_page(Book.objects.all(), fields, 4, before=second.previous_cursor)
+        self.assertEqual([book.pk for book in back], expected[:4])
+
+    def test_malformed_cursor_starts_from_the_beginning(self):
+        for cursor in ("not-base64!", encode_cursor(["only one value"]), encode_cursor([{"a": 1}, 2])):
+            page = keyset_page(Book.objects.all(), self.fields, 3, after=cursor)
+            self.assertEqual([book.pk for book in page], self.ordered[:3])
+            self.assertFalse(page.has_previous)
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(["Dune", "vol_1"]), 2), ["Dune", "vol_1"])
+
+
+class TestBookDatabase(TestCase):
+    """Test cases for the paginated catalog page"""
+
+    def setUp(self):
+        self.owners = [User.objects.create_user(username=f"owner{i}", password="testpass123") for i in range(3)]
+        for i in range(30):
+            book = Book.objects.create(google_book_id=f"vol_{i:02d}", title=f"Book {i:02d}")
+            for owner in self.owners[: i % 3 + 1]:
+                UserBook.objects.create(user=owner, book=book)
+        Book.objects.create(google_book_id="vol_unowned", title="Nobody's Book")
+
+    def test_only_owned_books_with_owner_counts(self):
+        response = self.client.get(reverse("book_database"))
+        books = response.context["books"]
+        self.assertEqual(len(books), 24)
+        self.assertNotIn("vol_unowned", [book.pk for book in books])
+        self.assertEqual([book.owners_count for book in books[:3]], [1, 2, 3])
+        self.assertContains(response, "3 copies")
+
+    def test_query_count_does_not_depend_on_page_size_or_depth(self):
+        # Session, user and pending-requests badge, plus a single query for the page
+        self.client.force_login(self.owners[0])
+        first = self.client.get(reverse("book_database"))
+        with self.assertNumQueries(4):
+            self.client.get(reverse("book_database"))
+        with self.assertNumQueries(4):
+            last = self.client.get(reverse("book_database"), {"after": first.context["page"].next_cursor})
+        self.assertEqual(len(last.context["books"]), 6)
+        self.assertFalse(last.context["page"].has_next)
@@ -0,0 +1,107 @@
+"""
+Unit tests for speculative prefetch of the next search results page
+"""
+import threading
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from books import google_books
+from books.prefetch import SearchPrefetcher, search_prefetcher
+from books.search_cache import search_cache
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "google_books": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "prefetch-tests"},
+}
+PREFETCH_ON = {"ENABLED": True, "MAX_WORKERS": 2, "PER_USER_LIMIT": 1, "TRACKED_PAGES": 16}
+
+
+def fake_page(total_items=36):
+    return {"totalItems": total_items, "items": [{"id": "vol_001", "volumeInfo": {"title": "Dune"}}]}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestSearchPrefetcher(TestCase):
+    """Test cases for the prefetch pool and its limits"""
+
+    def setUp(self):
+        search_cache.clear(shared=True)
+        patcher = mock.patch.object(google_books.get_client(), "search_volumes", return_value=fake_page())
+        self.upstream = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_disabled_by_default(self):
+        prefetcher = SearchPrefetcher(config={**PREFETCH_ON, "ENABLED": False})
+        self.assertIsNone(prefetcher.schedule("user:1", "dune", 12, 12))
+        self.upstream.assert_not_called()
+
+    def test_prefetch_fills_search_cache(self):
+        prefetcher = SearchPrefetcher(config=PREFETCH_ON)
+
+        prefetcher.schedule("user:1", "dune", 12, 12).result(timeout=5)
+
+        self.assertEqual(search_cache.peek("dune", 12, 12), fake_page())
+        self.assertEqual(prefetcher.stats()["completed"], 1)
+
+    def test_already_cached_page_is_skipped(self):
+        prefetcher = SearchPrefetcher(config=PREFETCH_ON)
+        search_cache.set("dune", 12, 12, fake_page())
+
+        prefetcher.schedule("user:1", "dune", 12, 12).result(timeout=5)
+
+        self.upstream.assert_not_called()
+        self.assertEqual(prefetcher.stats()["skipped_cached"], 1)
+
+    def test_per_user_limit(self):
+        """Test that a user can't queue more prefetches than their limit"""
+        prefetcher = SearchPrefetcher(config=PREFETCH_ON)
+        release = threading.Event()
+        self.upstream.side_effect = lambda *args: release.wait(5) and fake_page()
+
+        first = prefetcher.schedule("user:1", "dune", 12, 12)
+        self.assertIsNone(prefetcher.schedule("user:1", "hobbit", 12, 12))
+        other_user = prefetcher.schedule("user:2", "hobbit", 12, 12)
+        release.set()
+        first.result(timeout=5)
+        other_user.result(timeout=5)
+
+        stats = prefetcher.stats()
+        self.assertEqual(stats["skipped_user_limit"], 1)
+        self.assertEqual(stats["completed"], 2)
+        self.assertEqual(stats["in_flight"], 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, GOOGLE_BOOKS_PREFETCH=PREFETCH_ON)
+class TestBookSearchPrefetch(TestCase):
+    """Test that book_search prefetches the next page and counts hits"""
+
+    def setUp(self):
+        search_cache.clear(shared=True)
+        patcher = mock.patch.object(google_books.get_client(), "search_volumes", return_value=fake_page())
+        self.upstream = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_next_page_served_from_prefetch(self):
+        hits_before = search_prefetcher.stats()["hits"]
+
+        self.client.get(reverse("book_search"), {"query": "dune"})
+        search_prefetcher.join(timeout=5)
+        self.assertEqual(self.upstream.call_count, 2)  # Page 1, then page 2 in the background
+
+        response = self.client.get(reverse("book_search"), {"query": "dune", "page": 2})
+        search_prefetcher.join(timeout=5)
+
+        self.assertEqual(response.status_code, 200)
+        fetched_indexes = [c.args[1] for c in self.upstream.call_args_list]
+        self.assertEqual(fetched_indexes, [0, 12, 24])  # Page 2 came from the cache; page 3 queued
+        self.assertEqual(search_prefetcher.stats()["hits"], hits_before + 1)
+
+    def test_last_page_not_prefetched(self):
+        self.upstream.return_value = fake_page(total_items=5)
+
+        self.client.get(reverse("book_search"), {"query": "dune"})
+        search_prefetcher.join(timeout=5)
+
+        self.assertEqual(self.upstream.call_count, 1)
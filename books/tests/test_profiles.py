@@ -0,0 +1,107 @@
+"""
+Unit tests for the profile page and its paginated section endpoints
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from books.models import Book, Group, GroupMember, RequestBook, UserBook, Wishlist
+
+User = get_user_model()
+
+
+class TestUserAccount(TestCase):
+    """Test cases for the counters and shelves on a member's profile"""
+
+    def setUp(self):
+        self.member = User.objects.create_user(username="member", password="testpass123")
+        self.friend = User.objects.create_user(username="friend", password="testpass123")
+        self.group = Group.objects.create(group_name="Sci Fi")
+        GroupMember.join(self.member, self.group)
+
+    def shelve(self, count):
+        added = timezone.now()
+        for i in range(count):
+            book = Book.objects.create(google_book_id=f"vol_{i:03d}", title=f"Book {i:03d}")
+            UserBook.objects.create(user=self.member, book=book, date_added=added - timedelta(days=i))
+
+    def profile(self):
+        return self.client.get(reverse("user_account", kwargs={"pk": self.member.pk}))
+
+    def section(self, name, **params):
+        return self.client.get(reverse(f"user_{name}_json", kwargs={"pk": self.member.pk}), params).json()
+
+    def walk(self, name, **params):
+        """Every item in a section, following the cursors"""
+        items, page = [], self.section(name, **params)
+        while True:
+            items += page["items"]
+            if not page["next"]:
+                return items
+            page = self.section(name, after=page["next"], **params)
+
+    def test_page_renders_counters_without_the_shelves(self):
+        self.shelve(60)
+        self.client.force_login(self.friend)
+        self.profile()
+        # Session, user and badge, then the member with every counter
+        with self.assertNumQueries(4):
+            response = self.profile()
+        self.assertEqual(response.context["user_book_count"], 60)
+        self.assertNotContains(response, "Book 000")
+
+    def test_counters(self):
+        self.shelve(2)
+        wished = Book.objects.create(google_book_id="vol_wish", title="Wanted")
+        UserBook.objects.create(user=self.friend, book=wished)
+        Wishlist.objects.create(user=self.member, book=wished)
+        RequestBook.objects.create(owner=self.friend, requester=self.member, book=wished)
+        RequestBook.objects.create(owner=self.member, requester=self.friend, book=Book.objects.get(pk="vol_000"))
+
+        self.client.force_login(self.member)
+        context = self.profile().context
+        self.assertEqual(
+            (context["user_book_count"], context["user_wish_count"], context["user_group_count"]), (2, 1, 1)
+        )
+        self.assertEqual(
+            (context["user_requests_open_count"], context["user_requests_recieved_open_count"]), (1, 1)
+        )
+        self.assertEqual(context["user_wishes_available"], 1)
+
+    def test_books_are_paged_in_each_sort_order(self):
+        self.shelve(45)
+        by_title = [book["id"] for book in self.walk("books")]
+        self.assertEqual(by_title, [f"vol_{i:03d}" for i in range(45)])
+        self.assertEqual([book["id"] for book in self.walk("books", sort="title-desc")], by_title[::-1])
+        self.assertEqual([book["id"] for book in self.walk("books", sort="recent")], by_title)
+        self.assertEqual([book["id"] for book in self.walk("books", sort="oldest")], by_title[::-1])
+        self.assertEqual(len(self.section("books", sort="nonsense")["items"]), 20)
+
+    def test_viewer_flags_cover_only_the_page(self):
+        self.shelve(3)
+        UserBook.objects.create(user=self.friend, book=Book.objects.get(pk="vol_001"))
+        RequestBook.objects.create(owner=self.member, requester=self.friend, book=Book.objects.get(pk="vol_002"))
+
+        self.client.force_login(self.friend)
+        flags = [(book["id"], book["viewer_owns"], book["requested"]) for book in self.section("books")["items"]]
+        self.assertEqual(flags, [("vol_000", False, False), ("vol_001", True, False), ("vol_002", False, True)])
+
+    def test_wishes_and_groups(self):
+        popular = Book.objects.create(google_book_id="vol_pop", title="Popular")
+        UserBook.objects.create(user=self.friend, book=popular)
+        Wishlist.objects.create(user=self.member, book=Book.objects.create(google_book_id="vol_a", title="Alpha"))
+        Wishlist.objects.create(user=self.member, book=popular)
+
+        self.assertEqual([wish["id"] for wish in self.walk("wishes")], ["vol_a", "vol_pop"])
+        self.assertEqual(
+            self.walk("wishes", sort="most-available")[0], {"id": "vol_pop", "title": "Popular", "owners": 1}
+        )
+        self.assertEqual(self.walk("groups"), [{"slug": "sci-fi", "name": "Sci Fi"}])
+
+    def test_unknown_member_is_404(self):
+        self.assertEqual(self.client.get(reverse("user_account", kwargs={"pk": 9999})).status_code, 404)
+        for name in ("books", "wishes", "groups"):
+            self.assertEqual(self.client.get(reverse(f"user_{name}_json", kwargs={"pk": 9999})).status_code, 404)
@@ -0,0 +1,125 @@
+"""
+Unit tests for the shared Google Books quota
+"""
+import io
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from books import google_books
+from books.enrichment import RateLimiter, fetch_volume
+from books.models import ApiQuota
+from books.quota import QuotaExceededError, TokenBucket, background_priority, current_priority
+from books.search_cache import search_cache
+
+
+def make_bucket(tokens, **config):
+    config = {"ENABLED": True, "BUCKET": "test", "DAILY_QUOTA": 100, "RESERVE": 0.3, **config}
+    ApiQuota.objects.create(name=config["BUCKET"], tokens=tokens, updated_at=timezone.now())
+    return TokenBucket(config=config)
+
+
+class TestTokenBucket(TestCase):
+    """Test cases for spending and refilling the shared bucket"""
+
+    def test_first_use_starts_full(self):
+        """Test that the bucket row is created full on first use"""
+        bucket = TokenBucket(config={"ENABLED": True, "BUCKET": "fresh", "DAILY_QUOTA": 50, "RESERVE": 0.3})
+        bucket.acquire()
+        self.assertAlmostEqual(ApiQuota.objects.get(name="fresh").tokens, 49, places=2)
+
+    def test_interactive_calls_may_use_the_reserve(self):
+        """Test that interactive calls spend down to zero"""
+        bucket = make_bucket(tokens=2)
+        bucket.acquire()
+        bucket.acquire()
+        with self.assertRaises(QuotaExceededError):
+            bucket.acquire()
+        self.assertEqual(bucket.stats()["denied_interactive"], 1)
+
+    def test_background_calls_stop_at_the_reserve(self):
+        """Test that background work can't spend the interactive reserve"""
+        bucket = make_bucket(tokens=31)
+        with background_priority():
+            bucket.acquire()
+            with self.assertRaises(QuotaExceededError):
+                bucket.acquire()
+        # The reserve is still there for searches
+        bucket.acquire()
+        stats = bucket.stats()
+        self.assertEqual((stats["granted_background"], stats["denied_background"]), (1, 1))
+        self.assertEqual(stats["granted_interactive"], 1)
+
+    def test_refills_over_time(self):
+        """Test that tokens come back at DAILY_QUOTA per day, capped at the bucket size"""
+        bucket = make_bucket(tokens=0)
+        ApiQuota.objects.filter(name="test").update(updated_at=timezone.now() - timedelta(hours=6))
+        self.assertAlmostEqual(bucket.remaining(), 25, places=1)
+
+        ApiQuota.objects.filter(name="test").update(updated_at=timezone.now() - timedelta(days=3))
+        self.assertAlmostEqual(bucket.remaining(), 100, places=1)
+
+    def test_grant_is_one_statement_without_a_row_lock(self):
+        """Test that spending a token is a single conditional UPDATE"""
+        bucket = make_bucket(tokens=10)
+        with CaptureQueriesContext(connection) as queries:
+            bucket.acquire()
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]["sql"].startswith("UPDATE"))
+        self.assertNotIn("FOR UPDATE", queries[0]["sql"])
+        self.assertAlmostEqual(ApiQuota.objects.get(name="test").tokens, 9, places=2)
+
+    def test_disabled_bucket_never_refuses(self):
+        """Test that ENABLED=False skips the database entirely"""
+        bucket = make_bucket(tokens=0, ENABLED=False)
+        with self.assertNumQueries(0):
+            bucket.acquire()
+
+    def test_priority_is_restored(self):
+        """Test that background_priority only applies inside the block"""
+        with background_priority():
+            self.assertEqual(current_priority(), "background")
+        self.assertEqual(current_priority(), "interactive")
+
+
+class TestQuotaIntegration(TestCase):
+    """Test cases for callers of the shared quota"""
+
+    def setUp(self):
+        search_cache.clear(shared=True)
+        self.quota = make_bucket(tokens=0)
+        patcher = mock.patch.object(google_books.get_client(), "quota", self.quota)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_exhausted_quota_renders_error_without_calling_google(self):
+        """Test that a search over quota fails through the normal error path"""
+        with mock.patch.object(google_books.get_client().session, "get") as session_get:
+            response = self.client.get(reverse("book_search"), {"query": "dune", "source": "google"})
+
+        session_get.assert_not_called()
+        self.assertIn("usage limit", response.context["error_message"])
+
+    def test_enrichment_fetches_run_at_background_priority(self):
+        """Test that fetch_volume stops the run instead of spending the reserve"""
+        ApiQuota.objects.filter(name="test").update(tokens=20)
+        with mock.patch.object(google_books.get_client().session, "get") as session_get, \
+                self.assertRaises(QuotaExceededError):
+            fetch_volume("abc", RateLimiter(0))
+        session_get.assert_not_called()
+
+    @override_settings(GOOGLE_BOOKS_QUOTA={"BUCKET": "test", "DAILY_QUOTA": 100})
+    def test_quota_command_prints_stats(self):
+        """Test that the google_books_quota command reports the shared budget"""
+        out = io.StringIO()
+        call_command("google_books_quota", "--json", stdout=out)
+        stats = json.loads(out.getvalue())
+        self.assertEqual(stats["capacity"], 100)
+        self.assertEqual(stats["background_available"], 0)
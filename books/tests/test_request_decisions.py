@@ -0,0 +1,188 @@
+"""
+Unit tests for deciding book requests
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from books.models import Book, RequestBook, Transaction, UserBook, UserStats
+
+User = get_user_model()
+
+
+class TestRequestDecision(TestCase):
+    """Test cases for approving and rejecting a request by id"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="testpass123")
+        self.readers = [User.objects.create_user(username=f"reader{i}", password="testpass123") for i in range(6)]
+        self.book = Book.objects.create(google_book_id="vol_dune", title="Dune")
+        UserBook.objects.create(user=self.owner, book=self.book)
+        self.client.force_login(self.owner)
+
+    def ask(self, reader, book=None):
+        return RequestBook.objects.create(owner=self.owner, requester=reader, book=book or self.book)
+
+    def decide(self, request, decision, **data):
+        response = self.client.post(reverse("request_decision"), {"request_id": request.pk, "decision": decision, **data})
+        self.assertRedirects(response, reverse("requests_to_user_all") + "?filter_by=owner", fetch_redirect_response=False)
+        return [str(message) for message in get_messages(response.wsgi_request)]
+
+    def open_counts(self, user):
+        stats = UserStats.objects.get(user=user)
+        return stats.requests_open, stats.requests_received_open
+
+    def test_approving_lends_the_copy_and_rejects_the_rest(self):
+        winner, *others = [self.ask(reader) for reader in self.readers[:3]]
+        self.decide(winner, "Approve")
+
+        loan = Transaction.objects.get()
+        self.assertEqual((loan.owner, loan.borrower, loan.returned_datetime), (self.owner, self.readers[0], None))
+        states = dict(RequestBook.objects.values_list("pk", "state"))
+        self.assertEqual(states[winner.pk], "accepted")
+        self.assertEqual({states[request.pk] for request in others}, {"rejected"})
+        self.assertEqual(RequestBook.objects.get(pk=others[0].pk).reject_reason, "Book already loaned")
+        self.assertEqual(self.open_counts(self.owner), (0, 0))
+        self.assertEqual(self.open_counts(self.readers[1]), (0, 0))
+
+    def test_query_count_does_not_depend_on_competing_requests(self):
+        def approve_with(competitors, book_id):
+            book = Book.objects.create(google_book_id=book_id, title=book_id)
+            UserBook.objects.create(user=self.owner, book=book)
+            winner = self.ask(self.readers[0], book)
+            for reader in self.readers[1 : 1 + competitors]:
+                self.ask(reader, book)
+            with CaptureQueriesContext(connection) as queries:
+                self.decide(winner, "Approve")
+            return len(queries)
+
+        self.assertEqual(approve_with(1, "vol_one"), approve_with(5, "vol_five"))
+
+    def test_second_submission_is_refused(self):
+        request = self.ask(self.readers[0])
+        self.decide(request, "Approve")
+        messages = self.decide(request, "Approve")
+        self.assertEqual(messages[-1], "This request has already been responded to or cancelled")
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_rejecting_keeps_the_reason(self):
+        request = self.ask(self.readers[0])
+        self.decide(request, "Reject", reject_reason="I am currently unavailable")
+        request.refresh_from_db()
+        self.assertEqual((request.state, request.reject_reason), ("rejected", "I am currently unavailable"))
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_unknown_reject_reason_is_refused(self):
+        request = self.ask(self.readers[0])
+        self.assertEqual(self.decide(request, "Reject", reject_reason="x" * 40), ["Invalid request"])
+        request.refresh_from_db()
+        self.assertEqual((request.state, request.reject_reason), ("open", None))
+
+    def test_copy_already_on_loan(self):
+        Transaction.objects.create(owner=self.owner, borrower=self.readers[5], book=self.book)
+        request = self.ask(self.readers[0])
+        self.assertEqual(self.decide(request, "Approve"), ["This book is already on loan"])
+        request.refresh_from_db()
+        self.assertEqual(request.state, "open")
+
+    def test_only_the_owner_can_decide(self):
+        request = self.ask(self.readers[0])
+        self.client.force_login(self.readers[1])
+        self.assertEqual(self.decide(request, "Approve"), ["Request not found"])
+        self.assertFalse(Transaction.objects.exists())
+
+
+class TestBulkRequests(TestCase):
+    """Test cases for deciding and cancelling several requests in one post"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="testpass123")
+        self.readers = [User.objects.create_user(username=f"reader{i}", password="testpass123") for i in range(4)]
+        self.books = [Book.objects.create(google_book_id=f"vol_{i}", title=f"Book {i}") for i in range(3)]
+        for book in self.books:
+            UserBook.objects.create(user=self.owner, book=book)
+        self.client.force_login(self.owner)
+
+    def ask(self, reader, book):
+        return RequestBook.objects.create(owner=self.owner, requester=reader, book=book)
+
+    def post(self, name, requests, filter_by, **data):
+        data["request_ids"] = [request.pk for request in requests]
+        response = self.client.post(reverse(name), data)
+        self.assertRedirects(
+            response, reverse("requests_to_user_all") + f"?filter_by={filter_by}", fetch_redirect_response=False
+        )
+        return [str(message) for message in get_messages(response.wsgi_request)]
+
+    def states(self):
+        return dict(RequestBook.objects.values_list("pk", "state"))
+
+    def test_rejecting_in_bulk(self):
+        requests = [self.ask(reader, book) for reader, book in zip(self.readers, self.books)]
+        messages = self.post(
+            "bulk_request_decision", requests[:2], "owner", decision="Reject", reject_reason="Other"
+        )
+        self.assertEqual(messages, ["2 requests rejected"])
+        states = self.states()
+        self.assertEqual([states[request.pk] for request in requests], ["rejected", "rejected", "open"])
+        self.assertEqual(RequestBook.objects.filter(reject_reason="Other").count(), 2)
+        self.assertEqual(UserStats.objects.get(user=self.owner).requests_received_open, 1)
+        self.assertEqual(UserStats.objects.get(user=self.readers[0]).requests_open, 0)
+
+    def test_reject_query_count_does_not_depend_on_batch_size(self):
+        def reject(count):
+            requests = [self.ask(reader, self.books[0]) for reader in self.readers[:count]]
+            with CaptureQueriesContext(connection) as queries:
+                self.post("bulk_request_decision", requests, "owner", decision="Reject")
+            return len(queries)
+
+        self.assertEqual(reject(1), reject(4))
+
+    def test_approving_in_bulk_lends_each_copy_once(self):
+        first = self.ask(self.readers[0], self.books[0])
+        second = self.ask(self.readers[1], self.books[0])  # Same copy, asked later
+        other = self.ask(self.readers[2], self.books[1])
+        messages = self.post("bulk_request_decision", [first, second, other], "owner", decision="Approve")
+
+        self.assertEqual(messages, ["2 requests approved", "1 request skipped: already closed, or their copy couldn't be lent"])
+        states = self.states()
+        self.assertEqual((states[first.pk], states[second.pk], states[other.pk]), ("accepted", "rejected", "accepted"))
+        self.assertEqual(
+            set(Transaction.objects.values_list("book_id", "borrower__username")),
+            {("vol_0", "reader0"), ("vol_1", "reader2")},
+        )
+        self.assertEqual(UserStats.objects.get(user=self.owner).requests_received_open, 0)
+
+    def test_only_own_requests_are_decided(self):
+        stranger = User.objects.create_user(username="stranger", password="testpass123")
+        theirs = RequestBook.objects.create(owner=stranger, requester=self.readers[0], book=self.books[0])
+        mine = self.ask(self.readers[1], self.books[1])
+        messages = self.post("bulk_request_decision", [theirs, mine], "owner", decision="Reject")
+        self.assertEqual(messages, ["1 request rejected", "1 request skipped: already closed"])
+        self.assertEqual(self.states()[theirs.pk], "open")
+
+    def test_invalid_posts(self):
+        request = self.ask(self.readers[0], self.books[0])
+        self.assertEqual(self.post("bulk_request_decision", [], "owner", decision="Reject"), ["Invalid request"])
+        messages = self.post("bulk_request_decision", [request], "owner", decision="Reject", reject_reason="Because")
+        self.assertEqual(messages[-1], "Invalid request")
+        self.assertEqual(self.states()[request.pk], "open")
+
+    def test_cancelling_in_bulk(self):
+        requests = [self.ask(self.readers[0], book) for book in self.books]
+        RequestBook.decide(requests[2].pk, self.owner, approve=False)  # Already answered
+        self.client.force_login(self.readers[0])
+        messages = self.post("bulk_cancel_request", requests, "requester")
+
+        self.assertEqual(messages, ["2 requests cancelled", "1 request skipped: already responded to or cancelled"])
+        states = self.states()
+        self.assertEqual([states[request.pk] for request in requests], ["cancelled", "cancelled", "rejected"])
+
+    def test_requests_page_offers_bulk_actions(self):
+        request = self.ask(self.readers[0], self.books[0])
+        response = self.client.get(reverse("requests_to_user_all"), {"filter_by": "owner"})
+        self.assertContains(response, reverse("bulk_request_decision"))
+        self.assertContains(response, f'name="request_ids" value="{request.pk}" form="bulk-requests"')
@@ -0,0 +1,80 @@
+"""
+Unit tests for the stored RequestBook state and the indexes on hot filters
+"""
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from books.models import Book, RequestBook
+
+User = get_user_model()
+
+
+class TestRequestState(TestCase):
+    """Test cases for keeping the state column in step with the request's columns"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="testpass123")
+        self.requester = User.objects.create_user(username="requester", password="testpass123")
+        self.book = Book.objects.create(google_book_id="vol_dune", title="Dune")
+
+    def request(self, **fields):
+        return RequestBook.objects.create(owner=self.owner, requester=self.requester, book=self.book, **fields)
+
+    def stored_state(self, request):
+        return RequestBook.objects.values_list("state", flat=True).get(pk=request.pk)
+
+    def test_transitions(self):
+        accepted, rejected, cancelled = self.request(), self.request(), self.request()
+        self.assertEqual(self.stored_state(accepted), RequestBook.State.OPEN)
+
+        accepted.decision, accepted.decision_datetime = True, timezone.now()
+        accepted.save()
+        rejected.decision, rejected.decision_datetime = False, timezone.now()
+        rejected.save()
+        cancelled.cancelled_datetime = timezone.now()
+        cancelled.save()
+
+        for request, state in ((accepted, "accepted"), (rejected, "rejected"), (cancelled, "cancelled")):
+            self.assertEqual(self.stored_state(request), state)
+            self.assertEqual(request.current_state(), state)  # Before any reload
+        self.assertTrue(accepted.status.is_accepted)
+        self.assertFalse(accepted.status.is_live)
+        self.assertTrue(cancelled.status.is_cancelled)
+
+    def test_bulk_updates_stay_in_sync(self):
+        request = self.request()
+        RequestBook.objects.update(cancelled_datetime=timezone.now())
+        self.assertEqual(self.stored_state(request), RequestBook.State.CANCELLED)
+        self.assertFalse(RequestBook.objects.filter(state=RequestBook.State.OPEN).exists())
+
+    def test_open_requests_use_the_partial_index(self):
+        self.request()
+        queryset = RequestBook.objects.filter(owner=self.owner, state=RequestBook.State.OPEN)
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+        # Either partial index answers it on a table this small; both skip closed requests
+        self.assertRegex(plan, r"requestbook_open_(owner|requester)_idx")
+
+
+class TestBenchmarkIndexes(TestCase):
+    """Test cases for the index benchmark command"""
+
+    def test_reports_each_query_and_leaves_no_trace(self):
+        out = io.StringIO()
+        call_command("benchmark_indexes", "--users", "20", "--books", "200", "--per-user", "4", "--repeat", "1", "--force", stdout=out)
+        self.assertIn("open requests to an owner", out.getvalue())
+        self.assertIn("after", out.getvalue())
+        self.assertFalse(Book.objects.exists())
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM pg_indexes WHERE indexname = 'wishlist_active_user_idx'")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_refuses_without_debug(self):
+        with self.assertRaises(CommandError):
+            call_command("benchmark_indexes", stdout=io.StringIO())
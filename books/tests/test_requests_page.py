@@ -0,0 +1,144 @@
+"""
+Unit tests for the paginated requests page
+"""
+import io
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from books.models import Book, RequestBook, RequestSummary, Transaction, UserBook
+
+User = get_user_model()
+
+
+class TestRequestsToUserAll(TestCase):
+    """Test cases for grouping requests by book a page at a time"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username="owner", password="testpass123")
+        cls.readers = [User.objects.create_user(username=f"reader{i}", password="testpass123") for i in range(3)]
+        start = timezone.now() - timedelta(days=100)
+        # 25 books, each requested by every reader; the book number sets how recent
+        for i in range(25):
+            book = Book.objects.create(google_book_id=f"vol_{i:02d}", title=f"Book {i:02d}")
+            UserBook.objects.create(user=cls.owner, book=book)
+            for reader in cls.readers:
+                RequestBook.objects.create(
+                    owner=cls.owner,
+                    requester=reader,
+                    book=book,
+                    request_datetime=start + timedelta(days=i),
+                    decision=False,
+                    decision_datetime=start + timedelta(days=i, hours=1),
+                )
+        # Book 03 has a live request, so it comes first despite being old
+        cls.live = RequestBook.objects.create(
+            owner=cls.owner, requester=cls.readers[0], book=Book.objects.get(pk="vol_03")
+        )
+        # Lent copies of the two most recent books
+        for i in (24, 23):
+            Transaction.objects.create(owner=cls.owner, borrower=cls.readers[1], book=Book.objects.get(pk=f"vol_{i}"))
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def get(self, **params):
+        return self.client.get(reverse("requests_to_user_all"), {"filter_by": "owner", **params})
+
+    def test_query_count_depends_on_page_size(self):
+        self.get()
+        # Session, user and badge, then the page of groups, its books, requests and loans
+        with self.assertNumQueries(7):
+            response = self.get()
+        groups = response.context["all_requests_by_book"]
+        self.assertEqual(len(groups), 10)
+        self.assertEqual(groups[0]["book"].pk, "vol_03")
+        self.assertEqual((groups[0]["open_count"], groups[0]["rejected_count"]), (1, 3))
+        self.assertEqual([group["book"].pk for group in groups[1:3]], ["vol_24", "vol_23"])
+        self.assertTrue(groups[1]["has_active_loan"])
+        self.assertFalse(groups[0]["has_active_loan"])
+        self.assertEqual(len(groups[1]["requests"]), 3)
+
+    def test_walking_the_pages_covers_every_book_once(self):
+        seen, response = [], self.get()
+        while True:
+            seen += [group["book"].pk for group in response.context["all_requests_by_book"]]
+            page = response.context["page"]
+            if not page.has_next:
+                break
+            self.assertContains(response, f"filter_by=owner&after={page.next_cursor}")
+            response = self.get(after=page.next_cursor)
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(seen[0], "vol_03")
+        self.assertEqual(seen[1:], [f"vol_{i:02d}" for i in range(24, -1, -1) if i != 3])
+
+        back = self.get(before=page.previous_cursor)
+        self.assertEqual(back.context["all_requests_by_book"][-1]["book"].pk, seen[-6])
+
+    def test_requester_view(self):
+        self.client.force_login(self.readers[0])
+        groups = self.get(filter_by="requester").context["all_requests_by_book"]
+        self.assertEqual(groups[0]["book"].pk, "vol_03")
+        self.assertEqual(len(groups[0]["requests"]), 2)
+
+    def test_page_reads_summaries_not_the_request_history(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.get()
+        self.assertFalse([query["sql"] for query in queries if "GROUP BY" in query["sql"]])
+
+        page = RequestSummary.objects.filter(user=self.owner, role="owner").order_by("-has_live", "-last_action", "book_id")
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = page[:11].explain()
+        self.assertIn("requestsummary_page_idx", plan)
+        self.assertNotIn("Sort", plan)
+
+
+class TestRequestSummary(TestCase):
+    """Test cases for keeping the per-book request summaries in step"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="testpass123")
+        self.readers = [User.objects.create_user(username=f"reader{i}", password="testpass123") for i in range(3)]
+        self.book = Book.objects.create(google_book_id="vol_dune", title="Dune")
+        UserBook.objects.create(user=self.owner, book=self.book)
+
+    def stored(self):
+        return set(
+            RequestSummary.objects.values_list("user_id", "role", "book_id", "open_count", "accepted_count", "rejected_count")
+        )
+
+    def fresh(self):
+        rows = set()
+        for role in RequestSummary.Role:
+            for row in RequestSummary.counts(role, RequestBook.objects.all()):
+                counts = (row["open_count"], row["accepted_count"], row["rejected_count"])
+                rows.add((row["user_id"], role.value, row["book_key"], *counts))
+        return rows
+
+    def test_summaries_follow_decisions_cancellations_and_deletes(self):
+        requests = [RequestBook.objects.create(owner=self.owner, requester=reader, book=self.book) for reader in self.readers]
+        self.assertIn((self.owner.pk, "owner", "vol_dune", 3, 0, 0), self.stored())
+
+        RequestBook.cancel_many([requests[2].pk], self.readers[2])
+        RequestBook.decide(requests[0].pk, self.owner, approve=True)  # Rejects the other open one in bulk
+        self.assertIn((self.owner.pk, "owner", "vol_dune", 0, 1, 1), self.stored())
+        self.assertEqual(self.stored(), self.fresh())
+
+        self.readers[1].delete()
+        self.assertIn((self.owner.pk, "owner", "vol_dune", 0, 1, 0), self.stored())
+        self.assertEqual(self.stored(), self.fresh())
+
+    def test_rebuild_command_repairs_drift(self):
+        RequestBook.objects.create(owner=self.owner, requester=self.readers[0], book=self.book)
+        expected = self.stored()
+        RequestSummary.objects.update(open_count=0)
+        call_command("rebuild_request_summaries", stdout=io.StringIO())
+        self.assertEqual(self.stored(), expected)
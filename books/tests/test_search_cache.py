@@ -0,0 +1,107 @@
+"""
+Unit tests for the Google Books search response cache
+"""
+import time
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from books.search_cache import SearchCache, make_key, search_cache
+
+
+def fake_search_response(title="Dune"):
+    return {
+        "totalItems": 1,
+        "items": [{"id": "vol_001", "volumeInfo": {"title": title, "authors": ["Frank Herbert"]}}],
+    }
+
+
+class TestSearchCache(TestCase):
+    """Test cases for the two-level search cache"""
+
+    def setUp(self):
+        self.config = {
+            "ALIAS": "google_books",
+            "TTL": 60,
+            "L1_MAX_ENTRIES": 2,
+            "L1_TTL": 60,
+        }
+        self.cache = SearchCache(config=self.config)
+        self.cache.clear(shared=True)
+
+    def test_key_is_normalized(self):
+        """Test that case and whitespace differences share a key"""
+        self.assertEqual(make_key("  The  Hobbit ", 0, 12), make_key("the hobbit", 0, 12))
+        self.assertNotEqual(make_key("the hobbit", 0, 12), make_key("the hobbit", 12, 12))
+        self.assertNotEqual(make_key("the hobbit", 0, 12), make_key("the hobbit", 0, 20))
+
+    def test_miss_then_l1_hit(self):
+        """Test that a stored response is served from the in-process level"""
+        self.assertIsNone(self.cache.get("dune", 0, 12))
+        self.cache.set("dune", 0, 12, fake_search_response())
+
+        self.assertEqual(self.cache.get("Dune", 0, 12), fake_search_response())
+        stats = self.cache.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["l1_hits"], 1)
+
+    def test_l2_shared_between_instances(self):
+        """Test that a second process (instance) is served from the shared level"""
+        self.cache.set("dune", 0, 12, fake_search_response())
+
+        other_worker = SearchCache(config=self.config)
+        self.assertEqual(other_worker.get("dune", 0, 12), fake_search_response())
+        self.assertEqual(other_worker.stats()["l2_hits"], 1)
+
+        # The L2 hit is promoted into the other worker's L1
+        other_worker.get("dune", 0, 12)
+        self.assertEqual(other_worker.stats()["l1_hits"], 1)
+
+    def test_l1_evicts_least_recently_used(self):
+        """Test that L1 stays within its size bound"""
+        self.cache.set("one", 0, 12, fake_search_response("One"))
+        self.cache.set("two", 0, 12, fake_search_response("Two"))
+        self.cache.get("one", 0, 12)  # "one" is now most recently used
+        self.cache.set("three", 0, 12, fake_search_response("Three"))
+
+        self.assertEqual(self.cache.stats()["l1_size"], 2)
+        self.cache.backend.clear()
+        self.assertIsNotNone(self.cache.get("one", 0, 12))
+        self.assertIsNone(self.cache.get("two", 0, 12))
+
+    def test_l1_entries_expire(self):
+        """Test that L1 entries are dropped after their TTL"""
+        self.cache.set("dune", 0, 12, fake_search_response())
+        self.cache.backend.clear()
+
+        with mock.patch("books.search_cache.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNone(self.cache.get("dune", 0, 12))
+        self.assertEqual(self.cache.stats()["l1_size"], 0)
+
+
+class TestBookSearchCaching(TestCase):
+    """Test that book_search only calls Google on a cache miss"""
+
+    def setUp(self):
+        search_cache.clear(shared=True)
+
+    @mock.patch("books.google_books.GoogleBooksClient.search_volumes")
+    def test_repeat_search_served_from_cache(self, mock_get):
+        mock_get.return_value = fake_search_response()
+
+        first = self.client.get(reverse("book_search"), {"query": "Dune"})
+        second = self.client.get(reverse("book_search"), {"query": "dune "})
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(first.context["books"], second.context["books"])
+        self.assertEqual(second.context["books"][0]["title"], "Dune")
+
+    @mock.patch("books.google_books.GoogleBooksClient.search_volumes")
+    def test_pages_cached_separately(self, mock_get):
+        mock_get.return_value = fake_search_response()
+
+        self.client.get(reverse("book_search"), {"query": "Dune"})
+        self.client.get(reverse("book_search"), {"query": "Dune", "page": 2})
+
+        self.assertEqual(mock_get.call_count, 2)
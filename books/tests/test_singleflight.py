@@ -0,0 +1,175 @@
+"""
+Unit tests for single-flight coalescing of concurrent Google Books searches
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from books import google_books
+from books.quota import BACKGROUND, QuotaExceededError, background_priority, current_priority
+from books.search_cache import search_cache
+from books.singleflight import SingleFlight
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "google_books": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "singleflight-tests"},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestSingleFlight(SimpleTestCase):
+    """Test cases for in-process and cross-process coalescing"""
+
+    def setUp(self):
+        self.config = {"ALIAS": "google_books", "LEASE_TIMEOUT": 5, "WAIT_TIMEOUT": 2, "POLL_INTERVAL": 0.01}
+        self.flight = SingleFlight(config=self.config)
+        caches["google_books"].clear()
+
+    def test_concurrent_threads_share_one_call(self):
+        """Test that only the first caller for a key runs the call"""
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(2)
+            return {"totalItems": 7}
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(self.flight.do, "key", fetch) for _ in range(8)]
+            # Let every thread join the flight before the leader finishes
+            while self.flight.stats()["followers"] < 7:
+                pass
+            release.set()
+            results = [f.result(timeout=5) for f in futures]
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"totalItems": 7}] * 8)
+
+    def test_errors_are_shared_with_waiters(self):
+        """Test that followers see the leader's exception rather than retrying"""
+        release = threading.Event()
+
+        def fetch():
+            release.wait(2)
+            raise ValueError("upstream failed")
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = [pool.submit(self.flight.do, "key", fetch) for _ in range(3)]
+            while self.flight.stats()["followers"] < 2:
+                pass
+            release.set()
+            for future in futures:
+                with self.assertRaises(ValueError):
+                    future.result(timeout=5)
+
+        self.assertEqual(self.flight.stats()["in_flight"], 0)
+
+    def test_different_keys_are_not_coalesced(self):
+        fetch = mock.Mock(side_effect=lambda: "result")
+        self.flight.do("one", fetch)
+        self.flight.do("two", fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_waits_for_leader_in_another_process(self):
+        """Test that a held lease makes this process poll instead of fetching"""
+        caches["google_books"].add("key:lease", 1)
+        fetch = mock.Mock()
+        recheck = mock.Mock(side_effect=[None, None, "from other process"])
+
+        self.assertEqual(self.flight.do("key", fetch, recheck=recheck), "from other process")
+        fetch.assert_not_called()
+        self.assertEqual(self.flight.stats()["remote_waits"], 1)
+
+    def test_takes_over_released_lease(self):
+        """Test that a follower fetches itself once the other process lets go"""
+        caches["google_books"].add("key:lease", 1)
+
+        def recheck():
+            caches["google_books"].delete("key:lease")  # Other process failed
+            return None
+
+        self.assertEqual(self.flight.do("key", lambda: "fetched", recheck=recheck), "fetched")
+        self.assertIsNone(caches["google_books"].get("key:lease"))
+
+    def test_leader_keeps_its_hands_off_a_lease_taken_after_its_own_lapsed(self):
+        def slow_fetch():
+            # Our lease lapses mid-fetch and another process takes the key
+            caches["google_books"].set("key:lease", "other-leader")
+            return "fetched"
+
+        self.assertEqual(self.flight.do("key", slow_fetch, recheck=lambda: None), "fetched")
+        self.assertEqual(caches["google_books"].get("key:lease"), "other-leader")
+
+    def test_async_calls_share_one_task(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def main():
+            return await asyncio.gather(*(self.flight.ado("key", fetch) for _ in range(5)))
+
+        self.assertEqual(asyncio.run(main()), ["result"] * 5)
+        self.assertEqual(len(calls), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestSearchVolumesCoalescing(SimpleTestCase):
+    """Test that concurrent identical searches make a single upstream call"""
+
+    def setUp(self):
+        search_cache.clear(shared=True)
+
+    def test_burst_of_identical_searches(self):
+        release = threading.Event()
+
+        def slow_search(query, start_index, max_results):
+            release.wait(2)
+            return {"totalItems": 1, "items": []}
+
+        followers_before = google_books.search_flight.stats()["followers"]
+        with mock.patch.object(google_books.get_client(), "search_volumes", side_effect=slow_search) as upstream, \
+                ThreadPoolExecutor(max_workers=6) as pool:
+            futures = [pool.submit(google_books.search_volumes, "Dune", 0, 12) for _ in range(6)]
+            while google_books.search_flight.stats()["followers"] < followers_before + 5:
+                pass
+            release.set()
+            results = [f.result(timeout=5) for f in futures]
+
+        self.assertEqual(upstream.call_count, 1)
+        self.assertEqual(results, [{"totalItems": 1, "items": []}] * 6)
+
+    def test_interactive_search_does_not_follow_a_background_prefetch(self):
+        in_flight, release = threading.Event(), threading.Event()
+
+        def search(query, start_index, max_results):
+            if current_priority() == BACKGROUND:
+                # A prefetch the quota refuses at the reserve, after a slow start
+                in_flight.set()
+                release.wait(2)
+                raise QuotaExceededError("background share spent")
+            return {"totalItems": 1, "items": []}
+
+        def prefetch():
+            with background_priority():
+                return google_books.fetch_search("Dune", 12, 12)
+
+        with mock.patch.object(google_books.get_client(), "search_volumes", side_effect=search) as upstream, \
+                ThreadPoolExecutor(max_workers=1) as pool:
+            background = pool.submit(prefetch)
+            in_flight.wait(2)
+            try:
+                # Runs at its own priority instead of waiting for the prefetch's refusal
+                self.assertEqual(google_books.search_volumes("Dune", 12, 12), {"totalItems": 1, "items": []})
+            finally:
+                release.set()
+            with self.assertRaises(QuotaExceededError):
+                background.result(timeout=5)
+        self.assertEqual(upstream.call_count, 2)
@@ -0,0 +1,164 @@
+"""
+Unit tests for the per-member UserStats counters
+"""
+import io
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from books.context_processors import pending_requests_count
+from books.models import Book, BookStats, Group, GroupMember, RequestBook, Transaction, UserBook, UserStats, Wishlist
+
+User = get_user_model()
+
+
+class TestUserStatsSignals(TestCase):
+    """Test cases for keeping the counters in step with the source tables"""
+
+    def setUp(self):
+        self.member = User.objects.create_user(username="member", password="testpass123")
+        self.friend = User.objects.create_user(username="friend", password="testpass123")
+        self.dune = Book.objects.create(google_book_id="vol_dune", title="Dune")
+        self.emma = Book.objects.create(google_book_id="vol_emma", title="Emma")
+
+    def counters(self, user):
+        stats = UserStats.objects.get(user=user)
+        return tuple(getattr(stats, field) for field in UserStats.COUNTERS)
+
+    def test_books_wishes_and_groups(self):
+        user_book = UserBook.objects.create(user=self.member, book=self.dune)
+        wish = Wishlist.objects.create(user=self.member, book=self.emma)
+        group = Group.objects.create(group_name="Sci Fi")
+        GroupMember.join(self.member, group)
+        GroupMember.join(self.member, group)  # Joining twice counts once
+        self.assertEqual(self.counters(self.member), (1, 1, 1, 0, 0))
+
+        wish.removed_datetime = timezone.now()
+        wish.save()
+        wish.save()  # Saving again doesn't decrement twice
+        user_book.delete()
+        GroupMember.leave(self.member, group)
+        self.assertEqual(self.counters(self.member), (0, 0, 0, 0, 0))
+
+    def test_requests_count_for_both_sides_until_decided(self):
+        request = RequestBook.objects.create(owner=self.friend, requester=self.member, book=self.dune)
+        cancelled = RequestBook.objects.create(owner=self.friend, requester=self.member, book=self.emma)
+        self.assertEqual(self.counters(self.member)[3:], (2, 0))
+        self.assertEqual(self.counters(self.friend)[3:], (0, 2))
+
+        cancelled.cancelled_datetime = timezone.now()
+        cancelled.save()
+        request.decision, request.decision_datetime = True, timezone.now()
+        request.save()
+        self.assertEqual(self.counters(self.member)[3:], (0, 0))
+        self.assertEqual(self.counters(self.friend)[3:], (0, 0))
+
+    def test_badge_reads_one_row(self):
+        RequestBook.objects.create(owner=self.member, requester=self.friend, book=self.dune)
+        self.client.force_login(self.member)
+        response = self.client.get(reverse("book_database"))
+        self.assertEqual(response.context["pending_requests_count"], 1)
+
+        self.client.force_login(User.objects.create_user(username="newcomer", password="testpass123"))
+        self.assertEqual(self.client.get(reverse("book_database")).context["pending_requests_count"], 0)
+
+    def test_reconcile_reports_and_repairs_drift(self):
+        UserBook.objects.create(user=self.member, book=self.dune)
+        RequestBook.objects.create(owner=self.member, requester=self.friend, book=self.dune)
+        # Writes that bypass the signals
+        UserStats.objects.filter(user=self.member).update(books=5)
+        RequestBook.objects.update(cancelled_datetime=timezone.now())
+
+        out = io.StringIO()
+        call_command("reconcile_user_stats", "--dry-run", stdout=out)
+        self.assertIn(f"User {self.member.pk}: books 5 -> 1, requests_received_open 1 -> 0", out.getvalue())
+        self.assertIn("found drift in 2", out.getvalue())
+        self.assertEqual(self.counters(self.member)[0], 5)
+
+        call_command("reconcile_user_stats", "--batch-size", "1", stdout=io.StringIO())
+        self.assertEqual(self.counters(self.member), (1, 0, 0, 0, 0))
+        self.assertEqual(self.counters(self.friend), (0, 0, 0, 0, 0))
+
+        out = io.StringIO()
+        call_command("reconcile_user_stats", stdout=out)
+        self.assertIn("repaired drift in 0", out.getvalue())
+
+
+class TestDoubleSubmit(TransactionTestCase):
+    """Test that a second post racing the first moves the counters only once"""
+
+    def setUp(self):
+        self.member = User.objects.create_user(username="member", password="testpass123")
+        self.friend = User.objects.create_user(username="friend", password="testpass123")
+        self.dune = Book.objects.create(google_book_id="vol_dune", title="Dune")
+        self.emma = Book.objects.create(google_book_id="vol_emma", title="Emma")
+
+    def race(self, user, row, close, url, data):
+        """Post from another thread while this one holds the row, then close it here first"""
+        def post():
+            try:
+                self.client.post(url, data)
+            finally:
+                connection.close()
+
+        self.client.force_login(user)
+        with transaction.atomic():
+            row = type(row).objects.select_for_update().get(pk=row.pk)
+            thread = threading.Thread(target=post)
+            thread.start()
+            with connection.cursor() as cursor:
+                for _ in range(100):  # Wait until the post is queued behind our lock
+                    cursor.execute("SELECT count(*) FROM pg_locks WHERE NOT granted")
+                    if cursor.fetchone()[0]:
+                        break
+                    time.sleep(0.05)
+            setattr(row, close, timezone.now())
+            row.save()
+        thread.join()
+
+    def test_removing_a_wish_twice(self):
+        wish = Wishlist.objects.create(user=self.member, book=self.dune)
+        # Open rows the counters keep once the raced one is closed
+        Wishlist.objects.create(user=self.member, book=self.emma)
+        Wishlist.objects.create(user=self.friend, book=self.dune)
+        self.race(self.member, wish, "removed_datetime", reverse("remove_from_wishlist"), {"book_id": self.dune.pk})
+        self.assertEqual(UserStats.objects.get(user=self.member).wishes, 1)
+        self.assertEqual(BookStats.objects.get(book=self.dune).active_wishers, 1)
+
+    def test_ending_a_loan_twice(self):
+        UserBook.objects.create(user=self.member, book=self.dune)
+        loan = Transaction.objects.create(owner=self.member, borrower=self.friend, book=self.dune)
+        # A book has one open loan, so start the counter high enough to show a second drop
+        BookStats.objects.filter(book=self.dune).update(active_loans=2)
+        self.race(self.member, loan, "returned_datetime", reverse("end_loan"), {"transaction_id": loan.pk})
+        self.assertEqual(BookStats.objects.get(book=self.dune).active_loans, 1)
+
+    def test_cancelling_a_request_twice(self):
+        request = RequestBook.objects.create(owner=self.friend, requester=self.member, book=self.dune)
+        RequestBook.objects.create(owner=self.friend, requester=self.member, book=self.emma)
+        self.race(self.member, request, "cancelled_datetime", reverse("cancel_request"), {"request_id": request.pk})
+        self.assertEqual(UserStats.objects.get(user=self.member).requests_open, 1)
+        self.assertEqual(UserStats.objects.get(user=self.friend).requests_received_open, 1)
+
+
+class TestPendingRequestsBadge(TestCase):
+    """Test cases for looking the badge count up only when it is rendered"""
+
+    def test_count_is_looked_up_once_on_first_use(self):
+        owner = User.objects.create_user(username="owner", password="testpass123")
+        requester = User.objects.create_user(username="requester", password="testpass123")
+        RequestBook.objects.create(owner=owner, requester=requester, book=Book.objects.create(google_book_id="vol_dune"))
+        request = RequestFactory().get("/")
+        request.user = owner
+
+        with self.assertNumQueries(0):
+            badge = pending_requests_count(request)["pending_requests_count"]
+        with self.assertNumQueries(1):
+            self.assertTrue(badge > 0)
+            self.assertEqual(str(badge), "1")
@@ -0,0 +1,114 @@
+"""
+Unit tests for the server-side volume cache behind add to library/wishlist
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from requests.exceptions import ConnectionError
+
+from books.models import Book, UserBook, Wishlist
+from books.search_cache import search_cache
+from books.volume_cache import VolumeCache, is_valid_volume_id
+
+User = get_user_model()
+
+
+def fake_volume(volume_id="vol_001", title="Dune"):
+    return {
+        "id": volume_id,
+        "volumeInfo": {
+            "title": title,
+            "authors": ["Frank Herbert"],
+            "industryIdentifiers": [{"type": "ISBN_13", "identifier": "9780441013593"}],
+            "averageRating": 4.5,
+        },
+    }
+
+
+class TestVolumeCache(TestCase):
+    """Test cases for storing and reading normalized volumes"""
+
+    def setUp(self):
+        self.cache = VolumeCache(config={"ALIAS": "google_books", "TTL": 60})
+        self.cache.backend.clear()
+
+    def test_round_trip(self):
+        self.cache.set_many([{"id_google": "vol_001", "title": "Dune"}])
+        self.assertEqual(self.cache.get("vol_001"), {"id_google": "vol_001", "title": "Dune"})
+        self.assertIsNone(self.cache.get("vol_002"))
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_invalid_ids_not_stored(self):
+        self.cache.set_many([{"id_google": "../etc"}, {"id_google": {}}])
+        self.assertEqual(self.cache.stats()["stored"], 0)
+
+    def test_volume_id_validation(self):
+        self.assertTrue(is_valid_volume_id("zyTCAlFPjgYC"))
+        self.assertTrue(is_valid_volume_id("a-b_C9"))
+        self.assertFalse(is_valid_volume_id(""))
+        self.assertFalse(is_valid_volume_id(None))
+        self.assertFalse(is_valid_volume_id("x" * 26))
+        self.assertFalse(is_valid_volume_id("vol 1"))
+
+
+@mock.patch("books.google_books.GoogleBooksClient.get_volume")
+@mock.patch("books.google_books.GoogleBooksClient.search_volumes")
+class TestAddToLibraryHydration(TestCase):
+    """Test that the add form posts only the id and the Book is built server-side"""
+
+    def setUp(self):
+        search_cache.clear(shared=True)
+        VolumeCache().backend.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.client.force_login(self.user)
+
+    def add(self, volume_id, action="add_to_library"):
+        return self.client.post(reverse("add_to_library"), {"action": action, "id_google": volume_id})
+
+    def test_book_hydrated_from_search_results(self, mock_search, mock_get_volume):
+        mock_search.return_value = {"totalItems": 1, "items": [fake_volume()]}
+        search_page = self.client.get(reverse("book_search"), {"query": "dune"})
+        self.assertNotContains(search_page, 'name="title"')
+
+        response = self.add("vol_001")
+
+        self.assertRedirects(response, reverse("add_to_library_confirm"), fetch_redirect_response=False)
+        mock_get_volume.assert_not_called()
+        book = Book.objects.get(pk="vol_001")
+        self.assertEqual((book.title, book.authors, book.ID_ISBN_13), ("Dune", "Frank Herbert", "9780441013593"))
+        self.assertIsNone(book.ID_ISBN_10)
+        self.assertTrue(UserBook.objects.filter(user=self.user, book=book).exists())
+
+    def test_cache_miss_fetches_single_volume(self, mock_search, mock_get_volume):
+        mock_get_volume.return_value = fake_volume("vol_002", "Children of Dune")
+
+        self.add("vol_002", action="add_to_wishlist")
+
+        mock_get_volume.assert_called_once_with("vol_002")
+        self.assertEqual(Book.objects.get(pk="vol_002").title, "Children of Dune")
+        self.assertTrue(Wishlist.objects.filter(user=self.user, book_id="vol_002").exists())
+
+    def test_existing_book_needs_no_lookup(self, mock_search, mock_get_volume):
+        Book.objects.create(google_book_id="vol_003", title="Dune Messiah")
+
+        self.add("vol_003")
+
+        mock_get_volume.assert_not_called()
+        self.assertTrue(UserBook.objects.filter(user=self.user, book_id="vol_003").exists())
+
+    def test_invalid_requests_rejected(self, mock_search, mock_get_volume):
+        self.add("not a volume id")
+        self.add("vol_004", action="delete_everything")
+
+        mock_get_volume.assert_not_called()
+        self.assertFalse(Book.objects.exists())
+
+    def test_google_failure_on_miss(self, mock_search, mock_get_volume):
+        mock_get_volume.side_effect = ConnectionError("down")
+
+        response = self.add("vol_005")
+
+        self.assertRedirects(response, reverse("book_search"), fetch_redirect_response=False)
+        self.assertFalse(Book.objects.exists())
@@ -1,7 +1,11 @@
 from django.conf import settings  # To pull in env variables
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
-from django.http import Http404
-from django.db.models import Count, Q
+from django.http import FileResponse, Http404, JsonResponse
+from django.core.files.storage import default_storage
+from django.db.models import F
+import asyncio
+from collections import defaultdict
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,7 +15,6 @@ from django.views.generic import (
     DetailView,
     RedirectView,
     UpdateView,
-    ListView,
     View,
 )
 from .forms import UserCreateForm, RequestStatusForm
@@ -20,15 +23,13 @@ from django.contrib.auth import logout as auth_logout
 from django.contrib.auth.views import LoginView as DjangoLoginView
 from django.urls import reverse_lazy, reverse
 from django.shortcuts import get_object_or_404
-from django.db import IntegrityError
-from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.http import HttpResponseRedirect
-import requests
 from requests.exceptions import RequestException
 from json.decoder import JSONDecodeError
 from django.utils import timezone
-from datetime import timedelta
-from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
 from .models import (
     Book,
     CustomUser,
@@ -37,7 +38,26 @@ from .models import (
     UserBook,
     Wishlist,
     RequestBook,
+    RequestSummary,
     Transaction,
+    BookStats,
+)
+from . import google_books
+from .catalog_search import always_needs_google, asearch_catalog, needs_google, owned_books, search_catalog
+from .pagination import keyset_page
+from .prefetch import prefetch_key_for, search_prefetcher
+from .volume_cache import is_valid_volume_id, volume_cache
+from .volumes import book_defaults, get_book_section, process_book_item
+from .covers import COVER_KEY_RE, COVER_NAME_RE, cover_path, cover_url
+from .group_library import group_library
+from .profiles import (
+    BOOK_SORTS,
+    GROUP_SORTS,
+    WISH_SORTS,
+    profile_books,
+    profile_groups,
+    profile_user,
+    profile_wishes,
 )
 from django.contrib.auth.mixins import LoginRequiredMixin
 import os
@@ -70,11 +90,7 @@ class CreateGroup(LoginRequiredMixin, CreateView):
         # Save the group first
         response = super().form_valid(form)
         # Add the creator as an admin member of the group
-        GroupMember.objects.create(
-            user=self.request.user,
-            group=self.object,
-            admin=True
-        )
+        GroupMember.join(self.request.user, self.object, admin=True)
         return response
 
 
@@ -88,7 +104,7 @@ class JoinGroup(LoginRequiredMixin, RedirectView):
     # Check if user can perform action
     def get(self, request, *args, **kwargs):
         group = get_object_or_404(Group, slug=self.kwargs.get("slug"))
-        GroupMember.objects.create(user=self.request.user, group=group)
+        GroupMember.join(self.request.user, group)
         return super().get(request, *args, **kwargs)
 
 
@@ -101,44 +117,95 @@ class LeaveGroup(LoginRequiredMixin, RedirectView):
 
     # Check if user can perform action
     def get(self, request, *args, **kwargs):
-        membership = GroupMember.objects.filter(
-            user=self.request.user, group__slug=self.kwargs.get("slug")
-        ).get()
-        membership.delete()
+        group = get_object_or_404(Group, slug=self.kwargs.get("slug"))
+        if not GroupMember.leave(self.request.user, group):
+            raise Http404("You are not a member of this group")
         return super().get(request, *args, **kwargs)
 
 
-# TODO: Turn these into ListView. Paigination
+BOOK_DATABASE_PER_PAGE = 24  # Books per catalog page (4x6 grid)
+BOOK_DATABASE_ORDERINGS = {
+    "title": ("title", "google_book_id"),  # Backed by book_title_id_idx
+    "available": ("-available_copies", "title", "google_book_id"),  # Most copies free to borrow first
+}
+
+
 def book_database(request):
-    books_list = Book.objects.filter(owner__isnull=False).order_by("title").distinct()
-    books_dict = {"books": books_list}
+    # One query per page however deep the cursor is; counts come from the same query
+    books = owned_books()
+    available_only = request.GET.get("available") == "1"
+    if available_only:
+        books = books.filter(stats__available_copies__gt=0)
+    sort = request.GET.get("sort")
+    if sort not in BOOK_DATABASE_ORDERINGS:
+        sort = "title"
+
+    page = keyset_page(
+        books,
+        BOOK_DATABASE_ORDERINGS[sort],
+        BOOK_DATABASE_PER_PAGE,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+    )
+    # Carried over to the next/previous page links
+    filters = {"sort": sort} if sort != "title" else {}
+    if available_only:
+        filters["available"] = "1"
+    books_dict = {
+        "books": page.items,
+        "page": page,
+        "sort": sort,
+        "available_only": available_only,
+        "filter_params": urlencode(filters),
+    }
     return render(request, "book_database.html", context=books_dict)
 
 
+BOOK_WISHES_ORDERING = ("-active_wishers", "book_id")  # Backed by the partial bookstats_wanted_idx
+
+
 def book_database_wishes(request):
-    # Query to count distinct users wishing for each book
-    books_list = (
-        Book.objects.filter(
-            book_wish__user__isnull=False,  # Filter to include only books that are wished for
-            book_wish__removed_datetime__isnull=True,  # Book is still wanted and hasn't been removed
-        )
-        .annotate(
-            wishers_count=Count(
-                "book_wish__user", distinct=True
-            ),  # Count distinct users wishing for the book
-            owners_count=Count(
-                "book_owners__user", distinct=True
-            ),  # Count distinct users owning the book
-        )
-        .order_by("title")
-    )  # Order by book title
-    books_dict = {"books": books_list}
+    # Most wanted first, read straight from the maintained BookStats counters
+    stats = (
+        BookStats.objects.filter(active_wishers__gt=0)
+        .select_related("book")
+        .defer("book__description", "book__search_vector")
+    )
+    page = keyset_page(
+        stats,
+        BOOK_WISHES_ORDERING,
+        BOOK_DATABASE_PER_PAGE,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+    )
+    books_dict = {"book_stats": page.items, "page": page}
     return render(request, "book_database_wishlist.html", context=books_dict)
 
 
+GROUP_DATABASE_PER_PAGE = 20
+GROUP_MEMBERS_PER_PAGE = 20  # Members listed per page on a group's page
+
+
 def group_database(request):
-    groups_list = Group.objects.order_by("group_name")
-    groups_dict = {"groups": groups_list}
+    # member_count is a maintained column, so a page is one query on the group_name index
+    groups_list = Group.objects.defer("description_html")
+    prefix = request.GET.get("q", "").strip()
+    if prefix:
+        groups_list = groups_list.filter(group_name__istartswith=prefix)  # Uses group_name_prefix_idx
+
+    page = keyset_page(
+        groups_list,
+        ("group_name",),
+        GROUP_DATABASE_PER_PAGE,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+    )
+    groups_dict = {
+        "groups": page.items,
+        "page": page,
+        "prefix": prefix,
+        "filter_params": urlencode({"q": prefix}) if prefix else "",
+    }
     return render(request, "group_database.html", context=groups_dict)
 
 
@@ -147,79 +214,83 @@ class UserAccount(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user_pk = self.kwargs["pk"]  # obtain elements from URL
-        user_username = get_object_or_404(CustomUser, id=user_pk)
-
-        # Query the user's books with date_added from UserBook
-        user_books_with_dates = UserBook.objects.filter(user=user_pk).select_related('book').order_by('book__title')
-        user_books = [ub.book for ub in user_books_with_dates]
-        # Attach date_added to each book for template access
-        for i, ub in enumerate(user_books_with_dates):
-            user_books[i].date_added = ub.date_added
-        user_book_count = user_books_with_dates.count()
-
-        # Query the user's book wishes
-        # TODO: Put this in reusable function with the one in SingleBook
-        user_wish = Wishlist.objects.filter(
-            user=user_pk, removed_datetime__isnull=True
-        ).annotate(owners_count=Count("book__owner", filter=~Q(book__owner=user_pk)))
-
-        # user_wish = Wishlist.objects.filter(user=user_pk, removed_datetime__isnull=True)
-        user_wish_count = Wishlist.objects.filter(
-            user=user_pk, removed_datetime__isnull=True
-        ).count()
-
-        # Query the number of groups the user belongs to
-        user_groups = Group.objects.filter(members=user_pk).order_by("group_name")
-        user_group_count = GroupMember.objects.filter(user=user_pk).count()
-
-        # Query the number of requests the user has made. Open and Closed
-        user_requests_open = RequestBook.objects.filter(
-            requester=user_pk, decision_datetime__isnull=True, cancelled_datetime__isnull=True
-        ).order_by("request_datetime")
-
-        # Query the number of requests the user has recieved. Open and Closed
-        user_requests_recieved_open = RequestBook.objects.filter(
-            owner=user_pk, decision_datetime__isnull=True, cancelled_datetime__isnull=True
-        ).order_by("request_datetime")
-
-        # For logged-in users viewing another user's profile, track which books they've already requested
-        requested_book_ids = set()
-        viewer_owned_book_ids = set()
-        if self.request.user.is_authenticated and self.request.user.id != user_pk:
-            # Get book IDs that the current user has already requested from this owner
-            requested_book_ids = set(
-                RequestBook.objects.filter(
-                    requester=self.request.user,
-                    owner=user_username,
-                    decision_datetime__isnull=True,
-                    cancelled_datetime__isnull=True
-                ).values_list('book_id', flat=True)
-            )
-
-            # Get book IDs that the current logged-in user owns (to prevent requesting books they already have)
-            viewer_owned_book_ids = set(
-                Book.objects.filter(owner=self.request.user).values_list('pk', flat=True)
-            )
+        # The member plus every counter on the page, in one query. The shelves
+        # themselves are loaded by the page from the JSON endpoints below
+        user_username = profile_user(self.kwargs["pk"])
 
         # Add the data to the context
         context["user_username"] = user_username
-        context["user_books"] = user_books
-        context["user_book_count"] = user_book_count
-        context["user_wish"] = user_wish
-        context["user_wish_count"] = user_wish_count
-        context["user_groups"] = user_groups
-        context["user_group_count"] = user_group_count
-        context["user_requests_open_count"] = user_requests_open.count()
-        context[
-            "user_requests_recieved_open_count"
-        ] = user_requests_recieved_open.count()
-        context["requested_book_ids"] = requested_book_ids
-        context["viewer_owned_book_ids"] = viewer_owned_book_ids
+        context["user_book_count"] = user_username.book_count
+        context["user_wish_count"] = user_username.wish_count
+        context["user_wishes_available"] = user_username.wishes_available
+        context["user_group_count"] = user_username.group_count
+        context["user_requests_open_count"] = user_username.requests_open
+        context["user_requests_recieved_open_count"] = user_username.requests_received_open
 
         return context
 
 
+PROFILE_SECTION_PER_PAGE = 20
+
+
+def _profile_section_page(request, queryset, sorts, default_sort):
+    """One keyset page of a profile section, in the sort order named by ?sort="""
+    sort = request.GET.get("sort")
+    fields = sorts[sort if sort in sorts else default_sort]
+    return keyset_page(queryset, fields, PROFILE_SECTION_PER_PAGE, after=request.GET.get("after"))
+
+
+def user_books_json(request, pk):
+    get_object_or_404(CustomUser, pk=pk)
+    page = _profile_section_page(request, profile_books(pk), BOOK_SORTS, "title-asc")
+    book_ids = [book["book_id"] for book in page.items]
+
+    # For logged-in users viewing another user's profile, which of this page's
+    # books they already own or have an open request for
+    requested_book_ids = viewer_owned_book_ids = set()
+    viewer = request.user
+    if viewer.is_authenticated and viewer.pk != pk:
+        requested_book_ids = set(
+            RequestBook.objects.filter(
+                requester=viewer,
+                owner=pk,
+                book_id__in=book_ids,
+                state=RequestBook.State.OPEN,
+            ).values_list("book_id", flat=True)
+        )
+        viewer_owned_book_ids = set(
+            UserBook.objects.filter(user=viewer, book_id__in=book_ids).values_list("book_id", flat=True)
+        )
+
+    books = [
+        {
+            "id": book["book_id"],
+            "title": book["title"],
+            "added": book["date_added"].isoformat(),
+            "viewer_owns": book["book_id"] in viewer_owned_book_ids,
+            "requested": book["book_id"] in requested_book_ids,
+        }
+        for book in page.items
+    ]
+    return JsonResponse({"items": books, "next": page.next_cursor})
+
+
+def user_wishes_json(request, pk):
+    get_object_or_404(CustomUser, pk=pk)
+    page = _profile_section_page(request, profile_wishes(pk), WISH_SORTS, "title-asc")
+    wishes = [
+        {"id": wish["book_id"], "title": wish["title"], "owners": wish["owners_count"]} for wish in page.items
+    ]
+    return JsonResponse({"items": wishes, "next": page.next_cursor})
+
+
+def user_groups_json(request, pk):
+    get_object_or_404(CustomUser, pk=pk)
+    page = _profile_section_page(request, profile_groups(pk), GROUP_SORTS, "name-asc")
+    groups = [{"slug": group["slug"], "name": group["group_name"]} for group in page.items]
+    return JsonResponse({"items": groups, "next": page.next_cursor})
+
+
 class CustomLoginView(DjangoLoginView):
     """Custom login view that redirects to user's account page with success message"""
     template_name = "login.html"
@@ -258,9 +329,8 @@ class SingleBook(DetailView):
         book_pk = self.kwargs["pk"]  # obtain elements from URL
         # TODO: Put this in reusable function with the one in UserAccount
         user_wish = Wishlist.objects.filter(book=book_pk, removed_datetime__isnull=True)
-        user_wish_count = Wishlist.objects.filter(
-            book=book_pk, removed_datetime__isnull=True
-        ).count()
+        # Maintained counters; books nobody has touched yet have no row
+        book_stats = BookStats.objects.filter(book=book_pk).first() or BookStats(book=book)
 
         # Only check for certain things if user is logged in
         if self.request.user.is_authenticated:
@@ -276,7 +346,7 @@ class SingleBook(DetailView):
 
             # If user requested the book, extract list of owners (exclude cancelled requests)
             user_requests = RequestBook.objects.filter(
-                book=book, requester=user, decision_datetime__isnull=True, cancelled_datetime__isnull=True
+                book=book, requester=user, state=RequestBook.State.OPEN
             )
             requested_owner_usernames = user_requests.values_list(
                 "owner__username", flat=True
@@ -290,189 +360,291 @@ class SingleBook(DetailView):
         context["is_owner"] = is_owner
         context["is_wished"] = is_wished
         context["user_wish"] = user_wish
-        context["user_wish_count"] = user_wish_count
+        context["user_wish_count"] = book_stats.active_wishers
+        context["owners_count"] = book_stats.owners
+        context["available_copies"] = max(book_stats.owners - book_stats.active_loans, 0)
         context["requested_owner_usernames"] = requested_owner_usernames
         return context
 
 
+def _library_group(request, slug):
+    """The group whose library is requested. Private groups only show theirs to members"""
+    group = get_object_or_404(Group, slug=slug)
+    if group.is_private and not (
+        request.user.is_authenticated and GroupMember.objects.filter(group=group, user=request.user).exists()
+    ):
+        raise PermissionDenied("This group's library is only visible to its members")
+    return group
+
+
+def group_library_page(request, slug):
+    group = _library_group(request, slug)
+    page = group_library.page(group, after=request.GET.get("after"), before=request.GET.get("before"))
+    context = {"group": group, "books": page.items, "page": page}
+    return render(request, "group_library.html", context=context)
+
+
+def group_library_json(request, slug):
+    group = _library_group(request, slug)
+    page = group_library.page(group, after=request.GET.get("after"), before=request.GET.get("before"))
+    books = [
+        {
+            "id": book.pk,
+            "title": book.title,
+            "authors": book.authors,
+            "thumbnail": book.thumbnail,
+            "cover": cover_url(book.cover_key, 160, "jpg") if book.cover_key else None,
+            "copies": book.copies,
+            "available": book.available,
+            "url": reverse("single_book", kwargs={"pk": book.pk}),
+        }
+        for book in page.items
+    ]
+    return JsonResponse({"books": books, "next": page.next_cursor, "previous": page.previous_cursor})
+
+
+GROUP_MEMBERS_ORDERING = ("-admin", "username", "pk")  # Admins first, then alphabetical
+
+
 class SingleGroup(DetailView):
     model = Group
     template_name = "group_detail.html"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        group = self.get_object()
-        members = group.group_memberships.all()
-        context["members"] = members
+        group = self.object
+        user = self.request.user
+
+        # One indexed lookup on (user, group) instead of loading every member
+        is_member = (
+            user.is_authenticated and GroupMember.objects.filter(group=group, user=user).exists()
+        )
+
+        members = (
+            group.group_memberships.select_related("user")
+            .only("admin", "group", "user__username")
+            .annotate(username=F("user__username"))
+        )
+        page = keyset_page(
+            members,
+            GROUP_MEMBERS_ORDERING,
+            GROUP_MEMBERS_PER_PAGE,
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
+        )
+
+        context["is_member"] = is_member
+        context["member_count"] = group.member_count
+        context["members"] = page.items
+        context["members_page"] = page
+        # Reopen the members list when paging through it
+        context["show_members"] = "after" in self.request.GET or "before" in self.request.GET
         return context
 
 
-def get_book_section(item, section):
-    return item.get(section, {})
+# Google Books API pagination parameters
+SEARCH_RESULTS_PER_PAGE = 12  # Results per page (3x4 grid)
 
 
-def process_book_item(item):
+def get_search_params(request):
+    """Return (query, page, start_index, source) for a search. Supports both POST (new search) and GET (pagination)"""
+    query = request.POST.get("query") or request.GET.get("query")
+    page = int(request.GET.get("page", 1))
+    start_index = (page - 1) * SEARCH_RESULTS_PER_PAGE
+    # source=google asks for Google Books results even when the local catalog has matches
+    source = request.POST.get("source") or request.GET.get("source", "")
+    return query, page, start_index, source
 
-    # Pull back individual json sections of the selected book
-    id_google = get_book_section(item, "id")
-    book_info = get_book_section(item, "volumeInfo")
 
-    title = book_info.get("title", "N/A")
-    authors = ", ".join(book_info.get("authors", ["N/A"]))
-    thumbnail = book_info.get("imageLinks", {}).get("thumbnail", "")
-    description = book_info.get("description", "N/A")
-    pageCount = book_info.get("pageCount", "N/A")
-    identifiers = book_info.get("industryIdentifiers", "N/A")
+def build_search_context(query, page, start_index, data, user_owned_book_ids, user_wishlist_book_ids, local_books=()):
+    """Template context for a page of search results.
 
-    # Use dictionary to store identifiers - cleaner than multiple variables
-    identifier_map = {
-        "ISBN_13": "N/A",
-        "ISBN_10": "N/A",
-        "OTHER": "N/A",
-    }
+    data is the Google Books response, or None when the local catalog answered on its own
+    """
+    max_results = SEARCH_RESULTS_PER_PAGE
+    searched_google = data is not None
+    data = data or {}
 
-    # Only process identifiers if it's a list (not "N/A" string)
-    if isinstance(identifiers, list):
-        for i in identifiers:
-            try:
-                id_type = i.get("type")
-                id_value = i.get("identifier")
-                if id_type in identifier_map and id_value:
-                    identifier_map[id_type] = id_value
-            except (AttributeError, TypeError) as e:
-                logger.warning("Invalid identifier format in book data: %s", e)
-                continue
-
-    # Extract new Google Books API fields
-    published_date = book_info.get("publishedDate", "")
-    language = book_info.get("language", "en")
-    categories = ", ".join(book_info.get("categories", []))
-    publisher = book_info.get("publisher", "")
-    average_rating = book_info.get("averageRating")
-    ratings_count = book_info.get("ratingsCount")
-    preview_link = book_info.get("previewLink", "")
-    info_link = book_info.get("infoLink", "")
-    maturity_rating = book_info.get("maturityRating", "")
+    # Get total results count
+    total_items = data.get("totalItems", 0)
+
+    # Pull back ALL json sections of the selected book
+    data_items = get_book_section(data, "items")
+
+    # Extract relevant information
+    books = [process_book_item(item) for item in data_items]
+
+    # Calculate pagination info
+    total_pages = (total_items + max_results - 1) // max_results  # Ceiling division
 
     return {
-        "id_google": id_google,
-        "title": title,
-        "authors": authors,
-        "thumbnail": thumbnail,
-        "description": description,
-        "pageCount": pageCount,
-        "ID_ISBN_13": identifier_map["ISBN_13"],
-        "ID_ISBN_10": identifier_map["ISBN_10"],
-        "ID_OTHER": identifier_map["OTHER"],
-        "published_date": published_date,
-        "language": language,
-        "categories": categories,
-        "publisher": publisher,
-        "average_rating": average_rating,
-        "ratings_count": ratings_count,
-        "preview_link": preview_link,
-        "info_link": info_link,
-        "maturity_rating": maturity_rating,
+        "books": books,
+        "local_books": local_books,
+        "searched_google": searched_google,
+        "query": query,
+        "page": page,
+        "total_pages": total_pages,
+        "total_items": total_items,
+        "has_previous": page > 1,
+        "has_next": page < total_pages,
+        "start_index": start_index + 1,
+        "end_index": min(start_index + max_results, total_items),
+        "user_owned_book_ids": user_owned_book_ids,
+        "user_wishlist_book_ids": user_wishlist_book_ids,
     }
 
 
-def book_search(request):
-    # Support both POST (new search) and GET (pagination)
-    query = request.POST.get("query") or request.GET.get("query")
-    page = int(request.GET.get("page", 1))
+def user_owned_book_ids_qs(user):
+    """IDs of books the user owns"""
+    return Book.objects.filter(owner=user).values_list('google_book_id', flat=True)
+
+
+def user_wishlist_book_ids_qs(user):
+    """IDs of books on user's active wishlist (removed_datetime is null)"""
+    return Wishlist.objects.filter(
+        user=user,
+        removed_datetime__isnull=True
+    ).values_list('book__google_book_id', flat=True)
+
+
+def search_error_context(e):
+    if isinstance(e, JSONDecodeError):
+        # Handle JSON decoding error
+        return {"error_message": f"Error decoding JSON response: {e}"}
+    # Handle request-related exceptions
+    return {"error_message": f"Error making API request: {e}"}
 
-    # Google Books API pagination parameters
-    max_results = 12  # Results per page (3x4 grid)
-    start_index = (page - 1) * max_results
+
+def prefetch_next_page(request, user, query, start_index, data):
+    """Record a prefetch hit for this page and queue the next one (when enabled)"""
+    search_prefetcher.record_request(query, start_index, SEARCH_RESULTS_PER_PAGE)
+    next_index = start_index + SEARCH_RESULTS_PER_PAGE
+    if next_index < data.get("totalItems", 0):
+        search_prefetcher.schedule(prefetch_key_for(request, user), query, next_index, SEARCH_RESULTS_PER_PAGE)
+
+
+def book_search(request):
+    query, page, start_index, source = get_search_params(request)
+    available_only = request.GET.get("available") == "1"
 
     if query:
-        try:
-            # Google Books API URL with pagination
-            url = f"https://www.googleapis.com/books/v1/volumes?q={query}&maxResults={max_results}&startIndex={start_index}&key={settings.GOOGLE_BOOKS_API_KEY}"
+        # Books already in the catalog come back straight from the full-text index
+        local_books = search_catalog(query, available_only=available_only) if page == 1 else []
 
-            # Make a request to the API
-            response = requests.get(url)
-            response.raise_for_status()  # Raise error for bad responses
+        data = None
+        error_context = {}
+        # Google results can't be borrowed, so "available now" searches stay local
+        if not available_only and needs_google(local_books, page, source):
+            try:
+                # Pooled, timeout-bounded request to the Google Books API (cached).
+                # Raises a RequestException subclass straight away while the circuit breaker is open
+                data = google_books.search_volumes(query, start_index, SEARCH_RESULTS_PER_PAGE)
+            except (RequestException, JSONDecodeError) as e:
+                if not local_books:
+                    return render(request, "book_search.html", search_error_context(e))
+                # Google being down shouldn't hide what we already have
+                error_context = search_error_context(e)
+
+            if data is not None:
+                prefetch_next_page(request, request.user, query, start_index, data)
+
+        # Get user's owned books and wishlist for authenticated users
+        user_owned_book_ids = set()
+        user_wishlist_book_ids = set()
+
+        if request.user.is_authenticated:
+            user_owned_book_ids = set(user_owned_book_ids_qs(request.user))
+            user_wishlist_book_ids = set(user_wishlist_book_ids_qs(request.user))
+
+        # Render the search results
+        context = build_search_context(
+            query, page, start_index, data, user_owned_book_ids, user_wishlist_book_ids, local_books
+        )
+        context["available_only"] = available_only
+        # Kept server-side so the add forms only need to post the volume id
+        volume_cache.set_many(context["books"])
+        return render(request, "book_search.html", {**context, **error_context})
 
-            # Parse the JSON response
-            data = response.json()
+    return render(request, "book_search.html")
 
-            # Get total results count
-            total_items = data.get("totalItems", 0)
 
-            # Pull back ALL json sections of the selected book
-            data_items = get_book_section(data, "items")
+async def _aset(queryset):
+    return {value async for value in queryset}
 
-            # Extract relevant information
-            books = [process_book_item(item) for item in data_items]
 
-            # Calculate pagination info
-            total_pages = (total_items + max_results - 1) // max_results  # Ceiling division
-            has_previous = page > 1
-            has_next = page < total_pages
+async def _empty_set():
+    return set()
 
-            # Get user's owned books and wishlist for authenticated users
-            user_owned_book_ids = set()
-            user_wishlist_book_ids = set()
 
-            if request.user.is_authenticated:
-                # Get IDs of books the user owns
-                user_owned_book_ids = set(
-                    Book.objects.filter(owner=request.user).values_list('google_book_id', flat=True)
-                )
+async def _no_books():
+    return []
 
-                # Get IDs of books on user's active wishlist (removed_datetime is null)
-                user_wishlist_book_ids = set(
-                    Wishlist.objects.filter(
-                        user=request.user,
-                        removed_datetime__isnull=True
-                    ).values_list('book__google_book_id', flat=True)
-                )
 
-            # Render the search results
-            return render(
-                request, "book_search.html", {
-                    "books": books,
-                    "query": query,
-                    "page": page,
-                    "total_pages": total_pages,
-                    "total_items": total_items,
-                    "has_previous": has_previous,
-                    "has_next": has_next,
-                    "start_index": start_index + 1,
-                    "end_index": min(start_index + max_results, total_items),
-                    "user_owned_book_ids": user_owned_book_ids,
-                    "user_wishlist_book_ids": user_wishlist_book_ids,
-                }
-            )
+async def _asearch_google(query, start_index):
+    """(Google results, None), or (None, the error) if the call failed"""
+    try:
+        return await google_books.asearch_volumes(query, start_index, SEARCH_RESULTS_PER_PAGE), None
+    except (RequestException, JSONDecodeError) as e:
+        return None, e
 
-        except RequestException as e:
-            # Handle request-related exceptions
-            return render(
-                request,
-                "book_search.html",
-                {"error_message": f"Error making API request: {e}"},
-            )
 
-        except JSONDecodeError as e:
-            # Handle JSON decoding error
-            return render(
-                request,
-                "book_search.html",
-                {"error_message": f"Error decoding JSON response: {e}"},
-            )
+async def book_search_async(request):
+    """Non-blocking book_search for ASGI deployments.
 
-    return render(request, "book_search.html")
+    The catalog search and the ownership/wishlist lookups are awaited
+    concurrently, so a worker isn't blocked for the upstream round trip.
+    Google Books joins them when the search goes upstream regardless of the
+    catalog (later pages, "search Google"); otherwise it is only called
+    after the catalog turns out not to be enough.
+    """
+    query, page, start_index, source = get_search_params(request)
+    available_only = request.GET.get("available") == "1"
+
+    if not query:
+        return await sync_to_async(render)(request, "book_search.html")
+
+    user = await request.auser()
+    if user.is_authenticated:
+        lookups = (_aset(user_owned_book_ids_qs(user)), _aset(user_wishlist_book_ids_qs(user)))
+    else:
+        lookups = (_empty_set(), _empty_set())
+
+    google_now = not available_only and always_needs_google(page, source)
+    local_books, user_owned_book_ids, user_wishlist_book_ids, *google = await asyncio.gather(
+        asearch_catalog(query, available_only=available_only) if page == 1 else _no_books(),
+        *lookups,
+        *([_asearch_google(query, start_index)] if google_now else []),
+    )
+    if not google and not available_only and needs_google(local_books, page, source):
+        google = [await _asearch_google(query, start_index)]
+
+    data = None
+    error_context = {}
+    if google:
+        data, error = google[0]
+        if error is not None:
+            if not local_books:
+                return await sync_to_async(render)(request, "book_search.html", search_error_context(error))
+            error_context = search_error_context(error)
+        else:
+            prefetch_next_page(request, user, query, start_index, data)
+
+    context = build_search_context(
+        query, page, start_index, data, user_owned_book_ids, user_wishlist_book_ids, local_books
+    )
+    context["available_only"] = available_only
+    await volume_cache.aset_many(context["books"])
+    # Context processors hit the database, so rendering happens in a worker thread
+    return await sync_to_async(render)(request, "book_search.html", {**context, **error_context})
 
 
 class AddToLibraryWishView(View):
-    # Expected POST parameters for cleaner extraction
-    BOOK_PARAMS = [
-        "action", "id_google", "title", "authors", "thumbnail",
-        "description", "pageCount", "ID_ISBN_13", "ID_ISBN_10", "ID_OTHER",
-        "published_date", "language", "categories", "publisher",
-        "average_rating", "ratings_count", "preview_link", "info_link", "maturity_rating"
-    ]
+    """Add a Google Books volume to the user's library or wishlist.
+
+    The form only posts the volume id and the action. Book details come
+    from the database, then the server-side volume cache filled by
+    book_search, and only then a single-volume fetch from Google.
+    """
 
     # Action handler registry for clean dispatch pattern
     def _add_to_library(self, user, book):
@@ -512,70 +684,57 @@ class AddToLibraryWishView(View):
         "add_to_wishlist": (_add_to_wishlist, "add_to_wishlist_confirm"),
     }
 
+    def _get_or_create_book(self, volume_id):
+        book = Book.objects.filter(google_book_id=volume_id).first()
+        if book is not None:
+            return book
+
+        volume = volume_cache.get(volume_id)
+        if volume is None:
+            logger.info("Volume %s not in the volume cache, fetching from Google Books", volume_id)
+            volume = process_book_item(google_books.get_client().get_volume(volume_id))
+
+        logger.debug("Adding or retrieving existing book with ID: %s", volume_id)
+        book, created = Book.objects.get_or_create(google_book_id=volume_id, defaults=book_defaults(volume))
+        logger.debug("Book: %s, Created: %s", book.title, created)
+        return book
+
     def post(self, request, *args, **kwargs):
         user = request.user
+        volume_id = request.POST.get("id_google")
+        action = request.POST.get("action")
 
-        # Extract all POST parameters using registry pattern
-        params = {key: request.POST.get(key) for key in self.BOOK_PARAMS}
+        # Use action handler registry for clean dispatch
+        handler_info = self.ACTION_HANDLERS.get(action)
+        if not handler_info or not is_valid_volume_id(volume_id):
+            logger.warning("Invalid add request received: action=%r id=%r", action, volume_id)
+            messages.error(request, "Invalid action")
+            return redirect("book_search")
 
-        # Clean fields - convert "None", "N/A" strings and empty strings to Python None
-        def clean_field(value):
-            """Convert 'None', 'N/A' string or empty string to Python None for fields with unique constraints"""
-            if value in ("None", "N/A", "", None):
-                return None
-            return value
+        try:
+            book = self._get_or_create_book(volume_id)
 
-        if params["id_google"] and params["title"]:
-            logger.debug("Adding or retrieving existing book with ID: %s", params["id_google"])
-            try:
-                book, created = Book.objects.get_or_create(
-                    google_book_id=params["id_google"],
-                    defaults={
-                        "title": params["title"],
-                        "authors": params["authors"],
-                        "thumbnail": params["thumbnail"],
-                        "description": params["description"],
-                        "pagecount": params["pageCount"],
-                        "ID_ISBN_13": clean_field(params["ID_ISBN_13"]),
-                        "ID_ISBN_10": clean_field(params["ID_ISBN_10"]),
-                        "ID_OTHER": clean_field(params["ID_OTHER"]),
-                        "published_date": params["published_date"],
-                        "language": params["language"],
-                        "categories": params["categories"],
-                        "publisher": params["publisher"],
-                        "average_rating": clean_field(params["average_rating"]),
-                        "ratings_count": clean_field(params["ratings_count"]),
-                        "preview_link": params["preview_link"],
-                        "info_link": params["info_link"],
-                        "maturity_rating": params["maturity_rating"],
-                    },
-                )
-                logger.debug("Book: %s, Created: %s", book.title, created)
-
-                # Use action handler registry for clean dispatch
-                handler_info = self.ACTION_HANDLERS.get(params["action"])
-                if handler_info:
-                    handler_method, redirect_url = handler_info
-                    handler_method(self, user, book)
-
-                    # Store the book ID in session so the confirm view can redirect back to it
-                    request.session['last_book_added'] = book.pk
-
-                    return redirect(redirect_url)
-                else:
-                    logger.warning("Invalid action received: %s", params["action"])
-                    messages.error(request, "Invalid action")
-                    return redirect("book_search")
-
-            except (IntegrityError, ValidationError) as e:
-                logger.error("Error adding book to library/wishlist: %s", str(e), exc_info=True)
-                messages.error(request, f"Unable to add book: {str(e)}")
-                return redirect("book_search")
-            except Exception as e:
-                # Catch any other unexpected errors
-                logger.error("Unexpected error adding book: %s", str(e), exc_info=True)
-                messages.error(request, "An unexpected error occurred. Please try again.")
-                return redirect("book_search")
+            handler_method, redirect_url = handler_info
+            handler_method(self, user, book)
+
+            # Store the book ID in session so the confirm view can redirect back to it
+            request.session['last_book_added'] = book.pk
+
+            return redirect(redirect_url)
+
+        except (RequestException, JSONDecodeError) as e:
+            logger.warning("Could not fetch volume %s from Google Books: %s", volume_id, e)
+            messages.error(request, "Unable to fetch the book details from Google Books. Please try again.")
+            return redirect("book_search")
+        except (IntegrityError, ValidationError) as e:
+            logger.error("Error adding book to library/wishlist: %s", str(e), exc_info=True)
+            messages.error(request, f"Unable to add book: {str(e)}")
+            return redirect("book_search")
+        except Exception as e:
+            # Catch any other unexpected errors
+            logger.error("Unexpected error adding book: %s", str(e), exc_info=True)
+            messages.error(request, "An unexpected error occurred. Please try again.")
+            return redirect("book_search")
 
 
 class AddToLibraryConfirmView(RedirectView):
@@ -626,18 +785,13 @@ class RequestRaisedView(LoginRequiredMixin, UpdateView):
             )
 
 
-class RequestsToUserAll(LoginRequiredMixin, ListView):
-    model = RequestBook
+REQUEST_GROUPS_PER_PAGE = 10
+# Books with live requests first, then by most recent action; book_id keeps it stable
+REQUEST_GROUPS_ORDERING = ("-has_live", "-last_action", "book_id")
+
+
+class RequestsToUserAll(LoginRequiredMixin, TemplateView):
     template_name = "requests_to_user_all.html"
-    context_object_name = "requests_to_user_all"
-    # paginate_by = 2
-
-    # Registry pattern for request status filters - eliminates code duplication
-    REQUEST_STATUS_FILTERS = {
-        "open": {"decision_datetime__isnull": True, "cancelled_datetime__isnull": True},
-        "accept": {"decision_datetime__isnull": False, "decision": True},
-        "reject": {"decision_datetime__isnull": False, "decision": False},
-    }
 
     # Filter handler registry for clean dispatch
     @property
@@ -669,14 +823,18 @@ class RequestsToUserAll(LoginRequiredMixin, ListView):
         return context
 
     def _group_requests_by_book(self, user, role_field):
-        """Group all requests by book with detailed metadata.
+        """Group one page of the user's requests by book with detailed metadata.
+
+        The page is a keyset query over the user's RequestSummary rows, which
+        an index serves in order, so only the summaries, requests and loans of
+        the books on it are read however long the user's request history is.
 
         Args:
             user: The user to filter by
             role_field: Either "owner" or "requester"
 
         Returns:
-            List of dicts, each containing:
+            (KeysetPage, list of dicts), each dict containing:
                 - book: Book object
                 - requests: list of RequestBook objects for this book
                 - most_recent_action: datetime
@@ -684,86 +842,65 @@ class RequestsToUserAll(LoginRequiredMixin, ListView):
                 - has_active_loan: boolean (book currently loaned out)
                 - active_loan: Transaction object if exists
         """
-        from collections import defaultdict
-
-        # Get ALL requests for the user (no status filtering)
-        query_filters = {role_field: user}
-        all_requests = RequestBook.objects.filter(**query_filters).select_related('book', 'owner', 'requester')
+        groups = RequestSummary.objects.filter(user=user, role=role_field).values(
+            "book_id", "has_live", "last_action", "open_count", "accepted_count", "rejected_count"
+        )
+        page = keyset_page(
+            groups,
+            REQUEST_GROUPS_ORDERING,
+            REQUEST_GROUPS_PER_PAGE,
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
+        )
+        book_ids = [group["book_id"] for group in page.items]
 
-        # Group requests by book
+        # One query each for the page's books, their requests and their active loans
+        books = Book.objects.defer("description", "search_vector").in_bulk(book_ids)
         requests_by_book = defaultdict(list)
-        for request in all_requests:
-            requests_by_book[request.book].append(request)
-
-        # Build the data structure for each book
-        all_requests_by_book = []
-        for book, requests in requests_by_book.items():
-            # Calculate most recent action datetime and status counts
-            action_datetimes = []
-            has_live_request = False
-            open_count = 0
-            accepted_count = 0
-            rejected_count = 0
-
-            for req in requests:
-                # Add request datetime
-                action_datetimes.append(req.request_datetime)
-
-                # Add decision datetime if exists
-                if req.decision_datetime:
-                    action_datetimes.append(req.decision_datetime)
-
-                # Calculate status counts and check for live requests
-                if req.decision_datetime is None and req.cancelled_datetime is None:
-                    has_live_request = True
-                    open_count += 1
-                elif req.decision_datetime is not None:
-                    if req.decision:
-                        accepted_count += 1
-                    else:
-                        rejected_count += 1
-
-            most_recent_action = max(action_datetimes) if action_datetimes else None
-
-            # Check for active loan (returned_datetime is None)
-            active_loan = Transaction.objects.filter(
-                book=book,
-                returned_datetime__isnull=True
-            ).first()
-
-            has_active_loan = active_loan is not None
-
-            all_requests_by_book.append({
-                'book': book,
-                'requests': requests,
-                'most_recent_action': most_recent_action,
-                'has_live_request': has_live_request,
-                'has_active_loan': has_active_loan,
-                'active_loan': active_loan,
-                'open_count': open_count,
-                'accepted_count': accepted_count,
-                'rejected_count': rejected_count,
-            })
-
-        # Sort: live requests first, then by most recent action
-        all_requests_by_book.sort(
-            key=lambda x: (
-                not x['has_live_request'],  # False (live) comes before True (no live)
-                -(x['most_recent_action'].timestamp() if x['most_recent_action'] else 0)
-            )
+        page_requests = (
+            RequestBook.objects.filter(**{role_field: user}, book_id__in=book_ids)
+            .select_related("owner", "requester")
+            .order_by("request_datetime", "pk")
         )
-
-        return all_requests_by_book
+        for request in page_requests:
+            request.book = books[request.book_id]
+            requests_by_book[request.book_id].append(request)
+
+        active_loans = {}
+        for loan in Transaction.objects.filter(book_id__in=book_ids, returned_datetime__isnull=True).order_by("pk"):
+            active_loans.setdefault(loan.book_id, loan)  # The first, as .first() would have picked
+
+        all_requests_by_book = [
+            {
+                'book': books[group["book_id"]],
+                'requests': requests_by_book[group["book_id"]],
+                'most_recent_action': group["last_action"],
+                'has_live_request': bool(group["has_live"]),
+                'has_active_loan': group["book_id"] in active_loans,
+                'active_loan': active_loans.get(group["book_id"]),
+                'open_count': group["open_count"],
+                'accepted_count': group["accepted_count"],
+                'rejected_count': group["rejected_count"],
+            }
+            for group in page.items
+        ]
+        return page, all_requests_by_book
+
+    def _add_groups(self, user, context, role_field):
+        page, all_requests_by_book = self._group_requests_by_book(user, role_field)
+        context['all_requests_by_book'] = all_requests_by_book
+        context['page'] = page
+        context['filter_params'] = urlencode({"filter_by": context["filter_by"]})
+        return context
 
     def get_requests_by_owner(self, user, context):
         """Books requested FROM the user. User IS the owner of the book and is giving them away"""
-        context['all_requests_by_book'] = self._group_requests_by_book(user, "owner")
-        return context
+        context["reject_reasons"] = RequestBook.REJECT_REASON_CHOICES
+        return self._add_groups(user, context, "owner")
 
     def get_requests_by_requester(self, user, context):
         """Books requested BY the user. User is not the owner of the book and wants to borrow it"""
-        context['all_requests_by_book'] = self._group_requests_by_book(user, "requester")
-        return context
+        return self._add_groups(user, context, "requester")
 
 
 class RequestsToUserSingle(LoginRequiredMixin, DetailView):
@@ -771,34 +908,80 @@ class RequestsToUserSingle(LoginRequiredMixin, DetailView):
     template_name = "requests_to_user_single.html"
 
 
-class RequestDecisionView(LoginRequiredMixin, UpdateView):
+class RequestDecisionView(LoginRequiredMixin, View):
+    """Let owners approve or reject one of their open requests, addressed by its id"""
+
     # Decision mapping for cleaner logic
     DECISION_MAP = {"Approve": True, "Reject": False}
+    REJECT_REASONS = {reason for reason, _ in RequestBook.REJECT_REASON_CHOICES}
 
     def post(self, request, *args, **kwargs):
-        time_window = timedelta(seconds=1)  # Calculate a small time window for matching
-        decisionInput = request.POST.get("decision")
-        requester_id = request.POST.get("requester")
-        owner_id = request.POST.get("owner")
-        google_book_id = request.POST.get("google_book_id")
-        reject_reason = request.POST.get("reject_reason")  # Will be blank for approve
-        request_datetime = parse_datetime(request.POST.get("request_datetime"))
-        if decisionInput and requester_id and owner_id and google_book_id:
-            request_book = RequestBook.objects.get(
-                requester=CustomUser.objects.get(pk=requester_id),
-                owner=CustomUser.objects.get(pk=owner_id),
-                book=Book.objects.get(pk=google_book_id),
-                request_datetime__gte=request_datetime - time_window,
-                request_datetime__lte=request_datetime + time_window,
-            )
-            # Use decision map for cleaner conditional logic
-            request_book.decision = self.DECISION_MAP.get(decisionInput)
-            request_book.reject_reason = reject_reason
-            request_book.decision_datetime = timezone.now()
-            request_book.save()
-            return HttpResponseRedirect(
-                reverse("requests_to_user_all") + "?filter_by=owner"
+        redirect_url = reverse("requests_to_user_all") + "?filter_by=owner"
+        request_id = request.POST.get("request_id")
+        approve = self.DECISION_MAP.get(request.POST.get("decision"))
+        reject_reason = request.POST.get("reject_reason") or None
+        if not request_id or approve is None or (reject_reason and reject_reason not in self.REJECT_REASONS):
+            messages.error(request, "Invalid request")
+            return HttpResponseRedirect(redirect_url)
+
+        try:
+            request_book = RequestBook.decide(request_id, request.user, approve, reject_reason=reject_reason)
+        except (RequestBook.DoesNotExist, ValueError):
+            logger.warning("User %s tried to decide request %s, which isn't theirs", request.user.username, request_id)
+            messages.error(request, "Request not found")
+        except ValidationError as error:
+            messages.error(request, error.message)
+        else:
+            logger.info(
+                "User %s %s request %s", request.user.username, "approved" if approve else "rejected", request_id
             )
+            if approve:
+                messages.success(request, f"Request approved: the book is now on loan to {request_book.requester}")
+            else:
+                messages.success(request, "Request rejected")
+        return HttpResponseRedirect(redirect_url)
+
+
+BULK_REQUESTS_MAX = 100  # Ids accepted by one bulk decision or cancellation
+
+
+def _bulk_request_ids(request):
+    """The distinct request ids posted as `request_ids`, or None if there are none or too many"""
+    ids = {int(value) for value in request.POST.getlist("request_ids") if value.isdigit()}
+    if not ids or len(ids) > BULK_REQUESTS_MAX:
+        return None
+    return sorted(ids)
+
+
+def _requests_phrase(count):
+    return f"{count} request{'s' if count != 1 else ''}"
+
+
+class BulkRequestDecisionView(LoginRequiredMixin, View):
+    """Let owners approve or reject several of their open requests in one post"""
+
+    DECISION_MAP = RequestDecisionView.DECISION_MAP
+    REJECT_REASONS = RequestDecisionView.REJECT_REASONS
+
+    def post(self, request, *args, **kwargs):
+        redirect_url = reverse("requests_to_user_all") + "?filter_by=owner"
+        request_ids = _bulk_request_ids(request)
+        approve = self.DECISION_MAP.get(request.POST.get("decision"))
+        reject_reason = request.POST.get("reject_reason") or None
+        if request_ids is None or approve is None or (reject_reason and reject_reason not in self.REJECT_REASONS):
+            messages.error(request, "Invalid request")
+            return HttpResponseRedirect(redirect_url)
+
+        decided = RequestBook.decide_many(request_ids, request.user, approve, reject_reason=reject_reason)
+        verb = "approved" if approve else "rejected"
+        logger.info("User %s %s requests %s", request.user.username, verb, decided)
+        if decided:
+            messages.success(request, f"{_requests_phrase(len(decided))} {verb}")
+        skipped = len(request_ids) - len(decided)
+        if skipped:
+            reason = "already closed, or their copy couldn't be lent" if approve else "already closed"
+            messages.warning(request, f"{_requests_phrase(skipped)} skipped: {reason}")
+        return HttpResponseRedirect(redirect_url)
 
 
 class CancelRequestView(LoginRequiredMixin, View):
@@ -807,37 +990,41 @@ class CancelRequestView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
         request_id = request.POST.get("request_id")
 
+        redirect_url = reverse("requests_to_user_all") + "?filter_by=requester"
         if not request_id:
             messages.error(request, "Invalid request")
-            return redirect("requests_to_user_all") + "?filter_by=requester"
+            return HttpResponseRedirect(redirect_url)
 
         try:
-            request_book = RequestBook.objects.get(pk=request_id)
+            # Lock the row so a double submit, or a decision racing the
+            # cancel, sees the other's write and the counters move only once
+            with transaction.atomic():
+                request_book = RequestBook.objects.select_for_update().get(pk=request_id)
 
-            # Verify the current user is the requester
-            if request_book.requester != request.user:
-                logger.warning(
-                    "User %s attempted to cancel request %s belonging to %s",
-                    request.user.username,
-                    request_id,
-                    request_book.requester.username,
-                )
-                messages.error(request, "You can only cancel your own requests")
-                return redirect("requests_to_user_all") + "?filter_by=requester"
+                # Verify the current user is the requester
+                if request_book.requester != request.user:
+                    logger.warning(
+                        "User %s attempted to cancel request %s belonging to %s",
+                        request.user.username,
+                        request_id,
+                        request_book.requester.username,
+                    )
+                    messages.error(request, "You can only cancel your own requests")
+                    return HttpResponseRedirect(redirect_url)
 
-            # Verify the request is still pending (not already decided)
-            if request_book.decision_datetime is not None:
-                messages.error(request, "This request has already been responded to and cannot be cancelled")
-                return redirect("requests_to_user_all") + "?filter_by=requester"
+                # Verify the request is still pending (not already decided)
+                if request_book.decision_datetime is not None:
+                    messages.error(request, "This request has already been responded to and cannot be cancelled")
+                    return HttpResponseRedirect(redirect_url)
 
-            # Verify the request hasn't already been cancelled
-            if request_book.cancelled_datetime is not None:
-                messages.info(request, "This request was already cancelled")
-                return redirect("requests_to_user_all") + "?filter_by=requester"
+                # Verify the request hasn't already been cancelled
+                if request_book.cancelled_datetime is not None:
+                    messages.info(request, "This request was already cancelled")
+                    return HttpResponseRedirect(redirect_url)
 
-            # Cancel the request
-            request_book.cancelled_datetime = timezone.now()
-            request_book.save()
+                # Cancel the request
+                request_book.cancelled_datetime = timezone.now()
+                request_book.save()
 
             logger.info(
                 "User %s cancelled request %s for book '%s'",
@@ -851,7 +1038,27 @@ class CancelRequestView(LoginRequiredMixin, View):
             logger.error("Request %s not found for cancellation", request_id)
             messages.error(request, "Request not found")
 
-        return HttpResponseRedirect(reverse("requests_to_user_all") + "?filter_by=requester")
+        return HttpResponseRedirect(redirect_url)
+
+
+class BulkCancelRequestView(LoginRequiredMixin, View):
+    """Allow requesters to cancel several of their pending requests in one post"""
+
+    def post(self, request, *args, **kwargs):
+        redirect_url = reverse("requests_to_user_all") + "?filter_by=requester"
+        request_ids = _bulk_request_ids(request)
+        if request_ids is None:
+            messages.error(request, "Invalid request")
+            return HttpResponseRedirect(redirect_url)
+
+        cancelled = RequestBook.cancel_many(request_ids, request.user)
+        logger.info("User %s cancelled requests %s", request.user.username, cancelled)
+        if cancelled:
+            messages.success(request, f"{_requests_phrase(len(cancelled))} cancelled")
+        skipped = len(request_ids) - len(cancelled)
+        if skipped:
+            messages.warning(request, f"{_requests_phrase(skipped)} skipped: already responded to or cancelled")
+        return HttpResponseRedirect(redirect_url)
 
 
 class RemoveBookFromLibraryView(LoginRequiredMixin, View):
@@ -870,37 +1077,39 @@ class RemoveBookFromLibraryView(LoginRequiredMixin, View):
 
             # Find the UserBook relationship
             try:
-                user_book = UserBook.objects.get(user=request.user, book=book)
-
-                # Check if there are any active transactions for this book
-                active_transactions = Transaction.objects.filter(
-                    owner=request.user,
-                    book=book,
-                    returned_datetime__isnull=True
-                ).exists()
-
-                if active_transactions:
-                    messages.error(
-                        request,
-                        f"Cannot remove '{book.title}' - you have an active loan for this book. "
-                        "Please wait until it's returned."
-                    )
-                    logger.warning(
-                        "User %s attempted to remove book %s with active transactions",
-                        request.user.username,
-                        book_id
-                    )
-                else:
-                    # Delete the UserBook relationship
-                    user_book.delete()
+                # Lock the row so a double submit deletes, and uncounts, once
+                with transaction.atomic():
+                    user_book = UserBook.objects.select_for_update().get(user=request.user, book=book)
+
+                    # Check if there are any active transactions for this book
+                    active_transactions = Transaction.objects.filter(
+                        owner=request.user,
+                        book=book,
+                        returned_datetime__isnull=True
+                    ).exists()
+
+                    if active_transactions:
+                        messages.error(
+                            request,
+                            f"Cannot remove '{book.title}' - you have an active loan for this book. "
+                            "Please wait until it's returned."
+                        )
+                        logger.warning(
+                            "User %s attempted to remove book %s with active transactions",
+                            request.user.username,
+                            book_id
+                        )
+                    else:
+                        # Delete the UserBook relationship
+                        user_book.delete()
 
-                    logger.info(
-                        "User %s removed book '%s' (ID: %s) from their library",
-                        request.user.username,
-                        book.title,
-                        book_id
-                    )
-                    messages.success(request, f"'{book.title}' has been removed from your library")
+                        logger.info(
+                            "User %s removed book '%s' (ID: %s) from their library",
+                            request.user.username,
+                            book.title,
+                            book_id
+                        )
+                        messages.success(request, f"'{book.title}' has been removed from your library")
 
             except UserBook.DoesNotExist:
                 messages.error(request, "You don't own this book")
@@ -936,15 +1145,18 @@ class RemoveFromWishlistView(LoginRequiredMixin, View):
 
             # Find and remove the wishlist entry
             try:
-                wishlist_entry = Wishlist.objects.get(
-                    user=request.user,
-                    book=book,
-                    removed_datetime__isnull=True
-                )
+                # Lock the open entry so a double submit finds it gone and
+                # the wish counters drop only once
+                with transaction.atomic():
+                    wishlist_entry = Wishlist.objects.select_for_update().get(
+                        user=request.user,
+                        book=book,
+                        removed_datetime__isnull=True
+                    )
 
-                # Soft delete by setting removed_datetime
-                wishlist_entry.removed_datetime = timezone.now()
-                wishlist_entry.save()
+                    # Soft delete by setting removed_datetime
+                    wishlist_entry.removed_datetime = timezone.now()
+                    wishlist_entry.save()
 
                 logger.info(
                     "User %s removed book '%s' (ID: %s) from their wishlist",
@@ -976,43 +1188,66 @@ class EndLoanView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
         transaction_id = request.POST.get("transaction_id")
 
+        redirect_url = reverse("requests_to_user_all") + "?filter_by=owner"
         if not transaction_id:
             messages.error(request, "Invalid transaction")
-            return HttpResponseRedirect(reverse("requests_to_user_all") + "?filter_by=owner")
+            return HttpResponseRedirect(redirect_url)
 
         try:
-            transaction = Transaction.objects.get(pk=transaction_id)
+            # Lock the loan so a double submit sees it returned and the loan
+            # counters move only once
+            with transaction.atomic():
+                loan = Transaction.objects.select_for_update().get(pk=transaction_id)
 
-            # Verify the current user is the owner of the transaction
-            if transaction.owner != request.user:
-                logger.warning(
-                    "User %s attempted to end transaction %s belonging to %s",
-                    request.user.username,
-                    transaction_id,
-                    transaction.owner.username,
-                )
-                messages.error(request, "You can only end your own loans")
-                return HttpResponseRedirect(reverse("requests_to_user_all") + "?filter_by=owner")
+                # Verify the current user is the owner of the transaction
+                if loan.owner != request.user:
+                    logger.warning(
+                        "User %s attempted to end transaction %s belonging to %s",
+                        request.user.username,
+                        transaction_id,
+                        loan.owner.username,
+                    )
+                    messages.error(request, "You can only end your own loans")
+                    return HttpResponseRedirect(redirect_url)
 
-            # Verify the loan hasn't already been returned
-            if transaction.returned_datetime is not None:
-                messages.info(request, "This loan has already been completed")
-                return HttpResponseRedirect(reverse("requests_to_user_all") + "?filter_by=owner")
+                # Verify the loan hasn't already been returned
+                if loan.returned_datetime is not None:
+                    messages.info(request, "This loan has already been completed")
+                    return HttpResponseRedirect(redirect_url)
 
-            # Mark the loan as returned
-            transaction.returned_datetime = timezone.now()
-            transaction.save()
+                # Mark the loan as returned
+                loan.returned_datetime = timezone.now()
+                loan.save()
 
-            logger.info(
-                "User %s marked transaction %s as returned for book '%s'",
-                request.user.username,
-                transaction_id,
-                transaction.book.title,
-            )
-            messages.success(request, f"Loan completed! {transaction.book.title} has been returned.")
+                logger.info(
+                    "User %s marked transaction %s as returned for book '%s'",
+                    request.user.username,
+                    transaction_id,
+                    loan.book.title,
+                )
+                messages.success(request, f"Loan completed! {loan.book.title} has been returned.")
 
         except Transaction.DoesNotExist:
             logger.error("Transaction %s not found for ending loan", transaction_id)
             messages.error(request, "Transaction not found")
 
-        return HttpResponseRedirect(reverse("requests_to_user_all") + "?filter_by=owner")
+        return HttpResponseRedirect(redirect_url)
+
+
+def cover_image(request, key, name):
+    """Serve a stored cover rendition.
+
+    Paths are content-addressed, so a URL always returns the same bytes and
+    browsers can cache it for good.
+    """
+    if not COVER_KEY_RE.match(key) or not COVER_NAME_RE.match(name):
+        raise Http404("No such cover")
+    try:
+        cover = default_storage.open(cover_path(key, name))
+    except FileNotFoundError:
+        raise Http404("No such cover")
+    content_type = "image/webp" if name.endswith(".webp") else "image/jpeg"
+    response = FileResponse(cover, content_type=content_type)
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    response["ETag"] = f'"{key}-{name}"'
+    return response
@@ -0,0 +1,96 @@
+"""
+Short-lived server-side store of the volumes shown in search results.
+
+Every book on a results page is cached here under its google_book_id, in
+the normalized form produced by volumes.process_book_item. The add to
+library/wishlist form then only posts the id, and the Book is built from
+this copy instead of from client-supplied fields. Shared between workers,
+since the POST rarely lands on the process that rendered the results.
+"""
+
+import logging
+import re
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+VOLUME_CACHE_DEFAULTS = {
+    "ALIAS": "google_books",  # Django cache holding the volumes
+    "TTL": 60 * 60,  # Long enough to read a results page and click "add"
+}
+
+# Google volume ids are short URL-safe strings; anything else is never looked up
+VOLUME_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,25}$")
+
+
+def is_valid_volume_id(volume_id):
+    return bool(volume_id) and VOLUME_ID_RE.match(volume_id) is not None
+
+
+def make_key(volume_id):
+    return f"books:volume:{volume_id}"
+
+
+class VolumeCache:
+    """TTL-bounded cache of normalized volume dicts keyed by google_book_id"""
+
+    def __init__(self, config=None):
+        self._config = config
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stored": 0}
+
+    @property
+    def config(self):
+        # Read lazily so override_settings in tests is honoured
+        if self._config is not None:
+            return self._config
+        return {**VOLUME_CACHE_DEFAULTS, **getattr(settings, "GOOGLE_BOOKS_VOLUME_CACHE", {})}
+
+    @property
+    def backend(self):
+        return caches[self.config["ALIAS"]]
+
+    def get(self, volume_id):
+        """Return the cached volume dict, or None on a miss"""
+        data = self.backend.get(make_key(volume_id))
+        self._count("hits" if data is not None else "misses")
+        return data
+
+    def _entries(self, volumes):
+        return {
+            make_key(volume["id_google"]): volume
+            for volume in volumes
+            if is_valid_volume_id(volume.get("id_google"))
+        }
+
+    def set_many(self, volumes):
+        """Store a page of normalized volume dicts"""
+        entries = self._entries(volumes)
+        if entries:
+            self.backend.set_many(entries, timeout=self.config["TTL"])
+            self._count("stored", len(entries))
+
+    async def aset_many(self, volumes):
+        entries = self._entries(volumes)
+        if entries:
+            await self.backend.aset_many(entries, timeout=self.config["TTL"])
+            self._count("stored", len(entries))
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def stats(self):
+        """Hit/miss counters for this process"""
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# One instance per process, shared by every request thread
+volume_cache = VolumeCache()
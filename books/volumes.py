@@ -0,0 +1,109 @@
+"""
+Normalizing Google Books volume JSON into Book fields.
+
+Shared by the search results page, the add to library/wishlist view and
+the enrich_books command, so every path stores a volume the same way.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def get_book_section(item, section):
+    return item.get(section, {})
+
+
+def process_book_item(item):
+
+    # Pull back individual json sections of the selected book
+    id_google = get_book_section(item, "id")
+    book_info = get_book_section(item, "volumeInfo")
+
+    title = book_info.get("title", "N/A")
+    authors = ", ".join(book_info.get("authors", ["N/A"]))
+    thumbnail = book_info.get("imageLinks", {}).get("thumbnail", "")
+    description = book_info.get("description", "N/A")
+    pageCount = book_info.get("pageCount", "N/A")
+    identifiers = book_info.get("industryIdentifiers", "N/A")
+
+    # Use dictionary to store identifiers - cleaner than multiple variables
+    identifier_map = {
+        "ISBN_13": "N/A",
+        "ISBN_10": "N/A",
+        "OTHER": "N/A",
+    }
+
+    # Only process identifiers if it's a list (not "N/A" string)
+    if isinstance(identifiers, list):
+        for i in identifiers:
+            try:
+                id_type = i.get("type")
+                id_value = i.get("identifier")
+                if id_type in identifier_map and id_value:
+                    identifier_map[id_type] = id_value
+            except (AttributeError, TypeError) as e:
+                logger.warning("Invalid identifier format in book data: %s", e)
+                continue
+
+    # Extract new Google Books API fields
+    published_date = book_info.get("publishedDate", "")
+    language = book_info.get("language", "en")
+    categories = ", ".join(book_info.get("categories", []))
+    publisher = book_info.get("publisher", "")
+    average_rating = book_info.get("averageRating")
+    ratings_count = book_info.get("ratingsCount")
+    preview_link = book_info.get("previewLink", "")
+    info_link = book_info.get("infoLink", "")
+    maturity_rating = book_info.get("maturityRating", "")
+
+    return {
+        "id_google": id_google,
+        "title": title,
+        "authors": authors,
+        "thumbnail": thumbnail,
+        "description": description,
+        "pageCount": pageCount,
+        "ID_ISBN_13": identifier_map["ISBN_13"],
+        "ID_ISBN_10": identifier_map["ISBN_10"],
+        "ID_OTHER": identifier_map["OTHER"],
+        "published_date": published_date,
+        "language": language,
+        "categories": categories,
+        "publisher": publisher,
+        "average_rating": average_rating,
+        "ratings_count": ratings_count,
+        "preview_link": preview_link,
+        "info_link": info_link,
+        "maturity_rating": maturity_rating,
+    }
+
+
+def clean_field(value):
+    """Convert 'None', 'N/A' string or empty string to Python None for fields with unique constraints"""
+    if value in ("None", "N/A", "", None):
+        return None
+    return value
+
+
+def book_defaults(volume):
+    """Book field values for a volume dict from process_book_item"""
+    return {
+        "title": volume["title"],
+        "authors": volume["authors"],
+        "thumbnail": volume["thumbnail"],
+        "description": volume["description"],
+        "pagecount": volume["pageCount"],
+        "ID_ISBN_13": clean_field(volume["ID_ISBN_13"]),
+        "ID_ISBN_10": clean_field(volume["ID_ISBN_10"]),
+        "ID_OTHER": clean_field(volume["ID_OTHER"]),
+        "published_date": volume["published_date"],
+        "language": volume["language"],
+        "categories": volume["categories"],
+        "publisher": volume["publisher"],
+        "average_rating": clean_field(volume["average_rating"]),
+        "ratings_count": clean_field(volume["ratings_count"]),
+        "preview_link": volume["preview_link"],
+        "info_link": volume["info_link"],
+        "maturity_rating": volume["maturity_rating"],
+    }
@@ -3,6 +3,10 @@ ASGI config for bookswap project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Served by an ASGI server (e.g. ``uvicorn bookswap.asgi:application``), async
+views such as ``book_search_async`` can keep many upstream requests in flight
+from a single process.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
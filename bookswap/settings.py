@@ -58,6 +58,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "debug_toolbar",
     "crispy_forms",
     "crispy_bootstrap5",
@@ -73,9 +74,13 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
 ]
 
+# The toolbar middleware is sync-only: under ASGI it would force every async
+# view back onto a worker thread, so only load it where the toolbar is used
+if DEBUG:
+    MIDDLEWARE += ["debug_toolbar.middleware.DebugToolbarMiddleware"]
+
 ROOT_URLCONF = "bookswap.urls"
 
 TEMPLATES = [
@@ -116,6 +121,109 @@ DATABASES = {
     }
 }
 
+# Caches
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Database-backed caches are shared by all worker processes.
+# Run `python manage.py createcachetable` after deploying.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "google_books": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "google_books_cache",
+        "TIMEOUT": 60 * 60,
+        "OPTIONS": {
+            "MAX_ENTRIES": 20000,  # Oldest entries are culled beyond this
+        },
+    },
+    # Rendered query results shared between workers, e.g. group libraries
+    "shared": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "shared_cache",
+        "TIMEOUT": 10 * 60,
+        "OPTIONS": {
+            "MAX_ENTRIES": 20000,
+        },
+    },
+}
+
+# Google Books search response cache (see books/search_cache.py)
+GOOGLE_BOOKS_SEARCH_CACHE = {
+    "ALIAS": "google_books",
+    "TTL": 60 * 60,
+    "L1_MAX_ENTRIES": 256,
+    "L1_TTL": 5 * 60,
+}
+
+# Volumes shown in search results, read back when a book is added (see books/volume_cache.py)
+GOOGLE_BOOKS_VOLUME_CACHE = {
+    "ALIAS": "google_books",
+    "TTL": 60 * 60,
+}
+
+# Google Books HTTP client (see books/google_books.py)
+GOOGLE_BOOKS_CLIENT = {
+    "CONNECT_TIMEOUT": 3.05,
+    "READ_TIMEOUT": 10,
+    "MAX_RETRIES": 2,
+    "POOL_MAXSIZE": 10,
+    "BREAKER_FAILURE_THRESHOLD": 5,
+    "BREAKER_RESET_TIMEOUT": 30,
+}
+
+# Coalescing of identical concurrent Google Books searches (see books/singleflight.py)
+GOOGLE_BOOKS_SINGLE_FLIGHT = {
+    "ALIAS": "google_books",
+    "LEASE_TIMEOUT": 20,
+    "WAIT_TIMEOUT": 10,
+    "POLL_INTERVAL": 0.1,
+}
+
+# Background prefetch of the next search results page (see books/prefetch.py)
+GOOGLE_BOOKS_PREFETCH = {
+    "ENABLED": os.getenv("GOOGLE_BOOKS_PREFETCH") == "1",
+    "MAX_WORKERS": 2,
+    "PER_USER_LIMIT": 1,
+}
+
+# Shared Google Books request budget (see books/quota.py). Background work
+# (enrichment, prefetch) stops once only RESERVE of the bucket is left
+GOOGLE_BOOKS_QUOTA = {
+    "ENABLED": os.getenv("GOOGLE_BOOKS_QUOTA", "1") == "1",
+    "DAILY_QUOTA": int(os.getenv("GOOGLE_BOOKS_DAILY_QUOTA", "1000")),
+    "RESERVE": 0.3,
+}
+
+# Per-group union of members' books (see books/group_library.py)
+GROUP_LIBRARY = {
+    "ALIAS": "shared",
+    "TTL": 10 * 60,
+    "PER_PAGE": 24,
+}
+
+# Local-first search over the Book table (see books/catalog_search.py).
+# Google Books is only queried when fewer than MIN_RESULTS books match locally
+CATALOG_SEARCH = {
+    "MIN_RESULTS": 4,
+    "MAX_RESULTS": 12,
+}
+
+# Locally cached cover images (see books/covers.py). Filled by `manage.py fetch_covers`
+BOOK_COVERS = {
+    "DIR": "covers",
+    "WIDTHS": (80, 160, 320),
+}
+
+# Background metadata refresh of Book rows (see books/enrichment.py and `manage.py enrich_books`)
+BOOK_ENRICHMENT = {
+    "STALE_AFTER_DAYS": 30,
+    "BATCH_SIZE": 40,
+    "WORKERS": 4,
+    "RATE_LIMIT": 5.0,
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -26,7 +26,11 @@ from books.views import (
     JoinGroup,
     LeaveGroup,
     UserAccount,
+    user_books_json,
+    user_wishes_json,
+    user_groups_json,
     book_search,
+    book_search_async,
     RequestsToUserAll,
     RequestsToUserSingle,
     book_database,
@@ -34,15 +38,20 @@ from books.views import (
     group_database,
     SingleBook,
     SingleGroup,
+    group_library_page,
+    group_library_json,
     AddToLibraryWishView,
     AddToLibraryConfirmView,
     AddToWishListConfirmView,
     RequestRaisedView,
     RequestDecisionView,
+    BulkRequestDecisionView,
     CancelRequestView,
+    BulkCancelRequestView,
     RemoveBookFromLibraryView,
     RemoveFromWishlistView,
     EndLoanView,
+    cover_image,
 )
 
 urlpatterns = [
@@ -55,7 +64,12 @@ urlpatterns = [
     path("join_group/<slug>/", JoinGroup.as_view(), name="join_group"),
     path("leave_group/<slug>/", LeaveGroup.as_view(), name="leave_group"),
     path("user/<str:pk>/", UserAccount.as_view(), name="user_account"),
+    path("user/<int:pk>/books.json", user_books_json, name="user_books_json"),
+    path("user/<int:pk>/wishes.json", user_wishes_json, name="user_wishes_json"),
+    path("user/<int:pk>/groups.json", user_groups_json, name="user_groups_json"),
     path("book_search/", book_search, name="book_search"),
+    # Non-blocking variant of book_search, for ASGI deployments (see bookswap/asgi.py)
+    path("book_search/async/", book_search_async, name="book_search_async"),
     path(
         "requests_to_user_all/",
         RequestsToUserAll.as_view(),
@@ -72,6 +86,8 @@ urlpatterns = [
     path("wanted/", book_database_wishes, name="book_database_wishes"),
     path("groups/", group_database, name="group_database"),
     path("groups/<str:slug>/", SingleGroup.as_view(), name="single_group"),
+    path("groups/<str:slug>/library/", group_library_page, name="group_library"),
+    path("groups/<str:slug>/library.json", group_library_json, name="group_library_json"),
     path("add-to-library/", AddToLibraryWishView.as_view(), name="add_to_library"),
     path(
         "add-to-library/confirm/",
@@ -93,11 +109,21 @@ urlpatterns = [
         RequestDecisionView.as_view(),
         name="request_decision",
     ),
+    path(
+        "request_decision/bulk/",
+        BulkRequestDecisionView.as_view(),
+        name="bulk_request_decision",
+    ),
     path(
         "cancel_request/",
         CancelRequestView.as_view(),
         name="cancel_request",
     ),
+    path(
+        "cancel_request/bulk/",
+        BulkCancelRequestView.as_view(),
+        name="bulk_cancel_request",
+    ),
     path(
         "remove_book/",
         RemoveBookFromLibraryView.as_view(),
@@ -113,6 +139,8 @@ urlpatterns = [
         EndLoanView.as_view(),
         name="end_loan",
     ),
+    # Locally cached book covers (see books/covers.py)
+    path("covers/<str:key>/<str:name>", cover_image, name="cover_image"),
 ]
 
 # Required for debug toolbar